@@ -1,6 +1,5 @@
 import asyncio
 import code
-import re
 import os
 import json
 import aiohttp
@@ -8,78 +7,62 @@ import logging
 import datetime
 import time
 import pymongo
+import socket
+from urllib.parse import urlparse
 from typing import AsyncIterable
 from dotenv import load_dotenv
 from livekit import rtc
-from livekit.agents import JobContext, Agent, AgentSession, AgentServer, llm, tokenize
+from livekit.agents import JobContext, JobProcess, JobExecutorType, Agent, AgentSession, AgentServer, llm, utils
 from livekit.plugins import silero, groq, deepgram, elevenlabs
-from groq import Groq
-from database import db as local_db
+from database import get_db, get_async_db
+from cache import question_cache, kit_cache
+from transcript_journal import TranscriptJournal
+from publisher import OutboundPublisher
+from conversation import ConversationTail, message_role, message_text
+from registry import registry
+from metrics import SessionLatencyTracker, start_metrics_export, start_metrics_server, worker_metrics
+from worker_load import LOAD_THRESHOLD as WORKER_LOAD_THRESHOLD, WorkerLoad, loop_monitor
+from evaluation import FALLBACK_EVALUATION, generate_evaluation, get_evaluation_queue, get_groq_client
+from summary import RollingSummarizer
+from context_budget import ContextBudget
+from code_sync import CodeDocument, CodeReviewTracker
+from control_tokens import ControlTokenScanner
+from segmenter import wrap_tts
+from tts_cache import GOODBYE_TEXT, cached_audio, create_tts, greeting_text
+from interview_kit import render_instructions, usable_kit
+from outbox import CLOSE_TIMEOUT as OUTBOX_CLOSE_TIMEOUT, evaluation_url, get_outbox, install_sender
+from lifecycle import InterviewLifecycle, EVALUATED, CLOSED, wait_for_playout
 from livekit.agents.llm import ChatContext, ChatMessage, ChatRole
 
 load_dotenv()
 logging.getLogger('pymongo').setLevel(logging.WARNING)
 logging.getLogger('livekit').setLevel(logging.INFO)
-CURRENT_ROOM = None
 
 
 class UserTranscriptLogHandler(logging.Handler):
     """Capture structured 'received user transcript' logs emitted by the SDK
-    and forward the transcript to the LiveKit room when possible.
+    and forward the transcript to the room of the session that logged it.
+    Dedup happens in that session's bounded publisher, not here.
     """
-    def __init__(self):
-        super().__init__()
-        self.seen = set()
 
     def emit(self, record: logging.LogRecord):
         try:
-            data = record.__dict__
             # Many livekit logs include a 'user_transcript' key in extra
-            text = data.get('user_transcript')
-            if not text:
-                # fallback: try to parse JSON-like message
-                msg = str(record.getMessage())
-                # quick guard
-                if 'user_transcript' in msg:
-                    # naive extraction, skip for brevity
-                    return
+            text = record.__dict__.get('user_transcript')
+            if not isinstance(text, str) or not text.strip():
                 return
 
-            text = text.strip()
-            if not text or text in self.seen:
+            handle = registry.current()
+            if handle is None:
+                print('⚠️ [LOG_FORWARD] No owning session for transcript log, skipping')
                 return
-            self.seen.add(text)
-
-            # schedule async broadcast into the event loop
-            loop = None
-            try:
-                loop = asyncio.get_event_loop()
-            except RuntimeError:
-                pass
 
-            async def _broadcast():
-                if CURRENT_ROOM is None:
-                    print('⚠️ [LOG_FORWARD] No CURRENT_ROOM set, skipping')
-                    return
-                payload = json.dumps({
-                    'type': 'transcript',
-                    'role': 'user',
-                    'content': text
-                })
-                try:
-                    await CURRENT_ROOM.local_participant.publish_data(payload.encode('utf-8'), reliable=True)
-                    print('✅ [LOG_FORWARDED] forwarded user transcript from SDK log')
-                except Exception as e:
-                    print(f'❌ [LOG_FORWARD_FAILED] {e}')
+            def _broadcast():
+                if handle.publisher.send_transcript('user', text):
+                    print(f'✅ [LOG_FORWARDED] forwarded user transcript from SDK log ({handle.key})')
 
-            if loop and loop.is_running():
-                loop.call_soon_threadsafe(lambda: asyncio.create_task(_broadcast()))
-            else:
-                # try running it synchronously in a new loop as a last resort
-                try:
-                    asyncio.run(_broadcast())
-                except Exception:
-                    pass
+            # emit may run off the event loop thread
+            handle.loop.call_soon_threadsafe(_broadcast)
         except Exception:
             pass
 
@@ -88,70 +71,28 @@ class UserTranscriptLogHandler(logging.Handler):
 logging.getLogger('livekit.agents').addHandler(UserTranscriptLogHandler())
 
 class InterviewAssistant(Agent):
-    def __init__(self, question_obj, room=None, session_id=None):
+    def __init__(self, question_obj, room=None, session_id=None, publisher=None, kit=None):
         self._room = room
+        self.publisher = publisher
         self.session_id = session_id
-        self._end_signal_event = asyncio.Event()
+        self.lifecycle = InterviewLifecycle(session_id)
         self.current_code = ""
+        self.code = CodeDocument()
+        self.code_review = CodeReviewTracker()
+        self.journal = None
+        self.latency = SessionLatencyTracker(session_id)
+        self.summarizer = RollingSummarizer(lambda: get_groq_client(), session_id)
+        self.context_budget = ContextBudget()
         # --- ADD THESE ---
         self.last_user_speech = asyncio.get_event_loop().time() 
         self.silence_threshold = 15  # Seconds
         self._agent_state = "listening"
 
-        # Extract details from the object fetched from local_db
-        if isinstance(question_obj, dict):
-            title = question_obj.get('title', 'Problem')
-            desc = question_obj.get('description', 'No description provided.')
-            inp = question_obj.get('exampleInput', 'N/A')
-            out = question_obj.get('exampleOutput', 'N/A')
-        else:
-            title = str(question_obj)
-            desc = inp = out = ""
-        super().__init__(
-            instructions=f"""# Role
-                You are Athena, a professional Technical Interviewer. You are conducting a structured coding interview.
-                
-                # The Problem to Discuss
-                Title: {title}
-                Description: {desc}
-                Example Input: {inp}
-                Example Output: {out}
-
-                # Interview Flow (Follow Strictly)
-                1. **Problem Explanation**: Explain the problem "{desc}" in detail. Provide a clear example with input and expected output. Ask if the candidate understands.
-                2. **Brute Force Discussion**: Ask the candidate to describe a brute force approach first. Discuss their logic, time complexity, and space complexity. Ask "What can be done better?" to nudge them.
-                3. **Optimal Solution**: Once brute force is clear, discuss the optimal approach. Ask why this method is better and discuss the new complexities.
-                4. **Coding Phase**: Only after the logic is fully discussed, invite the candidate to start coding in the editor.
-
-                # IMPORTANT: ENDING THE INTERVIEW (MANDATORY)
-                - When the candidate confirms they want to end the interview, you MUST conclude the interview.
-                - To conclude, say a brief warm one-sentence goodbye and then append the exact token [[END_INTERVIEW]] at the very end of your response.
-                - THIS IS MANDATORY: include the token exactly as shown (no extra characters).
-
-                # Context
-                Problem assigned: {title}
-                
-                # CODE EDITOR RULES (MANDATORY)
-                - You have access to a tool `get_latest_code`.
-                - **Explicit Request**: If candidate asks "How does this look?" or "Review my code", call `get_latest_code`,`analyze my code`, `I have written code in editor check it`.
-                - **Rule**: If you check the code and find they haven't written anything new or are just starting, stay silent or give a tiny verbal nudge without mentioning the editor.
-                - **Rule**: Only give detailed feedback if you see a logical block or an error in the editor.
-                
-                # How to handle the Code Editor
-                - You will receive "CANDIDATE CODE UPDATE" messages in your context history.
-                - **Rule**: Whenever you see a new code block, analyze it silently.
-                - **Rule**: Only speak if the candidate asks a question, or if they have finished a significant logic block and seem stuck.
-                - **Rule**: Do not comment on every character.
-                - **Rule**: Whenever you receive a "CANDIDATE CODE UPDATE", do NOT speak immediately unless the candidate explicitly asks "What do you think?" or "Is this correct?".
-                - **Rule**: Silently absorb the code into your logic for the next turn of the conversation.
-                - **Rule**: Do not tell the candidate the answer by yourself unless they explicitly ask for help.
-
-                # Voice Output & Formatting
-                - **NO Full Stops**: Never use periods (.) to end sentences. Use commas or line breaks.
-                - **Plain Text Only**: No markdown, no bolding (**), and no backticks (code blocks) in your speech.
-                - **Brevity**: 1-3 sentences maximum per turn to keep it conversational.
-                """
-        )
+        # A prebuilt kit carries rendered instructions (with hints); otherwise render them now
+        if not isinstance(question_obj, dict):
+            question_obj = {"title": str(question_obj), "description": "", "exampleInput": "", "exampleOutput": ""}
+        self.kit = kit
+        super().__init__(instructions=kit["instructions"] if kit else render_instructions(question_obj))
 
     @llm.function_tool(
         description="Retrieves the candidate's current code from the editor."
@@ -161,7 +102,10 @@ class InterviewAssistant(Agent):
         Call when candidate says 'check my code', 'what do you think?', etc."""
         print(f"🛠️ [TOOL_CALLED] force_refresh={force_refresh}")
         if self.current_code.strip():
-            return f"```js\n{self.current_code}\n```"
+            # Only what changed since the LLM last looked, unless it is new or heavily edited
+            result = self.code_review.review(self.current_code, self.code.version, force_full=force_refresh)
+            print(f"🛠️ [TOOL_RESULT] {len(result)} chars {self.code_review.stats}")
+            return result
         return "No code in editor yet"
 
     # @llm.function_tool(
@@ -183,9 +127,25 @@ class InterviewAssistant(Agent):
 
 
     async def llm_node(self, chat_ctx: llm.ChatContext, tools, model_settings):
-        """Minimal override - just pass through."""
+        """Trim the context to the token budget, recording LLM first/last token times for the turn."""
+        self.latency.mark("llm_start")
+        chat_ctx, report = self.context_budget.apply(
+            chat_ctx, summary=self.summarizer.digest(), summarized_ids=self.summarizer.summarized_ids
+        )
+        if report["items_compressed"] and self.code_review.base_output and not any(
+            getattr(item, "output", None) == self.code_review.base_output for item in chat_ctx.items
+        ):
+            self.code_review.forget()
+        if report["tokens_saved"]:
+            print(f"✂️ [CONTEXT_BUDGET] {report['tokens_before']} -> {report['tokens_after']} tokens "
+                  f"(saved {report['tokens_saved']}, {report['code_updates_dropped']} old code updates)")
+        first_token = True
         async for chunk in Agent.default.llm_node(self, chat_ctx, tools, model_settings):
+            if first_token:
+                self.latency.mark("llm_first_token")
+                first_token = False
             yield chunk
+        self.latency.mark("llm_last_token")
 
 
 
@@ -309,106 +269,84 @@ class InterviewAssistant(Agent):
     #         traceback.print_exc()
         
  
+    def request_end(self, reason: str):
+        """Single entry point for ending the interview; repeats join the first request"""
+        return self.lifecycle.end(reason, self.immediate_signal_and_db)
+
+    def _on_end_token(self, _arg):
+        self.request_end("end_token")
+
+    def _on_phase_token(self, phase):
+        if phase:
+            self.summarizer.advance(phase.strip().lower().replace(" ", "_").replace("-", "_"))
+
     async def tts_node(self, text_stream, model_settings):
             async def monitor_text(stream):
-                full_text = ""
+                # Strips [[END_INTERVIEW]] / [[PHASE:...]] even when split across chunks
+                scanner = ControlTokenScanner({
+                    "END_INTERVIEW": self._on_end_token,
+                    "PHASE": self._on_phase_token,
+                })
                 async for text in stream:
                     # 1. Handle potential List/Union types coming from the LLM
                     if not isinstance(text, str):
                         continue
-
-                    try:
-                        # 2. STRIP token and check for ending
-                        if re.search(r"\[\[\s*END[_ ]?INTERVIEW\s*\]\]", text, flags=re.IGNORECASE):
-                            clean_text = re.sub(r"\[\[\s*END[_ ]?INTERVIEW\s*\]\]", "", text, flags=re.IGNORECASE)
-                            # Trigger shutdown logic
-                            if not self._end_signal_event.is_set():
-                                asyncio.create_task(self.immediate_signal_and_db())
-                        else:
-                            clean_text = text.replace('[[END_INTERVIEW]]', '')
-                    except Exception:
-                        clean_text = text
-
-                    if clean_text.strip():
-                        full_text += clean_text
-
-                    yield clean_text
-
-                # 3. SEND TRANSCRIPT AFTER STREAM COMPLETES
-                if full_text.strip() and self._room:
-                    try:
-                        transcript_data = json.dumps({
-                            "type": "transcript",
-                            "role": "assistant",
-                            "content": full_text.strip()
-                        })
-                        # Use the reliable room local participant to publish
-                        await self._room.local_participant.publish_data(
-                            transcript_data.encode('utf-8'),
-                            reliable=True
-                        )
+                    clean_text = scanner.feed(text)
+                    if clean_text:
+                        yield clean_text
+                tail = scanner.flush()
+                if tail:
+                    yield tail
+
+                # 2. SEND TRANSCRIPT AFTER STREAM COMPLETES
+                full_text = scanner.text
+                if full_text.strip() and self.journal:
+                    self.journal.record("assistant", full_text)
+                if full_text.strip() and self.publisher:
+                    if self.publisher.send_transcript("assistant", full_text):
                         print(f"✅ [TTS_TRANSCRIPT_SENT] {full_text[:30]}...")
-                    except Exception as e:
-                        print(f"❌ [TTS_TRANSCRIPT_FAIL] {e}")
 
-            return Agent.default.tts_node(self, monitor_text(text_stream), model_settings)
+            return self._timed_audio(Agent.default.tts_node(self, monitor_text(text_stream), model_settings))
+
+    async def _timed_audio(self, frames):
+        first_frame = True
+        async for frame in frames:
+            if first_frame:
+                self.latency.mark("tts_first_audio")
+                first_frame = False
+            yield frame
+
+    def say_cached(self, text: str, allow_interruptions: bool = True):
+        """Speak a fixed line (no LLM) from the audio cache; returns the SpeechHandle"""
+        session = self._session
+        self.latency.mark("say_start")
+        if self.journal:
+            self.journal.record("assistant", text)
+        if self.publisher:
+            self.publisher.send_transcript("assistant", text)
+        audio = self._timed_audio(cached_audio(text, session.tts))
+        return session.say(text, audio=audio, allow_interruptions=allow_interruptions)
 
 
     async def immediate_signal_and_db(self):
-            """Fixed: Safe memory access + Backend POST + Real Transcript storage."""
+            """End sequence, run once per interview by the lifecycle: queue the
+            evaluation (LLM + Mongo + backend PUT), let the goodbye finish
+            playing, then signal the frontend and leave."""
             try:
-                print(f"🤖 [EVAL_START] Generating real evaluation for {self.session_id}")
+                print(f"🤖 [EVAL_START] Generating real evaluation for {self.session_id} "
+                      f"(ended by {self.lifecycle.end_reason})")
 
                 # 1. BUILD CONTEXT FOR EVALUATION
-                eval_context = []
-                session = getattr(self, '_session', None)
-                
-                # Accessing private _chat_ctx found in your debug logs
-                ctx_obj = getattr(session, '_chat_ctx', getattr(session, 'chat_ctx', None))
-
-                if ctx_obj and hasattr(ctx_obj, 'messages'):
-                    # Grab more history (25 turns) for a better evaluation
-                    # for msg in ctx_obj.messages[-25:]:
-                    #     try:
-                    #         # --- FIX FOR Union/List Content Error ---
-                    #         content_raw = msg.content
-                    #         if isinstance(content_raw, list):
-                    #             # Extract text from the list of ChatContent objects
-                    #             text_content = " ".join([part.text for part in content_raw if hasattr(part, 'text')])
-                    #         else:
-                    #             text_content = str(content_raw)
-
-                    #         text_content = text_content.strip()
-                            
-                    #         # Only add actual conversation, skip the raw code update blocks for the transcript
-                    #         if text_content and not text_content.startswith('CANDIDATE CODE UPDATE'):
-                    #             role = 'Candidate' if msg.role == 'user' else 'Interviewer'
-                    #             eval_context.append(f"{role}: {text_content}")
-                    #     except Exception as e:
-                    #         print(f"⚠️ [EVAL_MSG_SKIP] {e}")
-                    #         continue
-                    for msg in ctx_obj.messages[-25:]:
-                        try:
-                            # Extract text safely regardless of whether it's a string or list
-                            if isinstance(msg.content, list):
-                                text_content = " ".join([part.text for part in msg.content if hasattr(part, 'text')])
-                            else:
-                                text_content = str(msg.content)
-
-                            text_content = text_content.strip()
-                            
-                            # Skip internal markers
-                            if text_content and not text_content.startswith('CANDIDATE CODE UPDATE'):
-                                role = 'Candidate' if msg.role == llm.ChatRole.USER else 'Interviewer'
-                                eval_context.append(f"{role}: {text_content}")
-                        except Exception as e:
-                            continue
+                # Per-phase summaries were condensed while the interview ran; only the
+                # short unsummarized tail goes in verbatim, so the prompt stays bounded
+                eval_context = [self.summarizer.render()]
+                print(f"🗜️ [SUMMARY_STATS] {self.summarizer.stats()}")
                 # Add final code block to the context so LLM can grade the actual code
                 if self.current_code:
                     eval_context.append(f"\nFINAL SOURCE CODE:\n{self.current_code}")
 
                 context_str = "\n\n".join(eval_context)
-                print(f"📚 [CONTEXT] Collected {len(eval_context)} conversation items")
+                print(f"📚 [CONTEXT] Evaluation context is {len(context_str)} chars")
 
                 # 2. LLM EVALUATION PROMPT
                 eval_prompt = f"""# EVALUATION TASK
@@ -427,160 +365,225 @@ class InterviewAssistant(Agent):
     "technicalLevel": "Junior/Mid/Senior"
     }}"""
 
-                # 3. CALL GROQ SDK (Run sync call in executor)
-                loop = asyncio.get_event_loop()
-                response = await loop.run_in_executor(
-                    None,
-                    lambda: Groq(api_key=os.getenv("GROQ_API_KEY")).chat.completions.create(
-                        model="llama-3.1-8b-instant",
-                        messages=[{"role": "user", "content": eval_prompt}],
-                        temperature=0.1,
-                        response_format={ "type": "json_object" }
-                    )
-                )
-                
+                # 3. HAND OFF TO THE WORKER'S EVALUATION QUEUE
+                # The LLM call and the saves run there; the room does not wait for them
+                queued = get_evaluation_queue().submit(self.session_id, lambda: self._evaluate_and_store(eval_prompt))
+
+            except Exception as e:
+                print(f"❌ [REAL_EVAL_FATAL] {e}")
+                queued = None
+            if queued is None:
+                # Queue full or no prompt: still persist exactly once, without the LLM
+                self._fallback_task = asyncio.create_task(self._store_evaluation(dict(FALLBACK_EVALUATION)))
+
+            # 4. SIGNAL AND LEAVE ONCE THE GOODBYE HAS PLAYED (the evaluation may still be running)
+            # The frontend redirects shortly after interview_end, so it must not arrive mid-sentence
+            goodbye = None
+            if self.lifecycle.end_reason == "end_button":
+                # No LLM goodbye on this path; say the cached one
                 try:
-                    eval_raw = response.choices[0].message.content.strip()
-                    evaluation = json.loads(eval_raw)
+                    goodbye = self.say_cached(GOODBYE_TEXT, allow_interruptions=False)
                 except Exception as e:
-                    print(f"⚠️ [JSON_PARSE_FAIL] {e}")
-                    evaluation = {"strengths": ["Manual review required"]}
-
-                # 4. PREPARE PAYLOAD FOR DATABASE AND BACKEND
-                # We store the eval_context list as the 'transcripts' field
-                payload = {
-                    'status': 'evaluated',
-                    'endedAt': datetime.datetime.utcnow().isoformat(),
-                    'finalCode': self.current_code or '',
-                    'transcripts': eval_context, # THIS stores your conversation history!
-                    'evaluation': {
-                        **evaluation,
-                        'generatedAt': datetime.datetime.utcnow().isoformat()
-                    }
+                    print(f"⚠️ [GOODBYE_ERR] {e}")
+            if not await wait_for_playout(getattr(self, "_session", None), speech=goodbye):
+                print(f"⚠️ [GOODBYE_PLAYOUT_CAP] {self.session_id} still speaking, leaving anyway")
+            await self._send_end_signal()
+            self.lifecycle.leave("interview_ended")
+
+    async def _evaluate_and_store(self, eval_prompt: str):
+        """Evaluation job run by the EvaluationQueue"""
+        evaluation = await generate_evaluation(get_groq_client(), eval_prompt)
+        await self._store_evaluation(evaluation)
+
+    async def _store_evaluation(self, evaluation: dict):
+        """Flush the transcript, save the evaluation to Mongo and PUT it to the backend"""
+        try:
+            # 1. PREPARE PAYLOAD FOR DATABASE AND BACKEND
+            # The conversation lives in the transcripts journal. Flush, don't close: the
+            # goodbye (recorded when its TTS finishes) and turns spoken over it still have
+            # to land; teardown and the shutdown callback do the final close
+            transcripts = []
+            if self.journal:
+                await self.journal.flush()
+                transcripts = [
+                    {**t, 'timestamp': t['timestamp'].isoformat()}
+                    for t in await self.journal.read()
+                ]
+            payload = {
+                'status': 'evaluated',
+                'endedAt': datetime.datetime.utcnow().isoformat(),
+                'finalCode': self.current_code or '',
+                'evaluation': {
+                    **evaluation,
+                    'generatedAt': datetime.datetime.utcnow().isoformat()
                 }
+            }
 
-                # 5. UPDATE MONGODB
-                # await loop.run_in_executor(None, lambda: sessions_collection.update_one(
-                #     {"sessionId": self.session_id},
-                #     {"$set": payload}
-                # ))
-                await loop.run_in_executor(None, lambda: local_db.update_session(self.session_id, payload))
-                print("✅ [DB_SUCCESS] Evaluation and transcript saved to Mongo.")
-
-                # 6. POST TO BACKEND API
-                backend_url = os.getenv('BACKEND_URL', 'http://localhost:5000')
-                eval_endpoint = f"{backend_url}/api/sessions/{self.session_id}/evaluation"
-
-                async with aiohttp.ClientSession() as http_session:
-                    try:
-                        print(f"📡 [HTTP_POST] Sending payload to {eval_endpoint}")
-                        resp = await http_session.put(eval_endpoint, json=payload, timeout=10)
-                        if resp.status in (200, 201):
-                            print(f"✅ [BACKEND_ACCEPTED] API updated successfully")
-                        else:
-                            text = await resp.text()
-                            print(f"❌ [BACKEND_ERROR] {resp.status}: {text}")
-                    except Exception as e:
-                        print(f"❌ [HTTP_FAIL] {e}")
-
-                # 7. CLEANUP AND DISCONNECT
-                await self._send_end_signal()
-                self._end_signal_event.set()
-                asyncio.create_task(self._delayed_disconnect())
-
-            except Exception as e:
-                print(f"❌ [REAL_EVAL_FATAL] {e}")
-                await self._send_end_signal()
+            # 2. UPDATE MONGODB
+            # await loop.run_in_executor(None, lambda: sessions_collection.update_one(
+            #     {"sessionId": self.session_id},
+            #     {"$set": payload}
+            # ))
+            await get_async_db().update_session(self.session_id, payload)
+            print("✅ [DB_SUCCESS] Evaluation saved to Mongo (transcript turns are in the journal).")
+
+            # 3. PUT TO BACKEND API THROUGH THE OUTBOX
+            # Stored on disk first, then delivered with retries; a slow or down backend
+            # no longer holds up (or loses) the evaluation
+            # Backend results page reads transcripts from the session document
+            await get_outbox().enqueue(
+                f"evaluation-{self.session_id}", "PUT", evaluation_url(self.session_id),
+                {**payload, 'transcripts': transcripts},
+            )
+        except Exception as e:
+            print(f"❌ [EVAL_STORE_ERR] {e}")
+        finally:
+            self.lifecycle.advance(EVALUATED)
 
     async def _send_end_signal(self):
         """Extracted signal logic for reuse."""
         try:
-            if self._room:
-                payload = json.dumps({"type": "interview_end", "sessionId": self.session_id})
-                await self._room.local_participant.publish_data(payload.encode('utf-8'), reliable=True)
-                print("✅ [SIGNAL_SENT] Frontend notified")
+            if self.publisher:
+                if await self.publisher.send_control({"type": "interview_end", "sessionId": self.session_id}):
+                    print("✅ [SIGNAL_SENT] Frontend notified")
         except Exception as e:
             print(f"❌ [SIGNAL_ERR] {e}")
 
-    async def _delayed_disconnect(self):
+# Job shutdown: wait for a queued evaluation, then one last outbox delivery attempt
+EVAL_SHUTDOWN_GRACE = float(os.getenv("EVAL_SHUTDOWN_GRACE", "20"))
+OUTBOX_SHUTDOWN_GRACE = float(os.getenv("OUTBOX_SHUTDOWN_GRACE", "3"))
+# The pool kills a job process that has not finished shutting down within this
+# (SDK default 10s), so it has to outlast both graces plus the outbox close
+SHUTDOWN_PROCESS_TIMEOUT = float(os.getenv(
+    "SHUTDOWN_PROCESS_TIMEOUT", str(EVAL_SHUTDOWN_GRACE + OUTBOX_SHUTDOWN_GRACE + OUTBOX_CLOSE_TIMEOUT + 5)
+))
+
+# AGENT_JOB_EXECUTOR=thread runs several interviews per process (see SessionRegistry)
+server = AgentServer(
+    job_executor_type=JobExecutorType.THREAD
+    if os.getenv("AGENT_JOB_EXECUTOR") == "thread" else JobExecutorType.PROCESS,
+    shutdown_process_timeout=SHUTDOWN_PROCESS_TIMEOUT,
+    # WorkerLoad scales its terms to this, so the worker is full at WORKER_MAX_SESSIONS
+    load_threshold=WORKER_LOAD_THRESHOLD,
+)
+
+# Provider endpoints the voice pipeline talks to on every session
+PROVIDER_URLS = [
+    os.getenv("DEEPGRAM_BASE_URL", "https://api.deepgram.com"),
+    os.getenv("GROQ_BASE_URL", "https://api.groq.com"),
+]
+
+
+# Seconds prewarm may spend on Mongo (the SDK's initialize_process_timeout is 10)
+PREWARM_DB_BUDGET = float(os.getenv("PREWARM_DB_BUDGET", "4"))
+
+
+def prewarm(proc: JobProcess):
+    """Runs once per worker process before it accepts jobs."""
+    started = time.monotonic()
+    # Served by the main process's /metrics (see serve_metrics)
+    start_metrics_export()
+    proc.userdata["vad"] = silero.VAD.load()
+    # Mongo warmup shares one short deadline: a slow or unreachable server must not
+    # outlast initialize_process_timeout. Indexes are ensured once by the main process
+    # (see ensure_indexes_once), and caches that could not be preloaded fill on first use
+    db = get_db()
+    with pymongo.timeout(PREWARM_DB_BUDGET):
+        if db.warm_pool():
+            db.preload_questions()
+            db.preload_kits()
+    for url in PROVIDER_URLS:
+        host = urlparse(url).hostname
         try:
-            await asyncio.sleep(6)
-            if self._room:
-                try:
-                    await self._room.disconnect()
-                    print("🔌 [DISCONNECT] Room disconnected after delayed wait")
-                except Exception as e:
-                    print(f"❌ [DISCONNECT_ERR] {e}")
-        except Exception as e:
-            print(f"❌ [DELAYED_DISCONNECT_FATAL] {e}")
+            socket.getaddrinfo(host, 443, type=socket.SOCK_STREAM)
+        except OSError as e:
+            print(f"⚠️ [DNS_WARM_ERR] {host}: {e}")
+    print(f"🔥 [PREWARM] Worker ready in {time.monotonic() - started:.2f}s")
 
-    async def perform_evaluation_and_close(self, chat_ctx: llm.ChatContext):
-        """Save final state, signal frontend, and gracefully disconnect the room."""
-        try:
-            print(f"🚀 [START_SHUTDOWN] Sequence initiated for {self.session_id}")
 
-            # 1. GENERATE EVALUATION (Simplified placeholder or LLM pass can be added)
-            print("DEBUG: [EVAL] Preparing evaluation payload (placeholder)")
-            eval_placeholder = {"strengths": ["Completed interview"], "improvements": [], "edgeCases": [], "nextSteps": []}
+# Budget for creating the lookup indexes when the worker starts
+INDEX_ENSURE_BUDGET = float(os.getenv("INDEX_ENSURE_BUDGET", "10"))
 
-            # 2. UPDATE DATABASE with evaluation
-            try:
-                loop = asyncio.get_event_loop()
-                # await loop.run_in_executor(None, lambda: sessions_collection.update_one(
-                #     {"sessionId": self.session_id},
-                #     {"$set": {
-                #         "status": "completed",
-                #         "finalCode": self.current_code,
-                #         "evaluation": eval_placeholder,
-                #         "completedAt": True
-                #     }}
-                # ))
-                update_data = {
-                    "status": "completed",
-                    "finalCode": self.current_code,
-                    "evaluation": eval_placeholder,
-                    "completedAt": True
-                }
-                await loop.run_in_executor(None, lambda: local_db.update_session(self.session_id, update_data))
-                print("✅ [DB_SUCCESS] Evaluation and status saved.")
-            except Exception as e:
-                print(f"❌ [DB_ERR] {e}")
 
-            # 3. SIGNAL FRONTEND that interview ended
-            if self._room:
-                try:
-                    end_payload = json.dumps({"type": "interview_end", "sessionId": self.session_id})
-                    print(f"DEBUG: [SIGNAL_SEND] Sending payload: {end_payload}")
-                    await self._room.local_participant.publish_data(end_payload.encode('utf-8'), reliable=True)
-                    print("✅ [DATA] interview_end sent to frontend")
-                except Exception as e:
-                    print(f"❌ [DATA_SEND_ERR] {e}")
+def _ensure_indexes_bounded():
+    with pymongo.timeout(INDEX_ENSURE_BUDGET):
+        get_db().ensure_indexes()
 
-            # 4. WAIT & DISCONNECT
-            print("DEBUG: [SLEEP] Waiting 5s for TTS audio to clear...")
-            await asyncio.sleep(5)
-            if self._room:
-                try:
-                    print("🔌 [DISCONNECT] Leaving room now")
-                    await self._room.disconnect()
-                    print("🔌 [ROOM] Agent disconnected successfully.")
-                except Exception as e:
-                    print(f"❌ [ROOM_DISCONNECT_ERR] {e}")
+
+def ensure_indexes_once(*_):
+    """Once per worker, in the main process and off its event loop (never in per-job prewarm)"""
+    asyncio.get_running_loop().run_in_executor(None, _ensure_indexes_bounded)
+
+
+def serve_metrics(*_):
+    """One /metrics per worker, in the main process, covering every job process"""
+    start_metrics_server()
+
+
+server.setup_fnc = prewarm
+server.on("worker_started", ensure_indexes_once)
+server.on("worker_started", serve_metrics)
+# Dispatch by active interviews, loop lag and CPU; SIGUSR1 / WORKER_DRAIN_FILE drains
+worker_load = WorkerLoad()
+worker_load.install(server)
+# Backend notifications a job could not deliver are retried from the main process
+install_sender(server)
+worker_metrics.gauge("interview_active_sessions", lambda: len(registry), "Interviews running in this process")
+
+
+async def warm_provider_connections():
+    """Open TCP+TLS to the providers on the job's shared HTTP session while we
+    wait for the candidate, so the first STT/TTS request skips the handshake."""
+    http = utils.http_context.http_session()
+    for url in PROVIDER_URLS:
+        try:
+            async with http.head(url, timeout=aiohttp.ClientTimeout(total=3)) as resp:
+                print(f"🔥 [PROVIDER_WARM] {url} -> {resp.status}")
         except Exception as e:
-            print(f"❌ [PERFORM_CLOSE_FATAL] {e}")
+            print(f"⚠️ [PROVIDER_WARM_ERR] {url}: {e}")
+
+
+def build_agent_session(proc: JobProcess) -> AgentSession:
+    """Per-session pipeline; the VAD model comes preloaded from prewarm."""
+    vad = proc.userdata.get("vad") or silero.VAD.load()
+    return AgentSession(
+        vad=vad,
+        stt=deepgram.STT(model="nova-2"),
+        # llm=groq.LLM(model="llama-3.1-8b-instant"),
+        llm=groq.LLM(model="llama-3.3-70b-versatile"),
+        # Synthesize clause by clause so speech starts before the LLM finishes
+        tts=wrap_tts(create_tts())
+        # tts=elevenlabs.TTS(
+        #     api_key=os.getenv("ELEVENLABS_API_KEY"),
+        #     # model="eleven_multilingual_v2",
+        #     model="eleven_multilingual_v2",
+        #     voice_id=os.getenv("ELEVENLABS_VOICE_ID")
+        # )
+    )
 
-server = AgentServer()
 
 @server.rtc_session()
 async def entrypoint(ctx: JobContext):
     await ctx.connect()
-    _active_tasks = set()   
+    loop_monitor.watch()
+    ctx.add_shutdown_callback(loop_monitor.stop)
+    async_db = get_async_db()
+    async_db.ensure_question_watch()
+    # Warm the Mongo pool and provider connections while the candidate joins
+    warmup = asyncio.gather(async_db.warm(), warm_provider_connections(), return_exceptions=True)
     candidate = await ctx.wait_for_participant()
-    global CURRENT_ROOM
-    CURRENT_ROOM = ctx.room
+    publisher = OutboundPublisher(ctx.room)
+    publisher.start()
+    ctx.add_shutdown_callback(publisher.close)
+    # Room-scoped routing so several interviews can share this process
+    session_key = ctx.room.name
+    handle = registry.register(session_key, ctx.room, publisher)
+
+    async def _unregister():
+        registry.unregister(session_key)
+
+    ctx.add_shutdown_callback(_unregister)
 
-    loop = asyncio.get_event_loop()
-    local_db.print_all_sessions()
     # Resolve Session ID
     session_id = ctx.room.name.replace("interview-", "")
     if ctx.room.metadata:
@@ -589,30 +592,30 @@ async def entrypoint(ctx: JobContext):
             session_id = metadata_json.get("sessionId", session_id)
         except: pass
 
+    handle.session_id = session_id
     print(f"🚀 [START] Processing Session: {session_id}")
 
     full_question_data = None
+    kit = None
     try:
-        session_doc = None
-        # Increase attempts to 5 for better stability
-        for attempt in range(5):
-            session_doc = await loop.run_in_executor(None, lambda: local_db.get_session(session_id))
-            if session_doc:
-                print(f"✅ [DB_HIT] Session document found on attempt {attempt+1}")
-                break
-            print(f"⏳ [DB_RETRY] Session '{session_id}' not found, retrying...")
-            await asyncio.sleep(1.5)
-        
+        # Resolves as soon as the backend inserts the session, with a hard deadline
+        session_doc = await async_db.wait_for_session(
+            session_id, deadline=float(os.getenv("SESSION_WAIT_DEADLINE", "8"))
+        )
+
         if session_doc:
             meta = session_doc.get('metadata', {})
             q_id = meta.get('questionId')
             print(f"🔖 [METADATA] Extracted questionId: {q_id}")
             
             if q_id:
-                full_question_data = await loop.run_in_executor(None, lambda: local_db.get_question_by_id(q_id))
+                full_question_data, kit = await asyncio.gather(
+                    async_db.get_question_by_id(q_id), async_db.get_interview_kit(q_id)
+                )
+                print(f"📦 [QUESTION_CACHE] {question_cache.stats()} [KIT_CACHE] {kit_cache.stats()}")
         else:
-            print(f"❌ [DB_FAIL] Session '{session_id}' completely missing from DB after 5 tries.")
-            debug = local_db.get_debug_info()
+            print(f"❌ [DB_FAIL] Session '{session_id}' missing from DB after waiting.")
+            debug = await async_db.get_debug_info()
             print(f"💡 [DIAGNOSTIC] DB Status: {debug}")
 
     except Exception as e:
@@ -628,26 +631,38 @@ async def entrypoint(ctx: JobContext):
             "exampleOutput": "the expected output",
         }
 
-    print(f"📝 [PROMPT_PREP] Preparing AI Athena for problem: {full_question_data.get('title')}")
+    kit = usable_kit(kit, full_question_data)
+    print(f"📝 [PROMPT_PREP] Preparing AI Athena for problem: {full_question_data.get('title')} "
+          f"({'prebuilt kit' if kit else 'no kit, rendering instructions'})")
 
-    assistant = InterviewAssistant(full_question_data, ctx.room, session_id=session_id)
+    assistant = InterviewAssistant(full_question_data, ctx.room, session_id=session_id, publisher=publisher, kit=kit)
+    handle.assistant = assistant
+    journal = TranscriptJournal(async_db, session_id)
+    assistant.journal = journal
+    ctx.add_shutdown_callback(journal.close)
 
-    session = AgentSession(
-        vad=silero.VAD.load(),
-        stt=deepgram.STT(model="nova-2"),
-        # llm=groq.LLM(model="llama-3.1-8b-instant"),
-        llm=groq.LLM(model="llama-3.3-70b-versatile"),
-        tts=deepgram.TTS(
-            model="aura-asteria-en",
-            api_key=os.getenv("DEEPGRAM_API_KEY")
-        )
-        # tts=elevenlabs.TTS(
-        #     api_key=os.getenv("ELEVENLABS_API_KEY"),
-        #     # model="eleven_multilingual_v2",
-        #     model="eleven_multilingual_v2",
-        #     voice_id=os.getenv("ELEVENLABS_VOICE_ID")
-        # )
-    )
+    async def _save_latency_summary():
+        assistant.latency.finish_turn()
+        try:
+            await async_db.update_session(session_id, {"latencySummary": assistant.latency.summary()})
+        except Exception as e:
+            print(f"❌ [LATENCY_SAVE_ERR] {e}")
+
+    ctx.add_shutdown_callback(_save_latency_summary)
+    ctx.add_shutdown_callback(assistant.summarizer.close)
+
+    async def _finish_evaluation():
+        # The room is already gone; only keep the job alive long enough for a running evaluation
+        lifecycle = assistant.lifecycle
+        if lifecycle.end_reason and not await lifecycle.wait_for(EVALUATED, EVAL_SHUTDOWN_GRACE):
+            print(f"⚠️ [EVAL_UNFINISHED] {session_id} still evaluating at job shutdown")
+        lifecycle.advance(CLOSED)
+        # One quick delivery attempt; anything left is retried by the worker's main process
+        await get_outbox().close(grace=OUTBOX_SHUTDOWN_GRACE)
+
+    ctx.add_shutdown_callback(_finish_evaluation)
+
+    session = build_agent_session(ctx.proc)
     # PRINT ALL ATTRIBUTES TO SEE THE REAL NAME
     print(f"DEBUG: Session attributes: {dir(session)}")
     # Keep a reference to the session on the assistant so hidden evaluation can access chat_ctx
@@ -665,17 +680,8 @@ async def entrypoint(ctx: JobContext):
         else:
             text = str(content)
 
-        if text.strip():
+        if text.strip() and publisher.send_transcript("assistant", text):
             print(f"🎙️ [AGENT_TRANSCRIPT] Sending: {text[:50]}...")
-            payload = json.dumps({
-                "type": "transcript",
-                "role": "assistant",
-                "content": text.strip()
-        })
-        # Use the loop to ensure it doesn't get lost in async transitions
-        asyncio.get_event_loop().call_soon_threadsafe(
-            lambda: asyncio.create_task(ctx.room.local_participant.publish_data(payload.encode('utf-8'), reliable=True))
-        )
     # --- DATA CHANNEL LISTENER: Listen for 'request_end' packets from frontend ---
     @ctx.room.on("data_received")
     def on_data_received(packet: rtc.DataPacket):
@@ -683,19 +689,29 @@ async def entrypoint(ctx: JobContext):
             payload = json.loads(packet.data.decode('utf-8'))
             if payload.get("type") == "request_end":
                 print(f"🛑 [SIGNAL] User clicked End Interview button for {session_id}")
-                # Use the SAME logic used for the voice END token
-                # We wrap it in a task so it doesn't block the data thread
-                asyncio.create_task(assistant.immediate_signal_and_db())
+                # Same single-flight path as the voice END token; repeated clicks join it
+                assistant.request_end("end_button")
         except Exception as e:
             print(f"❌ [DATA_PARSE_ERR] {e}")
 
     async def handle_code_stream(reader: rtc.TextStreamReader, participant_identity: str):
-            """Simply store the code. Do not inject into context or trigger LLM."""
+            """Apply a versioned snapshot/patch. Do not inject into context or trigger LLM."""
             try:
-                code_content = await reader.read_all()
+                message = await reader.read_all()
+                result = assistant.code.receive(message)
+                if result == "gap":
+                    if assistant.code.should_request_resync():
+                        print(f"🔁 [CODE_RESYNC] gap after v{assistant.code.version}, requesting snapshot")
+                        await publisher.send_control({"type": "code_resync", "version": assistant.code.version})
+                    return
+                if result == "duplicate":
+                    return
                 # Store in assistant memory for the tool to pick up
-                assistant.current_code = code_content
-                print(f"📝 [CODE_STORED] {len(code_content)} chars buffered")
+                assistant.current_code = assistant.code.text
+                if assistant.current_code.strip():
+                    assistant.summarizer.note_code()
+                print(f"📝 [CODE_STORED] v{assistant.code.version} {result} "
+                      f"({len(message)} bytes, {len(assistant.current_code)} chars)")
             except Exception as e:
                 print(f"💥 [STREAM_ERROR] {e}")
 
@@ -810,9 +826,7 @@ async def entrypoint(ctx: JobContext):
 
     def stream_callback(reader, participant_identity):
         """Wrapper to bridge sync callback to async handler."""
-        task = asyncio.create_task(handle_code_stream(reader, participant_identity))
-        _active_tasks.add(task)
-        task.add_done_callback(_active_tasks.discard)
+        assistant.lifecycle.spawn(handle_code_stream(reader, participant_identity))
 
     # Register the handler on the topic 'code-update'
     ctx.room.register_text_stream_handler("code-update", stream_callback)
@@ -822,53 +836,48 @@ async def entrypoint(ctx: JobContext):
     @session.on("agent_state_changed")
     def on_state_change(ev):
         try:
-            # Broadcast the agent's state to the frontend
-            state_payload = json.dumps({
-                "type": "state",
-                "state": str(ev.new_state).split('.')[-1].lower()
-            })
-            asyncio.create_task(ctx.room.local_participant.publish_data(
-                state_payload.encode('utf-8'),
-                reliable=True
-            ))
+            # Broadcast the agent's state to the frontend (rapid changes coalesce)
+            publisher.send_state(str(ev.new_state).split('.')[-1].lower())
             # Keep a local copy of the agent state on the assistant for sync checks
             try:
+                old_state = assistant._agent_state
                 assistant._agent_state = str(ev.new_state).split('.')[-1].lower()
+                if old_state == "speaking" and assistant._agent_state == "listening":
+                    assistant.latency.mark("playout_end")
+                    assistant.latency.finish_turn()
             except Exception:
                 pass
         except Exception as e:
             print(f"❌ [STATE_BROADCAST_ERROR] {e}")
         print(f"🧠 AI STATE: {ev.old_state} -> {ev.new_state}")
 
+    @session.on("user_state_changed")
+    def on_user_state(ev):
+        new_state = str(ev.new_state).split('.')[-1].lower()
+        if new_state == "speaking":
+            assistant.latency.begin_turn()
+        elif new_state == "listening":
+            # VAD end of speech
+            assistant.latency.mark("user_speech_end")
+
+    @session.on("user_input_transcribed")
+    def on_user_input_transcribed(ev):
+        if getattr(ev, "is_final", False):
+            assistant.latency.mark("stt_final")
+
     @session.on("user_speech_committed")
     def on_user_speech(msg: llm.ChatMessage):
         """Broadcast the user's transcript to the frontend when they finish speaking."""
         # This print MUST show up in your terminal for the data to reach the frontend
         print(f"🎯 [EVENT_TRIGGERED] user_speech_committed: {getattr(msg, 'content', None)}")
+        assistant.latency.mark("stt_final")
         # assistant.last_user_speech = asyncio.get_event_loop().time()
         # print(f"🗣️ [SILENCE_RESET] User spoke. Timer reset.")
         try:
             if isinstance(msg.content, str) and msg.content.strip():
                 text = msg.content.strip()
-                payload = json.dumps({
-                    "type": "transcript",
-                    "role": "user",
-                    "content": text
-                })
-
-                print(f"📡 [DATA_SENDING] User transcript: {text[:120]}")
-
-                async def broadcast():
-                    try:
-                        await ctx.room.local_participant.publish_data(
-                            payload.encode('utf-8'),
-                            reliable=True
-                        )
-                        print(f"✅ [BROADCAST_SUCCESS] User transcript sent to frontend")
-                    except Exception as e:
-                        print(f"❌ [BROADCAST_ERROR] {e}")
-
-                asyncio.create_task(broadcast())
+                if publisher.send_transcript("user", text):
+                    print(f"📡 [DATA_SENDING] User transcript: {text[:120]}")
         except Exception as e:
             print(f"❌ [BROADCAST_EXCEPTION] {e}")
 
@@ -885,86 +894,54 @@ async def entrypoint(ctx: JobContext):
 
             if text and isinstance(text, str) and text.strip():
                 print(f"📢 [STT_FINISHED] {text}")
-                payload = json.dumps({
-                    "type": "transcript",
-                    "role": "user",
-                    "content": text.strip()
-                })
-
-                async def broadcast_final():
-                    try:
-                        await ctx.room.local_participant.publish_data(
-                            payload.encode('utf-8'),
-                            reliable=True
-                        )
-                        print(f"✅ [FINAL_BROADCAST] User transcript delivered")
-                    except Exception as e:
-                        print(f"❌ [FINAL_BROADCAST_FAILED] {e}")
-
-                asyncio.create_task(broadcast_final())
+                publisher.send_transcript("user", text)
         except Exception as e:
             print(f"❌ [STT_FALLBACK_ERROR] {e}")
 
-    await session.start(room=ctx.room, agent=assistant)
-    await asyncio.sleep(0.5)
-    # Start a background task to monitor chat_ctx for new user messages
-    async def monitor_chat_context():
-        try:
-            last_index = len(session.chat_ctx.messages) if hasattr(session, 'chat_ctx') and session.chat_ctx else 0
-            print(f"🔎 [CHAT_CTX_MONITOR] starting at index {last_index}")
-            while True:
-                await asyncio.sleep(0.5)
-                try:
-                    if not hasattr(session, 'chat_ctx') or not session.chat_ctx:
-                        continue
-                    msgs = session.chat_ctx.messages
-                    if len(msgs) > last_index:
-                        # process new messages
-                        for m in msgs[last_index:]:
-                            try:
-                                role = getattr(m, 'role', None)
-                                content = getattr(m, 'content', None)
-                                if role == 'user' and isinstance(content, str) and content.strip():
-                                    # avoid echoing code update entries
-                                    if content.strip().startswith('CANDIDATE CODE'):
-                                        continue
-                                    print(f"📣 [CHAT_CTX_NEW_USER] {content[:120]}")
-                                    payload = json.dumps({
-                                        "type": "transcript",
-                                        "role": "user",
-                                        "content": content.strip()
-                                    })
-
-                                    async def _b():
-                                        try:
-                                            await ctx.room.local_participant.publish_data(
-                                                payload.encode('utf-8'),
-                                                reliable=True
-                                            )
-                                            print("✅ [CHAT_CTX_BROADCAST] user message forwarded")
-                                        except Exception as e:
-                                            print(f"❌ [CHAT_CTX_BROADCAST_FAIL] {e}")
-
-                                    asyncio.create_task(_b())
-                            except Exception as me:
-                                print(f"❌ [CHAT_CTX_MSG_ERROR] {me}")
-                        last_index = len(msgs)
-                except Exception as e:
-                    print(f"❌ [CHAT_CTX_LOOP_ERROR] {e}")
-        except asyncio.CancelledError:
-            print("🔒 [CHAT_CTX_MONITOR] cancelled")
-        except Exception as e:
-            print(f"❌ [CHAT_CTX_MONITOR_FATAL] {e}")
+    # Forward committed user turns as the SDK adds them; no polling while idle
+    def on_user_message(text: str):
+        print(f"📣 [CHAT_CTX_NEW_USER] {text[:120]}")
+        journal.record("user", text)
+        if publisher.send_transcript("user", text):
+            print("✅ [CHAT_CTX_BROADCAST] user message forwarded")
+
+    def on_conversation_item(item):
+        # Feed finished turns to the rolling summary; code updates are not turns
+        role = message_role(item)
+        text = message_text(item)
+        if role in ("user", "assistant") and not text.startswith("CANDIDATE CODE"):
+            assistant.summarizer.add(role, text, item_id=getattr(item, "id", None))
+
+    conversation_tail = ConversationTail(session, on_user_message, on_item=on_conversation_item)
+    conversation_tail.attach()
+    ctx.room.on("disconnected", conversation_tail.close)
+    # The candidate closing the tab ends the job the same way as a finished interview
+    ctx.room.on("disconnected", lambda *_: assistant.lifecycle.leave("room_disconnected"))
 
-    asyncio.create_task(monitor_chat_context())
+    await session.start(room=ctx.room, agent=assistant)
+    journal.start()
     
-    # Initial Greeting
-    await session.generate_reply(
-        instructions=f"Introduce yourself as Athena and askk candidate weather he is ready to discuss the problem '{full_question_data.get('title')}'."
-    )
-
-    while True:
-        await asyncio.sleep(1)
+    # Initial Greeting: a fixed line per question, played from the audio cache (no LLM turn).
+    # With a kit the explanation script follows from the cache too, so phase 1 needs no LLM either
+    await assistant.say_cached(greeting_text(full_question_data, kit))
+    if kit:
+        await assistant.say_cached(kit["explanation"])
+
+    # Run until the interview ends or the room goes away, then free the worker slot
+    reason = await assistant.lifecycle.wait_leave()
+    print(f"🧹 [TEARDOWN] {session_id}: {reason}")
+    cancelled = await assistant.lifecycle.cancel_tasks()
+    conversation_tail.close()
+    warmup.cancel()
+    await journal.flush()
+    await publisher.drain()
+    try:
+        await session.aclose()
+    except Exception as e:
+        print(f"❌ [SESSION_CLOSE_ERR] {e}")
+    # Shutdown callbacks (evaluation grace, stats, journal close) run after we return
+    ctx.shutdown(reason=reason)
+    print(f"✅ [TEARDOWN_DONE] {session_id}: cancelled {cancelled} session tasks")
 
 if __name__ == "__main__":
     from livekit.agents import cli
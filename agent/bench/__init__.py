@@ -0,0 +1,3 @@
+"""
+Offline benchmarks for the interview agent (no LiveKit, providers or MongoDB needed)
+"""
@@ -0,0 +1,379 @@
+"""
+Deterministic local stand-ins for LiveKit, the AI providers and MongoDB.
+
+Timing is configurable so the harness can model provider latency without
+any network access.
+"""
+
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Optional, Dict, Any, List
+import asyncio
+import json
+import time
+import uuid
+
+from livekit import rtc
+from livekit.agents import llm, tts, AgentSession, DEFAULT_API_CONNECT_OPTIONS
+from livekit.agents.voice import io
+
+from context_budget import item_tokens
+
+
+# --- LiveKit room ---------------------------------------------------------
+
+class FakeLocalParticipant:
+    """Counts every packet and byte the agent publishes"""
+
+    def __init__(self):
+        self.identity = "agent"
+        self.packets: List[Dict[str, Any]] = []
+        self.bytes_published = 0
+
+    async def publish_data(self, payload, reliable: bool = True, **kwargs):
+        data = payload.encode("utf-8") if isinstance(payload, str) else bytes(payload)
+        self.bytes_published += len(data)
+        try:
+            self.packets.append(json.loads(data))
+        except ValueError:
+            self.packets.append({"raw": len(data)})
+
+
+class FakeTextStreamReader:
+    """Replays one text stream (e.g. a code-update) to a registered handler"""
+
+    def __init__(self, text: str, topic: str, attributes: Optional[Dict[str, str]] = None, chunk_size: int = 4096):
+        self._text = text
+        self._chunk_size = chunk_size
+        self.info = SimpleNamespace(topic=topic, attributes=attributes or {}, id=str(uuid.uuid4()))
+
+    async def read_all(self) -> str:
+        return self._text
+
+    async def __aiter__(self):
+        for i in range(0, len(self._text), self._chunk_size):
+            yield self._text[i:i + self._chunk_size]
+
+
+class FakeRoom:
+    """Just enough of rtc.Room for the entrypoint wiring"""
+
+    def __init__(self, name: str, metadata: Optional[str] = None):
+        self.name = name
+        self.metadata = metadata
+        self.local_participant = FakeLocalParticipant()
+        self.text_handlers: Dict[str, Any] = {}
+        self._listeners = defaultdict(list)
+        self._connected = True
+
+    def on(self, event: str, callback=None):
+        if callback is None:
+            def decorator(fn):
+                self._listeners[event].append(fn)
+                return fn
+            return decorator
+        self._listeners[event].append(callback)
+        return callback
+
+    def off(self, event: str, callback):
+        if callback in self._listeners[event]:
+            self._listeners[event].remove(callback)
+
+    def emit(self, event: str, *args):
+        for callback in list(self._listeners[event]):
+            callback(*args)
+
+    def register_text_stream_handler(self, topic: str, handler):
+        self.text_handlers[topic] = handler
+
+    def send_text(self, topic: str, text: str, attributes: Optional[Dict[str, str]] = None):
+        handler = self.text_handlers.get(topic)
+        if handler:
+            handler(FakeTextStreamReader(text, topic, attributes), "candidate")
+
+    def send_data(self, payload: Dict[str, Any]):
+        self.emit("data_received", SimpleNamespace(data=json.dumps(payload).encode("utf-8"), participant=None, topic=None))
+
+    def isconnected(self) -> bool:
+        return self._connected
+
+    async def disconnect(self):
+        if self._connected:
+            self._connected = False
+            self.emit("disconnected")
+
+
+class FakeProc:
+    def __init__(self, userdata: Optional[Dict[str, Any]] = None):
+        self.userdata = userdata if userdata is not None else {}
+
+
+class FakeJobContext:
+    """Stands in for JobContext: no connection, shutdown callbacks run by the harness"""
+
+    def __init__(self, room: FakeRoom, proc: Optional[FakeProc] = None):
+        self.room = room
+        self.proc = proc or FakeProc()
+        self.job = SimpleNamespace(id=f"bench-{room.name}")
+        self._shutdown_callbacks = []
+
+    async def connect(self, **kwargs):
+        return None
+
+    async def wait_for_participant(self, **kwargs):
+        return SimpleNamespace(identity="candidate")
+
+    def add_shutdown_callback(self, callback):
+        self._shutdown_callbacks.append(callback)
+
+    def shutdown(self, reason: str = ""):
+        self.room._connected = False
+
+    async def run_shutdown_callbacks(self):
+        for callback in self._shutdown_callbacks:
+            try:
+                result = callback()
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                print(f"⚠️ [BENCH_SHUTDOWN_CB] {e}")
+
+
+# --- MongoDB --------------------------------------------------------------
+
+class FakeAsyncDatabase:
+    """In-memory AsyncDatabase that counts operations by name"""
+
+    def __init__(self, sessions: Dict[str, Dict[str, Any]], questions: Dict[str, Dict[str, Any]], latency: float = 0.002):
+        self.sessions = sessions
+        self.questions = questions
+        self.kits: Dict[str, Dict[str, Any]] = {}
+        self.transcripts: List[Dict[str, Any]] = []
+        self.latency = latency
+        self.ops: Dict[str, int] = defaultdict(int)
+
+    async def _op(self, name: str):
+        self.ops[name] += 1
+        await asyncio.sleep(self.latency)
+
+    async def warm(self):
+        await self._op("warm")
+        return True
+
+    def ensure_question_watch(self):
+        pass
+
+    async def get_session(self, session_id, timeout=None, projection=None):
+        await self._op("get_session")
+        return self.sessions.get(session_id)
+
+    async def wait_for_session(self, session_id, deadline=8.0):
+        return await self.get_session(session_id)
+
+    async def get_question_by_id(self, question_id, timeout=None):
+        await self._op("get_question_by_id")
+        return self.questions.get(question_id)
+
+    async def get_interview_kit(self, question_id, timeout=None):
+        await self._op("get_interview_kit")
+        return self.kits.get(question_id)
+
+    async def get_debug_info(self, timeout=None):
+        await self._op("get_debug_info")
+        return {"total_sessions": len(self.sessions)}
+
+    async def update_session(self, session_id, update_data, timeout=None):
+        await self._op("update_session")
+        self.sessions.setdefault(session_id, {}).update(update_data)
+        return True
+
+    async def insert_transcripts(self, entries, timeout=None):
+        await self._op("insert_transcripts")
+        self.transcripts.extend(entries)
+        return len(entries)
+
+    async def get_transcript(self, session_id, timeout=None):
+        await self._op("get_transcript")
+        return [
+            {"role": t["role"], "content": t["content"], "timestamp": t["timestamp"]}
+            for t in self.transcripts if t["sessionId"] == session_id
+        ]
+
+    def total_ops(self) -> int:
+        return sum(self.ops.values())
+
+
+# --- LLM ------------------------------------------------------------------
+
+class ScriptedLLM(llm.LLM):
+    """Replies from a script, streamed word by word at a fixed token rate
+    after a fixed time-to-first-token."""
+
+    def __init__(self, replies: List[str], ttft: float = 0.35, tokens_per_sec: float = 250.0,
+                 fallback: str = "Okay, tell me more about your approach"):
+        super().__init__()
+        self._replies = list(replies)
+        self.ttft = ttft
+        self.tokens_per_sec = tokens_per_sec
+        self.fallback = fallback
+        self.calls = 0
+        # Estimated prompt tokens sent over all calls (instructions included)
+        self.prompt_tokens = 0
+
+    def queue_reply(self, text: str):
+        self._replies.append(text)
+
+    def chat(self, *, chat_ctx, tools=None, conn_options=DEFAULT_API_CONNECT_OPTIONS, **kwargs):
+        self.calls += 1
+        self.prompt_tokens += sum(item_tokens(item) for item in chat_ctx.items)
+        reply = self._replies.pop(0) if self._replies else self.fallback
+        return _ScriptedLLMStream(self, reply, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options)
+
+
+class _ScriptedLLMStream(llm.LLMStream):
+    def __init__(self, owner: ScriptedLLM, reply: str, *, chat_ctx, tools, conn_options):
+        super().__init__(owner, chat_ctx=chat_ctx, tools=tools, conn_options=conn_options)
+        self._owner = owner
+        self._reply = reply
+
+    async def _run(self):
+        request_id = str(uuid.uuid4())
+        await asyncio.sleep(self._owner.ttft)
+        words = self._reply.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(1.0 / self._owner.tokens_per_sec)
+            token = word if i == 0 else f" {word}"
+            self._event_ch.send_nowait(
+                llm.ChatChunk(id=request_id, delta=llm.ChoiceDelta(role="assistant", content=token))
+            )
+
+
+class FakeGroq:
+    """Stand-in for groq.AsyncGroq used by the evaluation step"""
+
+    def __init__(self, latency: float = 0.4, **kwargs):
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self.calls = 0
+        # JSON-mode calls are evaluations; the rest are rolling summaries
+        self.evaluations = 0
+
+    async def _create(self, **kwargs):
+        self.calls += 1
+        if kwargs.get("response_format", {}).get("type") == "json_object":
+            self.evaluations += 1
+        await asyncio.sleep(self.latency)
+        content = json.dumps({
+            "strengths": ["Clear explanation"], "improvements": ["Edge cases"],
+            "edgeCases": ["Empty input"], "nextSteps": ["Practice"],
+            "overallScore": "B", "technicalLevel": "Mid",
+        })
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+# --- STT ------------------------------------------------------------------
+
+class ScriptedSTT:
+    """Delivers recorded user turns the way VAD + STT would: the user stops
+    speaking, and the final transcript follows after `final_delay`.
+
+    It emits the same session events the real pipeline does, so the
+    entrypoint's handlers run unchanged, then commits the text as user input.
+    """
+
+    def __init__(self, final_delay: float = 0.25):
+        self.final_delay = final_delay
+
+    async def speak(self, session: AgentSession, text: str):
+        session.emit("user_state_changed", SimpleNamespace(old_state="listening", new_state="speaking"))
+        session.emit("user_state_changed", SimpleNamespace(old_state="speaking", new_state="listening"))
+        await asyncio.sleep(self.final_delay)
+        session.emit("user_input_transcribed", SimpleNamespace(transcript=text, is_final=True))
+        return session.generate_reply(user_input=text)
+
+
+# --- TTS ------------------------------------------------------------------
+
+class FakeTTS(tts.TTS):
+    """Non-streaming TTS producing silence: `ttfb` before the first chunk,
+    then audio at `seconds_per_word` of speech per word."""
+
+    def __init__(self, ttfb: float = 0.2, seconds_per_word: float = 0.3, sample_rate: int = 24000):
+        super().__init__(capabilities=tts.TTSCapabilities(streaming=False), sample_rate=sample_rate, num_channels=1)
+        self.ttfb = ttfb
+        self.seconds_per_word = seconds_per_word
+        self.requests = 0
+
+    def synthesize(self, text: str, *, conn_options=DEFAULT_API_CONNECT_OPTIONS):
+        self.requests += 1
+        return _FakeChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+
+class _FakeChunkedStream(tts.ChunkedStream):
+    async def _run(self, output_emitter):
+        owner: FakeTTS = self._tts
+        output_emitter.initialize(
+            request_id=str(uuid.uuid4()), sample_rate=owner.sample_rate, num_channels=1, mime_type="audio/pcm"
+        )
+        await asyncio.sleep(owner.ttfb)
+        duration = max(0.2, len(self.input_text.split()) * owner.seconds_per_word)
+        chunk_seconds = 0.1
+        chunk = bytes(int(owner.sample_rate * chunk_seconds) * 2)
+        for _ in range(int(duration / chunk_seconds)):
+            output_emitter.push(chunk)
+        output_emitter.flush()
+
+
+# --- Audio output -----------------------------------------------------------
+
+class RealtimeAudioOutput(io.AudioOutput):
+    """Plays frames into the void in (scaled) real time and reports playout
+    completion, so agent state and playout-end timing behave like a room."""
+
+    def __init__(self, speed: float = 1.0, sample_rate: Optional[int] = None):
+        super().__init__(label="bench", capabilities=io.AudioOutputCapabilities(pause=False), sample_rate=sample_rate)
+        self.speed = speed
+        self._pushed = 0.0
+        self._started_at: Optional[float] = None
+        self._finish: Optional[asyncio.Task] = None
+
+    async def capture_frame(self, frame: rtc.AudioFrame):
+        await super().capture_frame(frame)
+        if self._started_at is None:
+            self._started_at = time.monotonic()
+            if hasattr(self, "on_playback_started"):
+                self.on_playback_started(created_at=time.time())
+        self._pushed += frame.duration
+
+    def flush(self):
+        super().flush()
+        duration, self._pushed = self._pushed, 0.0
+        started, self._started_at = self._started_at, None
+        if started is None:
+            return
+        remaining = max(0.0, duration / self.speed - (time.monotonic() - started))
+        self._finish = asyncio.create_task(self._finish_after(remaining, duration))
+
+    async def _finish_after(self, delay: float, duration: float):
+        await asyncio.sleep(delay)
+        self.on_playback_finished(playback_position=duration, interrupted=False)
+
+    def clear_buffer(self):
+        if self._finish and not self._finish.done():
+            self._finish.cancel()
+        played, self._pushed = self._pushed, 0.0
+        if self._started_at is not None:
+            self._started_at = None
+            self.on_playback_finished(playback_position=played, interrupted=True)
+
+
+class BenchAgentSession(AgentSession):
+    """AgentSession that ignores the (fake) room and plays into RealtimeAudioOutput"""
+
+    def __init__(self, *args, playout_speed: float = 1.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output.audio = RealtimeAudioOutput(speed=playout_speed)
+
+    async def start(self, agent, *, room=None, **kwargs):
+        return await super().start(agent)
@@ -0,0 +1,220 @@
+"""
+Concurrent-room load generator for finding sessions-per-worker capacity.
+
+Starts N simulated rooms at once against the `entrypoint` registered on the
+`server` AgentServer, using the same local fakes as bench.replay, and ramps
+N up. At each level it records event-loop lag, CPU, RSS, default thread-pool
+queue depth and p95 turn latency, and writes the capacity curve as JSON/CSV.
+
+    cd agent
+    python -m bench.load bench/sessions/two_sum.json --levels 1,2,4,8,16,32 --out capacity
+    python -m bench.load bench/sessions/two_sum.json --processes 4 --levels 4,8,16,32
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, Any, List
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from metrics import percentile
+from bench.replay import BenchHarness, BenchProfile, add_profile_args, aggregate, git_revision
+
+
+def rss_bytes() -> int:
+    """Current resident set size (falls back to peak RSS off Linux)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        if resource is None:
+            return 0
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def executor_queue_depth(loop: asyncio.AbstractEventLoop) -> int:
+    executor = getattr(loop, "_default_executor", None)
+    queue = getattr(executor, "_work_queue", None)
+    return queue.qsize() if queue is not None else 0
+
+
+class LoopSampler:
+    """Samples event-loop lag, thread-pool queue depth and RSS while a level runs"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.lags: List[float] = []
+        self.max_queue_depth = 0
+        self.max_rss = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            before = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, time.monotonic() - before - self.interval))
+            self.max_queue_depth = max(self.max_queue_depth, executor_queue_depth(loop))
+            self.max_rss = max(self.max_rss, rss_bytes())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def summary(self) -> Dict[str, Any]:
+        lags = sorted(self.lags)
+        return {
+            "loop_lag_p50_ms": round(percentile(lags, 0.5) * 1000, 2),
+            "loop_lag_p95_ms": round(percentile(lags, 0.95) * 1000, 2),
+            "loop_lag_max_ms": round((lags[-1] if lags else 0.0) * 1000, 2),
+            "threadpool_queue_max": self.max_queue_depth,
+            "rss_max_mb": round(self.max_rss / (1024 * 1024), 1),
+        }
+
+
+async def run_level(recordings: List[Dict[str, Any]], concurrency: int, profile: BenchProfile,
+                    stagger: float) -> Dict[str, Any]:
+    """Run `concurrency` simultaneous sessions in this process"""
+    harness = BenchHarness(profile)
+    harness.install()
+    sampler = LoopSampler()
+    sampler.start()
+    cpu_before, wall_before = time.process_time(), time.monotonic()
+
+    async def one(i: int):
+        await asyncio.sleep(i * stagger)
+        return await harness.run_session(recordings[i % len(recordings)])
+
+    try:
+        sessions = await asyncio.gather(*(one(i) for i in range(concurrency)))
+    finally:
+        await sampler.stop()
+        harness.uninstall()
+    wall = time.monotonic() - wall_before
+    return {
+        "sessions": list(sessions),
+        "cpu_seconds": time.process_time() - cpu_before,
+        "wall_seconds": wall,
+        **sampler.summary(),
+    }
+
+
+def _run_level_in_process(recordings, concurrency, profile_kwargs, stagger):
+    return asyncio.run(run_level(recordings, concurrency, BenchProfile(**profile_kwargs), stagger))
+
+
+def merge_parts(level: int, processes: int, parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    sessions = [s for part in parts for s in part["sessions"]]
+    agg = aggregate(sessions)
+    first_audio = agg["stages_ms"].get("first_audio", {})
+    turn_total = agg["stages_ms"].get("turn_total", {})
+    wall = max(p["wall_seconds"] for p in parts)
+    cpu = sum(p["cpu_seconds"] for p in parts)
+    return {
+        "concurrency": level,
+        "processes": processes,
+        "sessions": len(sessions),
+        "errors": agg["errors"],
+        "p50_first_audio_ms": first_audio.get("p50", 0.0),
+        "p95_first_audio_ms": first_audio.get("p95", 0.0),
+        "p95_turn_total_ms": turn_total.get("p95", 0.0),
+        "loop_lag_p95_ms": max(p["loop_lag_p95_ms"] for p in parts),
+        "loop_lag_max_ms": max(p["loop_lag_max_ms"] for p in parts),
+        "threadpool_queue_max": max(p["threadpool_queue_max"] for p in parts),
+        "cpu_percent": round(100 * cpu / wall, 1) if wall else 0.0,
+        "rss_max_mb": max(p["rss_max_mb"] for p in parts),
+        "wall_seconds": round(wall, 2),
+        "mean_tasks_created": agg["mean_tasks_created"],
+        "mean_bytes_published": agg["mean_bytes_published"],
+    }
+
+
+def ramp(args) -> List[Dict[str, Any]]:
+    recordings = []
+    for path in args.recordings:
+        with open(path) as f:
+            recordings.append(json.load(f))
+    profile = BenchProfile.from_args(args)
+    levels = [int(x) for x in args.levels.split(",")]
+    curve = []
+    baseline_p95 = None
+    for level in levels:
+        print(f"🚦 [LOAD_LEVEL] {level} concurrent rooms over {args.processes} process(es)")
+        if args.processes == 1:
+            parts = [asyncio.run(run_level(recordings, level, profile, args.stagger))]
+        else:
+            shares = [level // args.processes + (1 if i < level % args.processes else 0)
+                      for i in range(args.processes)]
+            with ProcessPoolExecutor(max_workers=args.processes) as pool:
+                futures = [pool.submit(_run_level_in_process, recordings, n, profile.as_dict(), args.stagger)
+                           for n in shares if n]
+                parts = [f.result() for f in futures]
+        row = merge_parts(level, args.processes, parts)
+        if baseline_p95 is None:
+            baseline_p95 = row["p95_first_audio_ms"]
+        row["degraded"] = bool(
+            row["errors"]
+            or row["p95_first_audio_ms"] > args.slo_ms
+            or (baseline_p95 and row["p95_first_audio_ms"] > baseline_p95 * args.max_slowdown)
+        )
+        curve.append(row)
+        print(f"   p95 first audio {row['p95_first_audio_ms']}ms | loop lag p95 {row['loop_lag_p95_ms']}ms"
+              f" | cpu {row['cpu_percent']}% | rss {row['rss_max_mb']}MB"
+              f" | pool queue {row['threadpool_queue_max']}{' | DEGRADED' if row['degraded'] else ''}")
+        if row["degraded"] and not args.keep_going:
+            break
+    return curve
+
+
+def write_curve(curve: List[Dict[str, Any]], prefix: str, meta: Dict[str, Any]):
+    with open(f"{prefix}.json", "w") as f:
+        json.dump({**meta, "curve": curve}, f, indent=2)
+    if curve:
+        with open(f"{prefix}.csv", "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(curve[0].keys()))
+            writer.writeheader()
+            writer.writerows(curve)
+    print(f"💾 [CAPACITY_SAVED] {prefix}.json, {prefix}.csv")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ramp concurrent simulated interviews to find capacity")
+    parser.add_argument("recordings", nargs="+", help="Recorded session JSON files")
+    parser.add_argument("--levels", default="1,2,4,8,16,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--processes", type=int, default=1, help="Split each level across worker processes")
+    parser.add_argument("--stagger", type=float, default=0.05, help="Seconds between room starts within a level")
+    parser.add_argument("--slo-ms", type=float, default=1500.0, help="p95 first-audio latency budget")
+    parser.add_argument("--max-slowdown", type=float, default=1.5, help="Degraded when p95 exceeds level-1 p95 by this factor")
+    parser.add_argument("--keep-going", action="store_true", help="Run every level even after degradation")
+    parser.add_argument("--out", default="capacity", help="Output prefix for .json and .csv")
+    add_profile_args(parser)
+    args = parser.parse_args()
+
+    curve = ramp(args)
+    healthy = [row["concurrency"] for row in curve if not row["degraded"]]
+    meta = {
+        "revision": git_revision(),
+        "profile": BenchProfile.from_args(args).as_dict(),
+        "cpu_count": os.cpu_count(),
+        "max_healthy_concurrency": max(healthy) if healthy else 0,
+    }
+    print(f"🏁 [CAPACITY] max healthy concurrency: {meta['max_healthy_concurrency']} "
+          f"({args.processes} process(es), {meta['cpu_count']} CPUs)")
+    write_curve(curve, args.out, meta)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+"""
+Offline session replay benchmark.
+
+Drives the real `entrypoint` wiring and InterviewAssistant with recorded
+sessions (scripted user turns and code-update streams) against the local
+fakes in bench.fakes, and reports per-turn latency, tasks created, bytes
+published and Mongo operations per session.
+
+    cd agent
+    python -m bench.replay bench/sessions/two_sum.json --out before.json
+    python -m bench.replay bench/sessions/two_sum.json --baseline before.json
+"""
+
+from collections import defaultdict
+from typing import Optional, Dict, Any, List
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Evaluation PUTs go nowhere fast instead of waiting on a real backend
+os.environ.setdefault("BACKEND_URL", "http://127.0.0.1:9")
+# ...and their outbox rows stay out of the real one
+os.environ.setdefault("OUTBOX_PATH", os.path.join(tempfile.mkdtemp(prefix="bench-outbox-"), "outbox.sqlite3"))
+# Fresh audio cache per run: the first session synthesizes fixed lines, repeats hit
+os.environ.setdefault("TTS_CACHE_DIR", tempfile.mkdtemp(prefix="bench-tts-cache-"))
+
+import agent
+from code_sync import encode_update
+from interview_kit import assemble_kit
+from metrics import percentile
+from segmenter import TTS_SEGMENTER, wrap_tts
+from registry import registry, current_session_key
+from bench.fakes import (
+    FakeRoom, FakeJobContext, FakeAsyncDatabase, ScriptedLLM, ScriptedSTT, FakeTTS, FakeGroq,
+    BenchAgentSession,
+)
+
+
+class BenchProfile:
+    """Timing model for the fake providers"""
+
+    def __init__(self, llm_ttft: float = 0.35, tokens_per_sec: float = 250.0, tts_ttfb: float = 0.2,
+                 stt_delay: float = 0.25, playout_speed: float = 1.0, db_latency: float = 0.002,
+                 eval_latency: float = 0.4, turn_timeout: float = 60.0, tts_segmenter: str = TTS_SEGMENTER):
+        self.llm_ttft = llm_ttft
+        self.tokens_per_sec = tokens_per_sec
+        self.tts_ttfb = tts_ttfb
+        self.stt_delay = stt_delay
+        self.playout_speed = playout_speed
+        self.db_latency = db_latency
+        self.eval_latency = eval_latency
+        self.turn_timeout = turn_timeout
+        self.tts_segmenter = tts_segmenter
+
+    @classmethod
+    def from_args(cls, args) -> "BenchProfile":
+        return cls(
+            llm_ttft=args.llm_ttft, tokens_per_sec=args.tokens_per_sec, tts_ttfb=args.tts_ttfb,
+            stt_delay=args.stt_delay, playout_speed=args.playout_speed, db_latency=args.db_latency,
+            eval_latency=args.eval_latency, tts_segmenter=args.tts_segmenter,
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+
+class SessionRun:
+    """Everything the harness tracks for one replayed session"""
+
+    def __init__(self, recording: Dict[str, Any], session_id: str, room_name: str):
+        self.recording = recording
+        self.session_id = session_id
+        self.room_name = room_name
+        # The greeting is a fixed line from tts_cache, not an LLM reply
+        self.replies = [t["reply"] for t in recording.get("turns", []) if t.get("reply")]
+        self.llm: Optional[ScriptedLLM] = None
+        self.tts: Optional[FakeTTS] = None
+        self.session: Optional[BenchAgentSession] = None
+
+
+async def wait_until(predicate, timeout: float, interval: float = 0.02) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        await asyncio.sleep(interval)
+    return predicate()
+
+
+class BenchHarness:
+    """Installs the fakes into the agent module and replays sessions"""
+
+    def __init__(self, profile: BenchProfile):
+        self.profile = profile
+        self.db = FakeAsyncDatabase({}, {}, latency=profile.db_latency)
+        self.stt = ScriptedSTT(final_delay=profile.stt_delay)
+        self.tasks_by_session: Dict[str, int] = defaultdict(int)
+        self.db_ops_by_session: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._runs: Dict[str, SessionRun] = {}
+        self._saved: Dict[str, Any] = {}
+        self._count = 0
+
+    # --- patching ---
+
+    def install(self):
+        self._saved = {
+            "get_async_db": agent.get_async_db,
+            "build_agent_session": agent.build_agent_session,
+            "warm_provider_connections": agent.warm_provider_connections,
+            "get_groq_client": agent.get_groq_client,
+        }
+        agent.get_async_db = lambda: self.db
+        agent.build_agent_session = self._build_session
+        agent.warm_provider_connections = self._no_warmup
+        self.groq = FakeGroq(latency=self.profile.eval_latency)
+        agent.get_groq_client = lambda: self.groq
+
+        original_op = self.db._op
+
+        async def counted_op(name):
+            key = current_session_key.get()
+            if key:
+                self.db_ops_by_session[key][name] += 1
+            await original_op(name)
+
+        self.db._op = counted_op
+        asyncio.get_running_loop().set_task_factory(self._task_factory)
+
+    def uninstall(self):
+        for name, value in self._saved.items():
+            setattr(agent, name, value)
+        asyncio.get_running_loop().set_task_factory(None)
+
+    def _task_factory(self, loop, coro, **kwargs):
+        key = current_session_key.get()
+        if key:
+            self.tasks_by_session[key] += 1
+        return asyncio.Task(coro, loop=loop, **kwargs)
+
+    async def _no_warmup(self):
+        return None
+
+    def _build_session(self, proc):
+        run = self._runs[current_session_key.get()]
+        p = self.profile
+        run.llm = ScriptedLLM(run.replies, ttft=p.llm_ttft, tokens_per_sec=p.tokens_per_sec)
+        run.tts = FakeTTS(ttfb=p.tts_ttfb)
+        run.session = BenchAgentSession(llm=run.llm, tts=wrap_tts(run.tts, p.tts_segmenter),
+                                        playout_speed=p.playout_speed)
+        return run.session
+
+    # --- replay ---
+
+    def _prepare(self, recording: Dict[str, Any]) -> SessionRun:
+        self._count += 1
+        base = recording.get("sessionId", "bench")
+        session_id = f"{base}-{self._count}"
+        run = SessionRun(recording, session_id, f"interview-{session_id}")
+        question = recording.get("question") or {}
+        question_id = question.get("questionId", "bench-question")
+        self.db.questions[question_id] = question
+        self.db.kits.pop(question_id, None)
+        if recording.get("kit"):
+            # Hand-written script standing in for `python interview_kit.py build`
+            self.db.kits[question_id] = assemble_kit(question, recording["kit"])
+        self.db.sessions[session_id] = {"sessionId": session_id, "status": "active",
+                                        "metadata": {"questionId": question_id}}
+        self._runs[run.room_name] = run
+        return run
+
+    async def run_session(self, recording: Dict[str, Any]) -> Dict[str, Any]:
+        run = self._prepare(recording)
+        room = FakeRoom(run.room_name, json.dumps({"sessionId": run.session_id}))
+        ctx = FakeJobContext(room)
+        started = time.monotonic()
+        evaluations_before = self.groq.evaluations
+        entry = asyncio.create_task(agent.entrypoint(ctx))
+        timeout = self.profile.turn_timeout
+        error = None
+        ended_at = None
+        try:
+            ok = await wait_until(lambda: registry.get(run.room_name) is not None
+                                  and registry.get(run.room_name).assistant is not None
+                                  and run.session is not None, timeout)
+            if not ok:
+                raise RuntimeError("entrypoint did not start a session")
+            assistant = registry.get(run.room_name).assistant
+
+            # Greeting turn (then the explanation script, with a kit)
+            opening = 2 if recording.get("kit") else 1
+            await wait_until(lambda: len(assistant.latency.completed) >= opening or entry.done(), timeout)
+
+            last_code, code_version = None, 0
+            for turn in recording.get("turns", []):
+                if turn.get("code"):
+                    # Versioned patches, snapshot first, like the editor sends them
+                    code_version += 1
+                    room.send_text("code-update", encode_update(last_code, turn["code"], code_version))
+                    last_code = turn["code"]
+                if turn.get("user"):
+                    speech = await self.stt.speak(run.session, turn["user"])
+                    await asyncio.wait_for(speech.wait_for_playout(), timeout)
+                await asyncio.sleep(turn.get("pause", 0.2) / self.profile.playout_speed)
+
+            if recording.get("end", "request_end") == "request_end":
+                # Impatient candidates click End more than once
+                for _ in range(recording.get("end_clicks", 1)):
+                    room.send_data({"type": "request_end"})
+            await wait_until(
+                lambda: any(p.get("type") == "interview_end" for p in room.local_participant.packets), timeout
+            )
+            ended_at = time.monotonic()
+            # The entrypoint should tear down and return by itself
+            await asyncio.wait_for(asyncio.shield(entry), timeout)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            print(f"❌ [BENCH_SESSION_ERR] {run.session_id}: {error}")
+        finally:
+            handle = registry.get(run.room_name)
+            assistant = handle.assistant if handle else None
+            if not entry.done():
+                entry.cancel()
+            await asyncio.gather(entry, return_exceptions=True)
+            entry_done_at = time.monotonic()
+            await ctx.run_shutdown_callbacks()
+            if run.session is not None:
+                try:
+                    await run.session.aclose()
+                except Exception:
+                    pass
+
+        turns = [
+            {k: (round(v * 1000, 1) if k != "turn" else v) for k, v in t.items()}
+            for t in (assistant.latency.completed if assistant else [])
+        ]
+        publisher = handle.publisher.metrics if handle else {}
+        released = entry.done() and not entry.cancelled()
+        return {
+            "sessionId": run.session_id,
+            "error": error,
+            "wall_seconds": round(time.monotonic() - started, 3),
+            "turns_ms": turns,
+            "tasks_created": self.tasks_by_session.get(run.room_name, 0),
+            "bytes_published": room.local_participant.bytes_published,
+            "packets_published": len(room.local_participant.packets),
+            "mongo_ops": dict(self.db_ops_by_session.get(run.room_name, {})),
+            "mongo_ops_total": sum(self.db_ops_by_session.get(run.room_name, {}).values()),
+            "publisher": dict(publisher),
+            "llm_calls": run.llm.calls if run.llm else 0,
+            "prompt_tokens": run.llm.prompt_tokens if run.llm else 0,
+            "tts_requests": run.tts.requests if run.tts else 0,
+            # Both must be 1 however often the end was requested
+            "eval_calls": self.groq.evaluations - evaluations_before,
+            "end_signals": sum(1 for p in room.local_participant.packets if p.get("type") == "interview_end"),
+            "lifecycle": [state for state, _ in assistant.lifecycle.history] if assistant else [],
+            # interview_end -> entrypoint returned (the worker slot is free again)
+            "release_ms": round((entry_done_at - ended_at) * 1000, 1) if released and ended_at else None,
+        }
+
+
+def aggregate(sessions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """p50/p95 per turn stage across sessions, plus per-session means"""
+    stages: Dict[str, List[float]] = defaultdict(list)
+    for s in sessions:
+        for turn in s["turns_ms"]:
+            for stage, ms in turn.items():
+                if stage != "turn":
+                    stages[stage].append(ms)
+    out = {"stages_ms": {}}
+    for stage, values in sorted(stages.items()):
+        values.sort()
+        out["stages_ms"][stage] = {"p50": percentile(values, 0.5), "p95": percentile(values, 0.95), "n": len(values)}
+    n = max(1, len(sessions))
+    for field in ("tasks_created", "bytes_published", "packets_published", "mongo_ops_total", "llm_calls", "prompt_tokens",
+                  "tts_requests", "eval_calls", "end_signals"):
+        out[f"mean_{field}"] = round(sum(s[field] for s in sessions) / n, 1)
+    out["errors"] = sum(1 for s in sessions if s["error"])
+    return out
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    agg = report["aggregate"]
+    base = (baseline or {}).get("aggregate", {})
+    print(f"\n--- 📊 REPLAY BENCHMARK @ {report['revision']} ({len(report['sessions'])} sessions) ---")
+
+    def delta(now, before):
+        if before is None:
+            return ""
+        diff = now - before
+        return f"  ({'+' if diff >= 0 else ''}{diff:.1f} vs {baseline['revision']})"
+
+    for stage, q in agg["stages_ms"].items():
+        before = base.get("stages_ms", {}).get(stage, {})
+        print(f"{stage:>12}: p50 {q['p50']:8.1f}ms{delta(q['p50'], before.get('p50'))}"
+              f" | p95 {q['p95']:8.1f}ms{delta(q['p95'], before.get('p95'))}")
+    for key, value in agg.items():
+        if key.startswith("mean_"):
+            print(f"{key[5:]:>18}: {value}{delta(value, base.get(key))}")
+    print(f"{'errors':>18}: {agg['errors']}")
+    print("--------------------------------\n")
+
+
+async def run(args) -> Dict[str, Any]:
+    recordings = []
+    for path in args.recordings:
+        with open(path) as f:
+            recordings.append(json.load(f))
+    harness = BenchHarness(BenchProfile.from_args(args))
+    harness.install()
+    sessions = []
+    try:
+        for _ in range(args.repeat):
+            for recording in recordings:
+                sessions.append(await harness.run_session(recording))
+    finally:
+        harness.uninstall()
+    return {
+        "revision": git_revision(),
+        "profile": harness.profile.as_dict(),
+        "sessions": sessions,
+        "aggregate": aggregate(sessions),
+    }
+
+
+def add_profile_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--llm-ttft", type=float, default=0.35, help="LLM time to first token (s)")
+    parser.add_argument("--tokens-per-sec", type=float, default=250.0, help="LLM streaming rate")
+    parser.add_argument("--tts-ttfb", type=float, default=0.2, help="TTS time to first audio (s)")
+    parser.add_argument("--stt-delay", type=float, default=0.25, help="End of speech to final transcript (s)")
+    parser.add_argument("--playout-speed", type=float, default=1.0, help=">1 plays audio faster than real time")
+    parser.add_argument("--db-latency", type=float, default=0.002, help="Per Mongo operation (s)")
+    parser.add_argument("--eval-latency", type=float, default=0.4, help="Evaluation LLM call (s)")
+    parser.add_argument("--tts-segmenter", choices=("clause", "sentence"), default=TTS_SEGMENTER,
+                        help="Text chunking before TTS (compare runs for time-to-first-audio)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded interviews against local fakes")
+    parser.add_argument("recordings", nargs="+", help="Recorded session JSON files")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--out", help="Write the JSON report here")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    add_profile_args(parser)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 [BENCH_SAVED] {args.out}")
+    sys.exit(1 if report["aggregate"]["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
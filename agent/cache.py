@@ -0,0 +1,95 @@
+"""
+In-process caches shared by the sync and async database layers
+"""
+
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Callable, List
+import threading
+import time
+import os
+
+
+class QuestionCache:
+    """Bounded LRU cache with a per-entry TTL for question documents.
+
+    The question bank changes rarely, so a hit skips the Mongo round trip
+    on session start. Hooks registered with `add_invalidation_hook` are
+    called with the invalidated questionId (or None for a full clear).
+    """
+
+    def __init__(self, max_size: int = 256, ttl: float = 600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._hooks: List[Callable[[Optional[str]], None]] = []
+        self._lock = threading.Lock()
+
+    def get(self, question_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(question_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, doc = entry
+            if expires_at < time.monotonic():
+                del self._entries[question_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(question_id)
+            self.hits += 1
+            return dict(doc)
+
+    def put(self, question_id: str, doc: Dict[str, Any]):
+        with self._lock:
+            self._entries[question_id] = (time.monotonic() + self.ttl, dict(doc))
+            self._entries.move_to_end(question_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, question_id: Optional[str] = None):
+        """Drop one question, or everything when question_id is None"""
+        with self._lock:
+            if question_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(question_id, None)
+        for hook in list(self._hooks):
+            try:
+                hook(question_id)
+            except Exception as e:
+                print(f"⚠️ [CACHE_HOOK_ERR] {e}")
+
+    def add_invalidation_hook(self, hook: Callable[[Optional[str]], None]):
+        self._hooks.append(hook)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._entries)
+        total = self.hits + self.misses
+        return {
+            "size": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hitRate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Process-wide question cache
+question_cache = QuestionCache(
+    max_size=int(os.getenv("QUESTION_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("QUESTION_CACHE_TTL", "600")),
+)
+
+# Process-wide cache of precomputed interview kits (see interview_kit.py), keyed by questionId
+kit_cache = QuestionCache(
+    max_size=int(os.getenv("KIT_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("KIT_CACHE_TTL", "600")),
+)
@@ -0,0 +1,243 @@
+"""
+Versioned incremental code sync for the `code-update` text stream
+
+The editor sends JSON messages instead of the whole buffer:
+
+    {"type": "snapshot", "epoch": "k3x9", "version": 7, "code": "..."}
+    {"type": "patch", "epoch": "k3x9", "base": 7, "version": 8, "ops": [[start, end, "text"], ...]}
+
+Each op replaces code[start:end] with text, applied in order. Offsets count
+UTF-16 code units, like JavaScript string indices (an emoji counts twice). A patch only
+applies on top of its `base` version; anything else is a gap and the agent
+asks for a fresh snapshot with a `code_resync` data packet. Plain text (the
+old protocol) is still accepted as an unversioned snapshot.
+
+`epoch` is random per editor encoder. A page reload starts a new encoder
+whose versions begin again at 1, so a snapshot with a new epoch always
+replaces the document.
+"""
+
+from array import array
+from collections import deque
+from typing import Optional, Dict, List, Tuple
+import difflib
+import json
+import os
+import time
+
+# Revisions kept for `text_at`
+HISTORY_SIZE = 200
+# Seconds before asking again for a snapshot that has not arrived
+RESYNC_RETRY = 2.0
+
+
+def _code_units(text: str) -> array:
+    """UTF-16 code units of `text`, the unit op offsets are in"""
+    units = array("H")
+    units.frombytes(text.encode("utf-16-le", "surrogatepass"))
+    return units
+
+
+def _from_units(units: array) -> str:
+    return units.tobytes().decode("utf-16-le", "surrogatepass")
+
+
+def splice_ops(old: str, new: str) -> List[list]:
+    """Single replace op covering the changed middle of `old` -> `new`"""
+    if old == new:
+        return []
+    old_u, new_u = _code_units(old), _code_units(new)
+    prefix = 0
+    limit = min(len(old_u), len(new_u))
+    while prefix < limit and old_u[prefix] == new_u[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old_u[len(old_u) - 1 - suffix] == new_u[len(new_u) - 1 - suffix]:
+        suffix += 1
+    return [[prefix, len(old_u) - suffix, _from_units(new_u[prefix:len(new_u) - suffix])]]
+
+
+def apply_ops(text: str, ops: List[list]) -> str:
+    # Splice in code units: an op may even split a surrogate pair, as JS allows
+    units = _code_units(text)
+    for start, end, insert in ops:
+        if not (0 <= start <= end <= len(units)):
+            raise ValueError(f"op [{start}, {end}) out of range for {len(units)} code units")
+        units = units[:start] + _code_units(insert) + units[end:]
+    return _from_units(units)
+
+
+def encode_update(old: Optional[str], new: str, version: int, snapshot: bool = False,
+                  epoch: Optional[str] = None) -> str:
+    """Build the wire message for `new` at `version` (same format as the editor)"""
+    if snapshot or old is None:
+        return json.dumps({"type": "snapshot", "epoch": epoch, "version": version, "code": new})
+    return json.dumps({"type": "patch", "epoch": epoch, "base": version - 1, "version": version,
+                       "ops": splice_ops(old, new)})
+
+
+class CodeDocument:
+    """The candidate's editor buffer as the agent knows it, with a short
+    revision history (snapshots plus the patch ops after them).
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.version = 0
+        # Encoder the versions belong to (None for editors that do not send one)
+        self.epoch: Optional[str] = None
+        self.awaiting_resync = False
+        self._resync_requested_at = 0.0
+        # (version, timestamp, "snapshot" | "patch", text or ops)
+        self.history: deque = deque(maxlen=HISTORY_SIZE)
+        self.stats: Dict[str, int] = {"snapshots": 0, "patches": 0, "gaps": 0, "duplicates": 0, "restarts": 0, "bytes": 0}
+
+    def receive(self, raw: str) -> str:
+        """Apply one message from the stream. Returns 'snapshot', 'patch',
+        'duplicate' or 'gap' (caller should request a resync)."""
+        self.stats["bytes"] += len(raw.encode("utf-8"))
+        message = None
+        if raw.lstrip().startswith("{"):
+            try:
+                message = json.loads(raw)
+            except ValueError:
+                message = None
+        if not isinstance(message, dict) or "version" not in message:
+            # Legacy full-buffer update
+            return self._snapshot(raw, self.version + 1)
+
+        version = int(message["version"])
+        epoch = message.get("epoch")
+        if epoch != self.epoch:
+            # A new editor encoder (page reload): its versions start over
+            if message.get("type") != "snapshot":
+                self.stats["gaps"] += 1
+                return "gap"
+            if self.version:
+                self.stats["restarts"] += 1
+                print(f"🔄 [CODE_EDITOR_RESTART] epoch {self.epoch} v{self.version} -> {epoch} v{version}")
+            self.epoch = epoch
+            return self._snapshot(message.get("code", ""), version)
+        if message.get("type") == "snapshot":
+            if version < self.version and not self.awaiting_resync:
+                self.stats["duplicates"] += 1
+                return "duplicate"
+            return self._snapshot(message.get("code", ""), version)
+
+        if version <= self.version and not self.awaiting_resync:
+            self.stats["duplicates"] += 1
+            return "duplicate"
+        if self.awaiting_resync or int(message.get("base", -1)) != self.version:
+            self.stats["gaps"] += 1
+            return "gap"
+        try:
+            self.text = apply_ops(self.text, message.get("ops", []))
+        except (ValueError, TypeError) as e:
+            print(f"⚠️ [CODE_PATCH_BAD] v{version}: {e}")
+            self.stats["gaps"] += 1
+            return "gap"
+        self.version = version
+        self.history.append((version, time.time(), "patch", message.get("ops", [])))
+        self.stats["patches"] += 1
+        return "patch"
+
+    def _snapshot(self, text: str, version: int) -> str:
+        self.text = text
+        self.version = version
+        self.awaiting_resync = False
+        self.history.append((version, time.time(), "snapshot", text))
+        self.stats["snapshots"] += 1
+        return "snapshot"
+
+    def should_request_resync(self) -> bool:
+        """True once per RESYNC_RETRY while a gap is outstanding"""
+        now = time.monotonic()
+        if self.awaiting_resync and now - self._resync_requested_at < RESYNC_RETRY:
+            return False
+        self.awaiting_resync = True
+        self._resync_requested_at = now
+        return True
+
+    def text_at(self, version: int) -> Optional[str]:
+        """Rebuild an earlier revision from the retained history"""
+        entries = [e for e in self.history if e[0] <= version]
+        start = max((n for n, e in enumerate(entries) if e[2] == "snapshot"), default=None)
+        if start is None:
+            return None
+        text = entries[start][3]
+        for _, _, kind, ops in entries[start + 1:]:
+            text = apply_ops(text, ops)
+        return text
+
+
+# Above this share of changed lines the LLM gets the whole file again
+REVIEW_FULL_RATIO = float(os.getenv("CODE_REVIEW_FULL_RATIO", "0.4"))
+
+
+def numbered_diff(old: str, new: str, context: int = 2) -> Tuple[str, int]:
+    """Compact line-numbered diff of old -> new; returns (text, changed line count).
+
+    Context and added lines carry their line number in the new file,
+    removed lines are marked with '-' and no number.
+    """
+    old_lines, new_lines = old.splitlines(), new.splitlines()
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    out: List[str] = []
+    changed = 0
+    for group in matcher.get_grouped_opcodes(context):
+        if out:
+            out.append("   ...")
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                out.extend(f"  {j + 1:4} | {new_lines[j]}" for j in range(j1, j2))
+                continue
+            if tag in ("replace", "delete"):
+                out.extend(f"-      | {line}" for line in old_lines[i1:i2])
+                changed += i2 - i1
+            if tag in ("replace", "insert"):
+                out.extend(f"+ {j + 1:4} | {new_lines[j]}" for j in range(j1, j2))
+                changed += j2 - j1
+    return "\n".join(out), changed
+
+
+class CodeReviewTracker:
+    """Remembers the code the LLM last saw through get_latest_code so the
+    next review can send only what changed.
+    """
+
+    def __init__(self, full_ratio: float = REVIEW_FULL_RATIO):
+        self.full_ratio = full_ratio
+        self.seen_text: Optional[str] = None
+        self.seen_version: Optional[int] = None
+        # Last full-code tool output; diffs are only meaningful while the LLM still has it
+        self.base_output: Optional[str] = None
+        self.stats: Dict[str, int] = {"full": 0, "diff": 0, "unchanged": 0, "chars_saved": 0}
+
+    def review(self, text: str, version: int, force_full: bool = False) -> str:
+        full = f"```js\n{text}\n```"
+        if self.seen_text is None or force_full:
+            return self._full(text, version, full)
+        if text == self.seen_text:
+            self.stats["unchanged"] += 1
+            self.stats["chars_saved"] += len(full)
+            return f"Unchanged since your last review (version {version}, {len(text.splitlines())} lines)"
+        diff, changed = numbered_diff(self.seen_text, text)
+        total = max(len(text.splitlines()), len(self.seen_text.splitlines()), 1)
+        if changed / total > self.full_ratio or len(diff) >= len(full):
+            return self._full(text, version, full)
+        previous = self.seen_version
+        self.seen_text, self.seen_version = text, version
+        self.stats["diff"] += 1
+        self.stats["chars_saved"] += len(full) - len(diff)
+        return (f"Changes since your last review (version {previous} -> {version}); "
+                f"numbers are line numbers in the current code, '-' lines were removed:\n{diff}")
+
+    def forget(self):
+        """The LLM lost the base code (e.g. trimmed from context); next review sends it all"""
+        self.seen_text = self.seen_version = self.base_output = None
+
+    def _full(self, text: str, version: int, full: str) -> str:
+        self.seen_text, self.seen_version = text, version
+        self.base_output = full
+        self.stats["full"] += 1
+        return full
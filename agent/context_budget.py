@@ -0,0 +1,127 @@
+"""
+Token-budgeted chat context for the live LLM turn
+"""
+
+from typing import AbstractSet, Dict, Any, Tuple
+import os
+
+from livekit.agents import llm
+
+from conversation import message_role, message_text
+from metrics import worker_metrics
+
+LLM_CONTEXT_BUDGET = int(os.getenv("LLM_CONTEXT_BUDGET", "3000"))
+LLM_KEEP_TURNS = int(os.getenv("LLM_KEEP_TURNS", "6"))
+CODE_PREFIX = "CANDIDATE CODE UPDATE"
+
+
+def estimate_tokens(text: str) -> int:
+    """~4 characters per token; close enough for budgeting Llama prompts"""
+    return (len(text) + 3) // 4 if text else 0
+
+
+def item_tokens(item) -> int:
+    kind = getattr(item, "type", "message")
+    if kind == "message":
+        return estimate_tokens(message_text(item)) + 4
+    if kind == "function_call":
+        return estimate_tokens(getattr(item, "name", "") + getattr(item, "arguments", "")) + 4
+    if kind == "function_call_output":
+        return estimate_tokens(str(getattr(item, "output", ""))) + 4
+    return 0
+
+
+def is_instruction(item) -> bool:
+    return getattr(item, "type", "message") == "message" and message_role(item) in ("system", "developer")
+
+
+def is_code_update(item) -> bool:
+    return getattr(item, "type", "message") == "message" and message_text(item).startswith(CODE_PREFIX)
+
+
+class ContextBudget:
+    """Shrinks the chat context sent to the LLM to `max_tokens`.
+
+    Always kept: system instructions (role + problem statement), the
+    latest CANDIDATE CODE UPDATE and the last `keep_turns` user turns
+    verbatim. Older turns are replaced by the rolling summary when the
+    context is over budget; turns the summary does not cover yet stay
+    verbatim until they have to be dropped, oldest first.
+    """
+
+    def __init__(self, max_tokens: int = LLM_CONTEXT_BUDGET, keep_turns: int = LLM_KEEP_TURNS):
+        self.max_tokens = max_tokens
+        self.keep_turns = max(1, keep_turns)
+        self.last_report: Dict[str, Any] = {}
+
+    def apply(self, chat_ctx: llm.ChatContext, summary: str = "", summarized_ids: AbstractSet[str] = frozenset()
+              ) -> Tuple[llm.ChatContext, Dict[str, Any]]:
+        """Return (context to send, report). `summary` covers the chat
+        items whose ids are in `summarized_ids`."""
+        items = list(chat_ctx.items)
+        before = sum(item_tokens(i) for i in items)
+        code_updates = [i for i in items if is_code_update(i)]
+        if before <= self.max_tokens and len(code_updates) <= 1:
+            self.last_report = {"tokens_before": before, "tokens_after": before, "tokens_saved": 0,
+                                "code_updates_dropped": 0, "items_compressed": 0}
+            return chat_ctx, self.last_report
+
+        instructions = [i for i in items if is_instruction(i)]
+        latest_code = code_updates[-1] if code_updates else None
+        conversation = [i for i in items if not is_instruction(i) and not is_code_update(i)]
+
+        # Split into turns at each user message; the tail keeps tool calls with their turn
+        starts = [n for n, i in enumerate(conversation)
+                  if getattr(i, "type", "message") == "message" and message_role(i) == "user"]
+        cut = starts[-self.keep_turns] if len(starts) >= self.keep_turns else 0
+        older, recent = conversation[:cut], conversation[cut:]
+
+        def assemble(summary_items, older_items, recent_items):
+            out = list(instructions) + summary_items + older_items
+            # Latest code goes just before the turns that may discuss it
+            if latest_code is not None:
+                out.append(latest_code)
+            return out + recent_items
+
+        kept = assemble([], older, recent)
+        total = sum(item_tokens(i) for i in kept)
+        compressed = 0
+        if total > self.max_tokens and older:
+            # Messages already folded into the summary can go; tool traffic in old turns too
+            spoken = [i for i in older if getattr(i, "type", "message") == "message"]
+            # By id, not position: the summarizer skips messages (empty, code) that are still in the context
+            verbatim = [i for i in spoken if getattr(i, "id", None) not in summarized_ids]
+            summary_items = []
+            if summary:
+                summary_items = [llm.ChatMessage(
+                    role="system", content=[f"Summary of the interview so far:\n{summary}"]
+                )]
+            while verbatim and sum(item_tokens(i) for i in assemble(summary_items, verbatim, recent)) > self.max_tokens:
+                verbatim.pop(0)
+            compressed = len(older) - len(verbatim)
+            kept = assemble(summary_items, verbatim, recent)
+            total = sum(item_tokens(i) for i in kept)
+
+        # Still over: drop whole recent turns, oldest first, but always keep the last one
+        while total > self.max_tokens:
+            turn_starts = [n for n, i in enumerate(recent)
+                           if getattr(i, "type", "message") == "message" and message_role(i) == "user"]
+            if len(turn_starts) < 2:
+                break
+            dropped, recent = recent[:turn_starts[1]], recent[turn_starts[1]:]
+            compressed += len(dropped)
+            kept = [i for i in kept if not any(i is d for d in dropped)]
+            total = sum(item_tokens(i) for i in kept)
+
+        report = {
+            "tokens_before": before,
+            "tokens_after": total,
+            "tokens_saved": max(0, before - total),
+            "code_updates_dropped": max(0, len(code_updates) - 1),
+            "items_compressed": compressed,
+        }
+        self.last_report = report
+        if report["tokens_saved"]:
+            worker_metrics.inc("interview_llm_context_tokens_saved_total", report["tokens_saved"],
+                               "Estimated prompt tokens removed by the context budget")
+        return llm.ChatContext(kept), report
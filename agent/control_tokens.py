@@ -0,0 +1,105 @@
+"""
+Streaming scanner for [[CONTROL]] tokens in LLM output on its way to TTS
+"""
+
+from typing import Optional, Dict, List, Callable, Tuple
+import re
+
+OPEN, CLOSE = "[[", "]]"
+# Longest token body we wait for before deciding "[[" was just text
+MAX_TOKEN_LEN = 48
+
+
+def token_key(name: str) -> str:
+    """END_INTERVIEW, end interview and EndInterview all map to ENDINTERVIEW"""
+    return re.sub(r"[\s_\-]+", "", name).upper()
+
+
+class ControlTokenScanner:
+    """Strips registered [[NAME]] / [[NAME:arg]] tokens from a text stream
+    and calls their handler, even when a token is split across chunks.
+
+    Only a possible token prefix is held back (at most MAX_TOKEN_LEN
+    characters), every character is scanned a bounded number of times, and
+    the spoken text is collected as parts, so a reply costs linear time.
+    Unregistered [[...]] blocks pass through as text.
+    """
+
+    def __init__(self, handlers: Dict[str, Callable[[Optional[str]], None]], max_token_len: int = MAX_TOKEN_LEN):
+        self._handlers = {token_key(name): fn for name, fn in handlers.items()}
+        self.max_token_len = max_token_len
+        self._pending = ""
+        self._parts: List[str] = []
+        self.tokens: List[Tuple[str, Optional[str]]] = []
+
+    def feed(self, chunk: str) -> str:
+        """Text from `chunk` that is safe to speak now"""
+        buf = self._pending + chunk
+        self._pending = ""
+        out: List[str] = []
+        i = 0
+        while True:
+            start = buf.find(OPEN, i)
+            if start == -1:
+                # A lone trailing "[" may become "[[" with the next chunk
+                if buf.endswith("[") and len(buf) > i:
+                    out.append(buf[i:-1])
+                    self._pending = "["
+                else:
+                    out.append(buf[i:])
+                break
+            out.append(buf[i:start])
+            end = buf.find(CLOSE, start + 2)
+            if end == -1 or end - start - 2 > self.max_token_len:
+                if end == -1 and len(buf) - start <= self.max_token_len + 2:
+                    # Could still be a token; wait for more
+                    self._pending = buf[start:]
+                    break
+                # Too long to be a token: it was text
+                out.append(OPEN)
+                i = start + 2
+                continue
+            if self._dispatch(buf[start + 2:end]):
+                i = end + 2
+            else:
+                out.append(buf[start:end + 2])
+                i = end + 2
+        text = "".join(out)
+        if text:
+            self._parts.append(text)
+        return text
+
+    def flush(self) -> str:
+        """End of stream: release held text, but never speak a cut-off token"""
+        pending, self._pending = self._pending, ""
+        if pending.startswith(OPEN):
+            body = pending[2:].rstrip("]")
+            name = token_key(body.split(":", 1)[0])
+            if name in self._handlers:
+                # Only the closing brackets are missing
+                self._dispatch(body)
+                return ""
+            if name and any(key.startswith(name) for key in self._handlers):
+                print(f"⚠️ [CONTROL_TOKEN_CUT] dropped unterminated {pending!r}")
+                return ""
+        if pending:
+            self._parts.append(pending)
+        return pending
+
+    @property
+    def text(self) -> str:
+        """Everything spoken so far, without control tokens"""
+        return "".join(self._parts)
+
+    def _dispatch(self, body: str) -> bool:
+        name, sep, arg = body.partition(":")
+        handler = self._handlers.get(token_key(name))
+        if handler is None:
+            return False
+        value = arg.strip() if sep else None
+        self.tokens.append((token_key(name), value))
+        try:
+            handler(value)
+        except Exception as e:
+            print(f"❌ [CONTROL_TOKEN_ERR] {name}: {e}")
+        return True
@@ -0,0 +1,78 @@
+"""
+Helpers for reading the AgentSession conversation without polling
+"""
+
+from typing import Callable, Optional, Any
+
+
+def message_text(msg) -> str:
+    """Plain text of a ChatMessage whose content may be a str or a list of parts"""
+    content = getattr(msg, "content", None)
+    if isinstance(content, list):
+        return " ".join(
+            part if isinstance(part, str) else getattr(part, "text", "")
+            for part in content
+            if isinstance(part, str) or hasattr(part, "text")
+        ).strip()
+    return str(content or "").strip()
+
+
+def message_role(msg) -> str:
+    """Role as a lowercase string ('user', 'assistant', ...) for str or enum roles"""
+    role = getattr(msg, "role", "")
+    return str(getattr(role, "value", role)).split(".")[-1].lower()
+
+
+class ConversationTail:
+    """Incremental cursor over an AgentSession's conversation items.
+
+    Driven by the SDK's `conversation_item_added` event, so it costs nothing
+    while the conversation is idle. `cursor` counts the items consumed.
+    Call `close()` (wired to the room's `disconnected` event) to detach.
+    """
+
+    def __init__(self, session, on_user_message: Callable[[str], Any],
+                 on_item: Optional[Callable[[Any], Any]] = None):
+        self._session = session
+        self._on_user_message = on_user_message
+        self._on_item = on_item
+        self.cursor = 0
+        self._attached = False
+
+    def attach(self):
+        if self._attached:
+            return
+        # Catch up on anything committed before the tail was attached
+        history = getattr(self._session, "history", None)
+        for item in list(getattr(history, "items", []) or [])[self.cursor:]:
+            self._consume(item)
+        self._session.on("conversation_item_added", self._on_event)
+        self._attached = True
+        print(f"🔎 [CONVERSATION_TAIL] attached at item {self.cursor}")
+
+    def _on_event(self, ev):
+        self._consume(getattr(ev, "item", ev))
+
+    def _consume(self, item):
+        self.cursor += 1
+        try:
+            if self._on_item:
+                self._on_item(item)
+            if message_role(item) != "user":
+                return
+            text = message_text(item)
+            # Code updates are context for the LLM, not something the candidate said
+            if text and not text.startswith("CANDIDATE CODE"):
+                self._on_user_message(text)
+        except Exception as e:
+            print(f"❌ [CONVERSATION_TAIL_ERR] {e}")
+
+    def close(self, *_):
+        if not self._attached:
+            return
+        try:
+            self._session.off("conversation_item_added", self._on_event)
+        except Exception:
+            pass
+        self._attached = False
+        print(f"🔒 [CONVERSATION_TAIL] detached after {self.cursor} items")
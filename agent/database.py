@@ -2,54 +2,171 @@
 Database utilities for MongoDB operations
 """
 
-from pymongo import MongoClient
+from pymongo import MongoClient, AsyncMongoClient, ASCENDING
+from pymongo.errors import PyMongoError, BulkWriteError
 from bson import ObjectId
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+import argparse
+import asyncio
+import datetime
+import pymongo
+import random
+import time
+import weakref
 import os
 
+from cache import question_cache, kit_cache
+
+# Only what the agent needs at startup; never the growing transcripts array
+SESSION_PROJECTION = {"_id": 0, "sessionId": 1, "metadata": 1, "status": 1}
+
+# (collection, keys, options) - the first two mirror the unique indexes in the backend models
+INDEXES = [
+    ("sessions", [("sessionId", ASCENDING)], {"unique": True}),
+    ("questions", [("questionId", ASCENDING)], {"unique": True}),
+    ("transcripts", [("sessionId", ASCENDING), ("timestamp", ASCENDING), ("_id", ASCENDING)], {}),
+    ("interview_kits", [("questionId", ASCENDING)], {"unique": True}),
+]
+
+# Journal entries sort by time, then by client-generated ObjectId for same-millisecond turns
+TRANSCRIPT_SORT = [("timestamp", ASCENDING), ("_id", ASCENDING)]
+
+
+def transcript_entry(session_id: str, role: str, content: str) -> Dict[str, Any]:
+    """Build one document for the `transcripts` collection"""
+    return {
+        "_id": ObjectId(),
+        "sessionId": session_id,
+        "role": role,
+        "content": content,
+        "timestamp": datetime.datetime.now(datetime.timezone.utc),
+    }
+
+
+def _client_options() -> Dict[str, Any]:
+    """Connection pool settings shared by the sync and async clients"""
+    return {
+        "maxPoolSize": int(os.getenv("MONGODB_MAX_POOL_SIZE", "50")),
+        "minPoolSize": int(os.getenv("MONGODB_MIN_POOL_SIZE", "0")),
+        "maxIdleTimeMS": int(os.getenv("MONGODB_MAX_IDLE_MS", "60000")),
+        "waitQueueTimeoutMS": int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "2000")),
+    }
+
 
 class Database:
     """MongoDB database connection and operations"""
     
     def __init__(self):
         uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
-        self.client = MongoClient(uri)
+        self.client = MongoClient(uri, **_client_options())
         # Match backend: "interview-platform"
         self.db = self.client["interview_platform"]
         
         self.sessions = self.db["sessions"]
         self.questions = self.db["questions"]
         self.transcripts = self.db["transcripts"]
+        self.interview_kits = self.db["interview_kits"]
         print(f"🔌 [DB_INIT] Connected to: {self.db.name}")
-    def print_all_sessions(self):
-            """Dumps every session ID in the DB to the console."""
+
+    def warm_pool(self) -> bool:
+        """Open pooled connections now instead of on the first interview query"""
+        try:
+            self.client.admin.command("ping")
+            return True
+        except PyMongoError as e:
+            print(f"❌ [DB_WARM_ERR] {e}")
+            return False
+
+    def ensure_indexes(self) -> int:
+        """Create the lookup indexes the agent relies on (idempotent); returns how many are in place."""
+        ensured = 0
+        for collection, keys, options in INDEXES:
             try:
-                print("\n--- 📊 CURRENT DATABASE DUMP ---")
-                all_docs = list(self.sessions.find({}))
-                if not all_docs:
-                    print("❌ [EMPTY] No documents found in the 'sessions' collection.")
-                for doc in all_docs:
+                self.db[collection].create_index(keys, **options)
+                ensured += 1
+            except PyMongoError as e:
+                # An index with different options already exists; it still serves lookups
+                print(f"⚠️ [INDEX_SKIP] {collection}.{keys[0][0]}: {e}")
+        print(f"🗂️ [DB_INDEXES] {ensured}/{len(INDEXES)} startup indexes ensured")
+        return ensured
+
+    def print_all_sessions(self, page_size: int = 100, limit: Optional[int] = None):
+        """Debug dump of sessions, paged by _id so memory stays flat. Never call on the hot path."""
+        try:
+            print("\n--- 📊 CURRENT DATABASE DUMP ---")
+            last_id = None
+            printed = 0
+            while limit is None or printed < limit:
+                query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+                page = list(
+                    self.sessions.find(query, {"sessionId": 1, "status": 1, "metadata": 1})
+                    .sort("_id", ASCENDING)
+                    .limit(page_size)
+                )
+                if not page:
+                    break
+                for doc in page:
+                    if limit is not None and printed >= limit:
+                        break
                     print(f"ID: {doc.get('sessionId')} | Status: {doc.get('status')} | Metadata: {doc.get('metadata')}")
-                print("--------------------------------\n")
-            except Exception as e:
-                print(f"❌ [DUMP_ERROR] {e}")
-    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+                    printed += 1
+                last_id = page[-1]["_id"]
+            if not printed:
+                print("❌ [EMPTY] No documents found in the 'sessions' collection.")
+            print("--------------------------------\n")
+        except Exception as e:
+            print(f"❌ [DUMP_ERROR] {e}")
+
+    def get_session(self, session_id: str, projection: Optional[Dict[str, int]] = SESSION_PROJECTION) -> Optional[Dict[str, Any]]:
         print(f"🔎 [DB_QUERY] Searching for sessionId: '{session_id}'")
-        return self.sessions.find_one({"sessionId": session_id})
+        return self.sessions.find_one({"sessionId": session_id}, projection)
 
     def get_question_by_id(self, question_id: str) -> Optional[Dict[str, Any]]:
+        cached = question_cache.get(question_id)
+        if cached is not None:
+            return cached
         print(f"🔎 [DB_QUERY] Searching for questionId: '{question_id}'")
         try:
-            return self.questions.find_one({"questionId": question_id})
+            doc = self.questions.find_one({"questionId": question_id})
+            if doc:
+                question_cache.put(question_id, doc)
+            return doc
         except Exception as e:
             print(f"❌ [DB_ERR] Question fetch error: {e}")
             return None
 
+    def preload_questions(self) -> int:
+        """Bulk-load every active question into the process question cache"""
+        count = 0
+        try:
+            for doc in self.questions.find({"isActive": {"$ne": False}}):
+                if doc.get("questionId"):
+                    question_cache.put(doc["questionId"], doc)
+                    count += 1
+            print(f"📦 [CACHE_PRELOAD] {count} questions cached")
+        except Exception as e:
+            print(f"❌ [CACHE_PRELOAD_ERR] {e}")
+        return count
+
+    def preload_kits(self) -> int:
+        """Bulk-load every prebuilt interview kit into the process kit cache"""
+        count = 0
+        try:
+            for doc in self.interview_kits.find({}, {"_id": 0}):
+                if doc.get("questionId"):
+                    kit_cache.put(doc["questionId"], doc)
+                    count += 1
+            print(f"📦 [KIT_PRELOAD] {count} interview kits cached")
+        except Exception as e:
+            print(f"❌ [KIT_PRELOAD_ERR] {e}")
+        return count
+
     def get_debug_info(self):
         """Helper to see what's actually in the DB when a fetch fails"""
         try:
-            count = self.sessions.count_documents({})
-            sample_ids = [doc.get("sessionId") for doc in self.sessions.find().limit(5)]
+            count = self.sessions.estimated_document_count()
+            cursor = self.sessions.find({}, {"sessionId": 1}).sort("_id", -1).limit(5)
+            sample_ids = [doc.get("sessionId") for doc in cursor]
             return {"total_sessions": count, "recent_ids": sample_ids}
         except:
             return "Could not fetch debug info"
@@ -72,17 +189,262 @@ class Database:
         return result.modified_count > 0
     
     def add_transcript(self, session_id: str, role: str, content: str) -> bool:
-        """Add transcript entry to session using sessionId field"""
-        result = self.sessions.update_one(
-            {"sessionId": session_id},
-            {"$push": {"transcripts": {"role": role, "content": content, "timestamp": None}}}
-        )
-        return result.modified_count > 0
+        """Append one turn to the transcripts collection (not the session document)"""
+        result = self.transcripts.insert_one(transcript_entry(session_id, role, content))
+        return result.acknowledged
+
+    def get_transcript(self, session_id: str) -> List[Dict[str, Any]]:
+        """Ordered transcript for a session"""
+        cursor = self.transcripts.find({"sessionId": session_id}, {"_id": 0, "sessionId": 0}).sort(TRANSCRIPT_SORT)
+        return list(cursor)
     
     def close(self):
         """Close database connection"""
         self.client.close()
 
 
-# Global database instance
-db = Database()
+class AsyncDatabase:
+    """Native asyncio variant of Database for the agent's event loop.
+
+    Every call runs under a pymongo timeout so a slow server fails fast
+    instead of stalling the interview.
+    """
+
+    def __init__(self):
+        uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
+        self.op_timeout = float(os.getenv("MONGODB_OP_TIMEOUT", "5"))
+        self.client = AsyncMongoClient(uri, **_client_options())
+        self.db = self.client["interview_platform"]
+
+        self.sessions = self.db["sessions"]
+        self.questions = self.db["questions"]
+        self.transcripts = self.db["transcripts"]
+        self.interview_kits = self.db["interview_kits"]
+        self._question_watch: Optional[asyncio.Task] = None
+
+    def _timeout(self, timeout: Optional[float]):
+        return pymongo.timeout(self.op_timeout if timeout is None else timeout)
+
+    async def get_session(self, session_id: str, timeout: Optional[float] = None,
+                          projection: Optional[Dict[str, int]] = SESSION_PROJECTION) -> Optional[Dict[str, Any]]:
+        print(f"🔎 [DB_QUERY] Searching for sessionId: '{session_id}'")
+        with self._timeout(timeout):
+            return await self.sessions.find_one({"sessionId": session_id}, projection)
+
+    async def wait_for_session(self, session_id: str, deadline: float = 8.0) -> Optional[Dict[str, Any]]:
+        """Resolve as soon as the session document exists, or None after `deadline` seconds.
+
+        Uses a change stream on inserts; falls back to exponential backoff
+        with jitter when change streams are unavailable (standalone mongod).
+        """
+        started = time.monotonic()
+        doc = await self.get_session(session_id)
+        if doc:
+            return doc
+        try:
+            doc = await asyncio.wait_for(self._await_session_insert(session_id), timeout=deadline)
+        except asyncio.TimeoutError:
+            doc = None
+        waited = time.monotonic() - started
+        if doc:
+            print(f"✅ [SESSION_READY] '{session_id}' after {waited:.2f}s")
+        else:
+            print(f"❌ [SESSION_TIMEOUT] '{session_id}' not inserted within {deadline}s")
+        return doc
+
+    async def _await_session_insert(self, session_id: str) -> Optional[Dict[str, Any]]:
+        pipeline = [
+            {"$match": {"operationType": "insert", "fullDocument.sessionId": session_id}},
+            {"$project": {f"fullDocument.{field}": 1 for field in SESSION_PROJECTION if field != "_id"}},
+        ]
+        try:
+            async with await self.sessions.watch(pipeline) as stream:
+                # The insert may have landed between the first lookup and opening the stream
+                doc = await self.get_session(session_id)
+                if doc:
+                    return doc
+                async for change in stream:
+                    return change.get("fullDocument")
+        except PyMongoError as e:
+            print(f"⚠️ [SESSION_WATCH_UNAVAILABLE] {e}; falling back to backoff polling")
+        return await self._poll_for_session(session_id)
+
+    async def _poll_for_session(self, session_id: str, base: float = 0.1, cap: float = 1.0) -> Optional[Dict[str, Any]]:
+        attempt = 0
+        while True:
+            delay = min(cap, base * (2 ** attempt))
+            await asyncio.sleep(delay / 2 + random.uniform(0, delay / 2))
+            attempt += 1
+            try:
+                doc = await self.get_session(session_id)
+            except PyMongoError as e:
+                print(f"⚠️ [DB_RETRY] {e}")
+                continue
+            if doc:
+                return doc
+
+    async def get_question_by_id(self, question_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        cached = question_cache.get(question_id)
+        if cached is not None:
+            return cached
+        print(f"🔎 [DB_QUERY] Searching for questionId: '{question_id}'")
+        try:
+            with self._timeout(timeout):
+                doc = await self.questions.find_one({"questionId": question_id})
+            if doc:
+                question_cache.put(question_id, doc)
+            return doc
+        except PyMongoError as e:
+            print(f"❌ [DB_ERR] Question fetch error: {e}")
+            return None
+
+    async def preload_questions(self, timeout: Optional[float] = None) -> int:
+        """Bulk-load every active question into the process question cache"""
+        count = 0
+        try:
+            with self._timeout(timeout):
+                async for doc in self.questions.find({"isActive": {"$ne": False}}):
+                    if doc.get("questionId"):
+                        question_cache.put(doc["questionId"], doc)
+                        count += 1
+            print(f"📦 [CACHE_PRELOAD] {count} questions cached")
+        except PyMongoError as e:
+            print(f"❌ [CACHE_PRELOAD_ERR] {e}")
+        return count
+
+    async def get_interview_kit(self, question_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Prebuilt kit for a question (see interview_kit.py); None when there is none yet"""
+        cached = kit_cache.get(question_id)
+        if cached is not None:
+            return cached
+        try:
+            with self._timeout(timeout):
+                doc = await self.interview_kits.find_one({"questionId": question_id}, {"_id": 0})
+            if doc:
+                kit_cache.put(question_id, doc)
+            return doc
+        except PyMongoError as e:
+            print(f"❌ [DB_ERR] Interview kit fetch error: {e}")
+            return None
+
+    async def warm(self) -> bool:
+        """Open a pooled connection before the first query needs it"""
+        try:
+            with self._timeout(None):
+                await self.client.admin.command("ping")
+            return True
+        except PyMongoError as e:
+            print(f"❌ [DB_WARM_ERR] {e}")
+            return False
+
+    def ensure_question_watch(self):
+        """Start the optional cache invalidation stream once per client (QUESTION_CACHE_WATCH=1)"""
+        if self._question_watch is None and os.getenv("QUESTION_CACHE_WATCH") == "1":
+            self._question_watch = asyncio.create_task(self.watch_question_changes())
+
+    async def watch_question_changes(self):
+        """Invalidate cached questions as they change (needs a replica set)"""
+        try:
+            async with await self.questions.watch(full_document="updateLookup") as stream:
+                async for change in stream:
+                    doc = change.get("fullDocument") or {}
+                    question_id = doc.get("questionId")
+                    # Deletes carry no document, so drop everything
+                    question_cache.invalidate(question_id)
+        except PyMongoError as e:
+            print(f"⚠️ [CACHE_WATCH_UNAVAILABLE] {e}")
+
+    async def get_question(self, question_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        return await self.get_question_by_id(question_id, timeout)
+
+    async def get_debug_info(self, timeout: Optional[float] = None):
+        """Helper to see what's actually in the DB when a fetch fails"""
+        try:
+            with self._timeout(timeout):
+                count = await self.sessions.estimated_document_count()
+                cursor = self.sessions.find({}, {"sessionId": 1}).sort("_id", -1).limit(5)
+                sample_ids = [doc.get("sessionId") async for doc in cursor]
+            return {"total_sessions": count, "recent_ids": sample_ids}
+        except PyMongoError:
+            return "Could not fetch debug info"
+
+    async def update_session(self, session_id: str, update_data: Dict[str, Any], timeout: Optional[float] = None) -> bool:
+        """Update session data using sessionId field"""
+        with self._timeout(timeout):
+            result = await self.sessions.update_one(
+                {"sessionId": session_id},
+                {"$set": update_data}
+            )
+        return result.modified_count > 0
+
+    async def insert_transcripts(self, entries: List[Dict[str, Any]], timeout: Optional[float] = None) -> int:
+        """Batch-insert journal entries; entries already stored by an earlier retry are skipped"""
+        try:
+            with self._timeout(timeout):
+                result = await self.transcripts.insert_many(entries, ordered=False)
+            return len(result.inserted_ids)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(err.get("code") != 11000 for err in errors):
+                raise
+            return e.details.get("nInserted", 0)
+
+    async def get_transcript(self, session_id: str, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Ordered transcript for a session"""
+        with self._timeout(timeout):
+            cursor = self.transcripts.find({"sessionId": session_id}, {"_id": 0, "sessionId": 0}).sort(TRANSCRIPT_SORT)
+            return [doc async for doc in cursor]
+
+    async def close(self):
+        """Close database connection"""
+        if self._question_watch:
+            self._question_watch.cancel()
+        await self.client.close()
+
+
+# Clients are created on first use, not at import, so worker prewarm decides when to connect
+_db: Optional[Database] = None
+# An AsyncMongoClient is bound to the loop it first runs on; keep one per loop
+_async_dbs: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncDatabase]" = weakref.WeakKeyDictionary()
+
+
+def get_db() -> Database:
+    """Process-wide sync database for scripts and worker prewarm"""
+    global _db
+    if _db is None:
+        _db = Database()
+    return _db
+
+
+def get_async_db() -> AsyncDatabase:
+    """Async database for the running event loop"""
+    loop = asyncio.get_running_loop()
+    instance = _async_dbs.get(loop)
+    if instance is None:
+        instance = _async_dbs[loop] = AsyncDatabase()
+    return instance
+
+
+def __getattr__(name: str):
+    # Backwards compatible `from database import db` for scripts
+    if name == "db":
+        return get_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+if __name__ == "__main__":
+    # Opt-in debug CLI: python database.py dump-sessions --page-size 50 --limit 200
+    parser = argparse.ArgumentParser(description="Agent database debug tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    dump = commands.add_parser("dump-sessions", help="Print sessions using a paginated cursor")
+    dump.add_argument("--page-size", type=int, default=100)
+    dump.add_argument("--limit", type=int, default=None)
+    commands.add_parser("ensure-indexes", help="Create the indexes the agent relies on")
+    args = parser.parse_args()
+
+    db = get_db()
+    if args.command == "dump-sessions":
+        db.print_all_sessions(page_size=args.page_size, limit=args.limit)
+    elif args.command == "ensure-indexes":
+        db.ensure_indexes()
+    db.close()
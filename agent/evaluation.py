@@ -0,0 +1,151 @@
+"""
+Post-interview evaluation: a pooled async Groq client and a bounded
+worker queue, so many interviews ending together cannot flood the
+provider or the default thread pool.
+"""
+
+from typing import Optional, Dict, Any, Callable, Awaitable
+import asyncio
+import json
+import os
+import time
+import weakref
+
+from groq import AsyncGroq
+
+from metrics import worker_metrics
+
+EVAL_MODEL = os.getenv("EVAL_MODEL", "llama-3.1-8b-instant")
+EVAL_CONCURRENCY = int(os.getenv("EVAL_CONCURRENCY", "2"))
+EVAL_QUEUE_SIZE = int(os.getenv("EVAL_QUEUE_SIZE", "32"))
+EVAL_TIMEOUT = float(os.getenv("EVAL_TIMEOUT", "30"))
+
+FALLBACK_EVALUATION = {"strengths": ["Manual review required"]}
+
+_groq_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncGroq]" = weakref.WeakKeyDictionary()
+_queues: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, EvaluationQueue]" = weakref.WeakKeyDictionary()
+
+
+def get_groq_client() -> AsyncGroq:
+    """Shared AsyncGroq (one keep-alive connection pool) for the running loop"""
+    loop = asyncio.get_running_loop()
+    client = _groq_clients.get(loop)
+    if client is None:
+        client = _groq_clients[loop] = AsyncGroq(
+            api_key=os.getenv("GROQ_API_KEY"), timeout=EVAL_TIMEOUT, max_retries=2
+        )
+    return client
+
+
+async def generate_evaluation(client, prompt: str) -> Dict[str, Any]:
+    """One JSON-mode completion; falls back to a manual-review stub"""
+    started = time.monotonic()
+    try:
+        response = await client.chat.completions.create(
+            model=EVAL_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.1,
+            response_format={"type": "json_object"},
+        )
+        evaluation = json.loads(response.choices[0].message.content.strip())
+    except Exception as e:
+        print(f"⚠️ [EVAL_LLM_FAIL] {type(e).__name__}: {e}")
+        evaluation = dict(FALLBACK_EVALUATION)
+    worker_metrics.histogram("interview_eval_llm_seconds", "Evaluation LLM call").observe(
+        time.monotonic() - started
+    )
+    return evaluation
+
+
+class EvaluationQueue:
+    """Bounded FIFO of evaluation jobs run by a fixed number of workers.
+
+    `submit` never blocks: callers get a future back (or None when the
+    queue is full) and can leave the room while the job runs.
+    """
+
+    def __init__(self, concurrency: int = EVAL_CONCURRENCY, max_queue: int = EVAL_QUEUE_SIZE):
+        self.concurrency = max(1, concurrency)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._workers = []
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.in_flight = 0
+
+    def _ensure_workers(self):
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.concurrency)]
+
+    def submit(self, key: str, job: Callable[[], Awaitable[Any]]) -> Optional[asyncio.Future]:
+        """Queue `job` under `key` (one job per key); None when the queue is full"""
+        if key in self._pending and not self._pending[key].done():
+            return self._pending[key]
+        self._ensure_workers()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((key, job, future, time.monotonic()))
+        except asyncio.QueueFull:
+            worker_metrics.inc("interview_eval_rejected_total", help_text="Evaluations refused by a full queue")
+            print(f"⚠️ [EVAL_QUEUE_FULL] {key} rejected ({self._queue.qsize()} queued)")
+            return None
+        self._pending[key] = future
+        worker_metrics.inc("interview_eval_submitted_total", help_text="Evaluations queued")
+        print(f"📥 [EVAL_QUEUED] {key} (depth {self._queue.qsize()}, running {self.in_flight})")
+        return future
+
+    async def wait_for(self, key: str, timeout: float) -> bool:
+        """Wait (bounded) for the job under `key`; True when it finished"""
+        future = self._pending.get(key)
+        if future is None:
+            return True
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        except Exception:
+            return True
+
+    async def _worker(self, index: int):
+        while True:
+            key, job, future, queued_at = await self._queue.get()
+            worker_metrics.histogram("interview_eval_queue_wait_seconds", "Time evaluations spend queued").observe(
+                time.monotonic() - queued_at
+            )
+            self.in_flight += 1
+            started = time.monotonic()
+            try:
+                result = await job()
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                print(f"❌ [EVAL_JOB_ERR] {key}: {e}")
+                worker_metrics.inc("interview_eval_failed_total", help_text="Evaluation jobs that raised")
+                if not future.done():
+                    future.set_exception(e)
+                    # Nobody may await it; mark the exception as retrieved
+                    future.exception()
+            finally:
+                self.in_flight -= 1
+                self._pending.pop(key, None)
+                self._queue.task_done()
+                worker_metrics.histogram("interview_eval_job_seconds", "Evaluation job duration").observe(
+                    time.monotonic() - started
+                )
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+
+def get_evaluation_queue() -> EvaluationQueue:
+    """Evaluation queue for the running loop"""
+    loop = asyncio.get_running_loop()
+    queue = _queues.get(loop)
+    if queue is None:
+        queue = _queues[loop] = EvaluationQueue()
+    return queue
+
+
+worker_metrics.gauge("interview_eval_queue_depth", lambda: sum(q.depth() for q in list(_queues.values())),
+                     "Evaluations waiting for a worker")
+worker_metrics.gauge("interview_eval_in_flight", lambda: sum(q.in_flight for q in list(_queues.values())),
+                     "Evaluations currently running")
@@ -0,0 +1,236 @@
+"""
+Per-question interview kits, built offline so a session does no prompt
+work and no LLM turn before the interview starts.
+
+A kit stores, per question:
+- the rendered system instructions: a fixed prefix shared by every
+  question (role, flow and rules) followed by the problem, so provider
+  prompt caches can reuse the prefix across sessions
+- a spoken explanation script for phase 1, played from the audio cache
+- a canonical brute-force hint and optimal hint the interviewer may use
+  to nudge a stuck candidate
+
+Kits live in the `interview_kits` collection and are only used while
+their `sourceHash` still matches the question and this prompt. Build them
+before a deploy (then run `python tts_cache.py prerender`):
+
+    cd agent
+    python interview_kit.py build
+"""
+
+from typing import Optional, Dict, Any, List
+import argparse
+import asyncio
+import datetime
+import hashlib
+import json
+import os
+import re
+import textwrap
+
+from context_budget import estimate_tokens
+from metrics import worker_metrics
+
+KIT_VERSION = 1
+KIT_MODEL = os.getenv("KIT_MODEL", "llama-3.3-70b-versatile")
+KIT_HINT_MAX_WORDS = int(os.getenv("KIT_HINT_MAX_WORDS", "40"))
+
+# Identical for every question and every session; keep anything
+# problem-specific out of it so it stays a cacheable prompt prefix
+BASE_INSTRUCTIONS = textwrap.dedent("""\
+    # Role
+    You are Athena, a professional Technical Interviewer. You are conducting a structured coding interview on the problem at the end of these instructions.
+
+    # Interview Flow (Follow Strictly)
+    1. **Problem Explanation**: Explain the problem in detail. Provide a clear example with input and expected output. Ask if the candidate understands. If you have already explained it in this conversation, do not explain it again.
+    2. **Brute Force Discussion**: Ask the candidate to describe a brute force approach first. Discuss their logic, time complexity, and space complexity. Ask "What can be done better?" to nudge them.
+    3. **Optimal Solution**: Once brute force is clear, discuss the optimal approach. Ask why this method is better and discuss the new complexities.
+    4. **Coding Phase**: Only after the logic is fully discussed, invite the candidate to start coding in the editor.
+
+    # IMPORTANT: ENDING THE INTERVIEW (MANDATORY)
+    - When the candidate confirms they want to end the interview, you MUST conclude the interview.
+    - To conclude, say a brief warm one-sentence goodbye and then append the exact token [[END_INTERVIEW]] at the very end of your response.
+    - THIS IS MANDATORY: include the token exactly as shown (no extra characters).
+
+    # Stage Markers
+    - When you move the interview to a new stage, append the silent marker [[PHASE:brute_force]], [[PHASE:optimal]] or [[PHASE:coding]] to that response.
+
+    # CODE EDITOR RULES (MANDATORY)
+    - You have access to a tool `get_latest_code`.
+    - **Explicit Request**: If candidate asks "How does this look?" or "Review my code", call `get_latest_code`,`analyze my code`, `I have written code in editor check it`.
+    - **Rule**: If you check the code and find they haven't written anything new or are just starting, stay silent or give a tiny verbal nudge without mentioning the editor.
+    - **Rule**: Only give detailed feedback if you see a logical block or an error in the editor.
+
+    # How to handle the Code Editor
+    - You will receive "CANDIDATE CODE UPDATE" messages in your context history.
+    - **Rule**: Whenever you see a new code block, analyze it silently.
+    - **Rule**: Only speak if the candidate asks a question, or if they have finished a significant logic block and seem stuck.
+    - **Rule**: Do not comment on every character.
+    - **Rule**: Whenever you receive a "CANDIDATE CODE UPDATE", do NOT speak immediately unless the candidate explicitly asks "What do you think?" or "Is this correct?".
+    - **Rule**: Silently absorb the code into your logic for the next turn of the conversation.
+    - **Rule**: Do not tell the candidate the answer by yourself unless they explicitly ask for help.
+
+    # Voice Output & Formatting
+    - **NO Full Stops**: Never use periods (.) to end sentences. Use commas or line breaks.
+    - **Plain Text Only**: No markdown, no bolding (**), and no backticks (code blocks) in your speech.
+    - **Brevity**: 1-3 sentences maximum per turn to keep it conversational.
+    """)
+
+SCRIPT_PROMPT = """You are preparing material for a spoken mock coding interview on this problem.
+
+Title: {title}
+Description: {description}
+Example Input: {example_input}
+Example Output: {example_output}
+
+Return a JSON object with exactly these string fields:
+- "explanation": what the interviewer says to explain the problem, in 3 to 5 short spoken sentences, walking through the example input and expected output, ending with a question asking if the candidate understands
+- "brute_force_hint": one nudge toward a correct brute force approach, at most {max_words} words, without giving the full solution
+- "optimal_hint": one nudge toward the optimal approach and its complexity, at most {max_words} words, without giving the code
+
+Everything is read aloud by a voice: plain text, no markdown, no code, no bullet points, and use commas instead of full stops."""
+
+
+def _fields(question: Dict[str, Any]) -> Dict[str, str]:
+    return {
+        "title": question.get("title") or "the assigned problem",
+        "description": question.get("description") or "No description provided.",
+        "example_input": question.get("exampleInput") or "N/A",
+        "example_output": question.get("exampleOutput") or "N/A",
+    }
+
+
+def render_instructions(question: Dict[str, Any], hints: Optional[Dict[str, str]] = None) -> str:
+    """System instructions: the shared prefix, then this problem (and its hints)"""
+    f = _fields(question)
+    parts = [
+        BASE_INSTRUCTIONS,
+        "# The Problem to Discuss",
+        f"Title: {f['title']}",
+        f"Description: {f['description']}",
+        f"Example Input: {f['example_input']}",
+        f"Example Output: {f['example_output']}",
+    ]
+    if hints:
+        parts += [
+            "",
+            "# Hints (only when the candidate is stuck, one at a time, never the full answer)",
+            f"- Brute force: {hints.get('bruteForce', '')}",
+            f"- Optimal: {hints.get('optimal', '')}",
+        ]
+    return "\n".join(parts) + "\n"
+
+
+def source_hash(question: Dict[str, Any]) -> str:
+    """Changes whenever the question text, the base prompt or the kit format does"""
+    identity = json.dumps([KIT_VERSION, BASE_INSTRUCTIONS, _fields(question)], sort_keys=True)
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+
+def usable_kit(kit: Optional[Dict[str, Any]], question: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """`kit` if it was built from this exact question and prompt, else None"""
+    if not kit:
+        return None
+    if kit.get("sourceHash") != source_hash(question) or not kit.get("instructions") or not kit.get("explanation"):
+        worker_metrics.inc("interview_kit_stale_total", help_text="Kits ignored because the question or prompt changed")
+        print(f"⚠️ [KIT_STALE] {kit.get('questionId')}: rebuild with `python interview_kit.py build`")
+        return None
+    return kit
+
+
+def spoken(text: str) -> str:
+    """Text the voice rules allow: no markdown and no sentence-ending full stops"""
+    text = re.sub(r"[*`#]+", "", str(text or ""))
+    # "3.5" stays whole, only stops before whitespace or the end go
+    text = re.sub(r"\.+\s+([A-Z])(?=[a-z])", lambda m: ", " + m.group(1).lower(), text)
+    text = re.sub(r"\.+(?=\s|$)", ",", text)
+    text = " ".join(text.split())
+    return text.rstrip(", ")
+
+
+def assemble_kit(question: Dict[str, Any], script: Dict[str, str], model: str = KIT_MODEL) -> Dict[str, Any]:
+    """Kit document for `question` from a generated (or hand-written) script"""
+    explanation = spoken(script.get("explanation"))
+    if explanation and not explanation.endswith("?"):
+        explanation += ", does that make sense?"
+    hints = {
+        "bruteForce": spoken(script.get("brute_force_hint")),
+        "optimal": spoken(script.get("optimal_hint")),
+    }
+    instructions = render_instructions(question, hints)
+    return {
+        "questionId": question.get("questionId"),
+        "version": KIT_VERSION,
+        "sourceHash": source_hash(question),
+        "model": model,
+        "instructions": instructions,
+        "instructionTokens": estimate_tokens(instructions),
+        "explanation": explanation,
+        "hints": hints,
+        "builtAt": datetime.datetime.now(datetime.timezone.utc),
+    }
+
+
+async def generate_script(client, question: Dict[str, Any], model: str = KIT_MODEL) -> Dict[str, str]:
+    """Explanation and hints for `question` from one JSON-mode completion"""
+    response = await client.chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": SCRIPT_PROMPT.format(max_words=KIT_HINT_MAX_WORDS, **_fields(question))}],
+        temperature=0.3,
+        response_format={"type": "json_object"},
+    )
+    script = json.loads(response.choices[0].message.content.strip())
+    missing = [k for k in ("explanation", "brute_force_hint", "optimal_hint") if not script.get(k)]
+    if missing:
+        raise ValueError(f"script is missing {missing}")
+    return script
+
+
+async def build_kits(question_ids: Optional[List[str]] = None, force: bool = False) -> Dict[str, int]:
+    """Build (or rebuild when stale, or with `force`) the kit of every active question"""
+    from database import get_async_db
+    from evaluation import get_groq_client
+
+    db = get_async_db()
+    client = get_groq_client()
+    query: Dict[str, Any] = {"isActive": {"$ne": False}}
+    if question_ids:
+        query["questionId"] = {"$in": question_ids}
+    result = {"questions": 0, "current": 0, "built": 0, "failed": 0}
+    async for question in db.questions.find(query):
+        question_id = question.get("questionId")
+        if not question_id:
+            continue
+        result["questions"] += 1
+        existing = await db.interview_kits.find_one({"questionId": question_id}, {"sourceHash": 1})
+        if not force and existing and existing.get("sourceHash") == source_hash(question):
+            result["current"] += 1
+            continue
+        try:
+            kit = assemble_kit(question, await generate_script(client, question))
+            await db.interview_kits.replace_one({"questionId": question_id}, kit, upsert=True)
+            result["built"] += 1
+            print(f"🧰 [KIT_BUILT] {question_id}: {kit['instructionTokens']} instruction tokens")
+        except Exception as e:
+            result["failed"] += 1
+            print(f"❌ [KIT_BUILD_ERR] {question_id}: {e}")
+    print(f"🧰 [KIT_BUILD] {result}")
+    return result
+
+
+def main():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Per-question interview kits")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Build missing or stale kits for every question")
+    build.add_argument("--question-id", action="append", dest="question_ids", help="Only these questions")
+    build.add_argument("--force", action="store_true", help="Rebuild even when the kit is current")
+    args = parser.parse_args()
+    if args.command == "build":
+        asyncio.run(build_kits(args.question_ids, args.force))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+End-of-interview state machine: running -> ending -> evaluated -> closed
+
+The [[END_INTERVIEW]] token and every `request_end` packet from the End
+button can ask to end the interview. Only the first request starts the end
+sequence (one evaluation, one persist, one notify); later requests join it.
+
+The lifecycle also owns the session's background tasks and the "leave"
+signal the entrypoint waits on, so a finished interview tears down and
+returns instead of holding its worker slot.
+"""
+
+from typing import Optional, Callable, Awaitable, Coroutine, List, Set, Tuple
+import asyncio
+import os
+import time
+
+from metrics import worker_metrics
+
+RUNNING, ENDING, EVALUATED, CLOSED = "running", "ending", "evaluated", "closed"
+STATES = (RUNNING, ENDING, EVALUATED, CLOSED)
+
+# Longest the goodbye may keep playing before the agent leaves anyway
+GOODBYE_PLAYOUT_CAP = float(os.getenv("GOODBYE_PLAYOUT_CAP", "8"))
+# How long cancelled session tasks get to unwind
+TASK_CANCEL_GRACE = 2.0
+
+
+class InterviewLifecycle:
+    """Per-session shutdown state. Transitions only move forward, and every
+    state up to the current one counts as reached (closing without an
+    evaluation still releases anyone waiting for 'evaluated')."""
+
+    def __init__(self, session_id: Optional[str] = None):
+        self.session_id = session_id
+        self.state = RUNNING
+        self.end_reason: Optional[str] = None
+        self.duplicates = 0
+        self.history: List[Tuple[str, float]] = [(RUNNING, time.time())]
+        self._reached = {state: asyncio.Event() for state in STATES}
+        self._reached[RUNNING].set()
+        self._end_task: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._leave = asyncio.Event()
+        self.leave_reason: Optional[str] = None
+
+    def end(self, reason: str, sequence: Callable[[], Awaitable[None]]) -> Optional[asyncio.Task]:
+        """Run `sequence` for the first end request only; later calls get the
+        same task back. None once the session closed without ending."""
+        if self._end_task is not None or self.state != RUNNING:
+            self.duplicates += 1
+            worker_metrics.inc("interview_end_duplicates_total", help_text="End requests after the first", reason=reason)
+            print(f"🔁 [END_DUPLICATE] {self.session_id}: '{reason}' ignored, "
+                  f"already {self.state} (ended by '{self.end_reason}')")
+            return self._end_task
+        self.end_reason = reason
+        self.advance(ENDING)
+        worker_metrics.inc("interview_end_total", help_text="End sequences started", reason=reason)
+        self._end_task = asyncio.create_task(sequence())
+        return self._end_task
+
+    def advance(self, state: str) -> bool:
+        """Move forward to `state`; False (and no change) if already there or past it"""
+        if STATES.index(state) <= STATES.index(self.state):
+            return False
+        print(f"🚦 [LIFECYCLE] {self.session_id}: {self.state} -> {state}")
+        self.state = state
+        self.history.append((state, time.time()))
+        for reached in STATES[:STATES.index(state) + 1]:
+            self._reached[reached].set()
+        return True
+
+    def reached(self, state: str) -> bool:
+        return STATES.index(self.state) >= STATES.index(state)
+
+    async def wait_for(self, state: str, timeout: float) -> bool:
+        """Wait (bounded) until `state` is reached; True when it was"""
+        try:
+            await asyncio.wait_for(self._reached[state].wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def spawn(self, coro: Coroutine) -> asyncio.Task:
+        """Start a session-owned task; it is cancelled at teardown"""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def leave(self, reason: str):
+        """Ask the entrypoint to tear the session down (first reason wins)"""
+        if not self._leave.is_set():
+            self.leave_reason = reason
+            self._leave.set()
+
+    async def wait_leave(self) -> str:
+        await self._leave.wait()
+        return self.leave_reason
+
+    async def cancel_tasks(self, grace: float = TASK_CANCEL_GRACE) -> int:
+        """Cancel every session-owned task still running; returns how many"""
+        current = asyncio.current_task()
+        tasks = [t for t in self._tasks if t is not current and not t.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=grace)
+        return len(tasks)
+
+
+async def wait_for_playout(session, cap: float = GOODBYE_PLAYOUT_CAP, speech=None) -> bool:
+    """Wait until `speech` (default: whatever is playing now, i.e. the goodbye)
+    has finished, at most `cap` seconds; True when it finished in time or
+    nothing was playing"""
+    speech = speech or getattr(session, "current_speech", None)
+    if speech is None or speech.done():
+        return True
+    try:
+        await asyncio.wait_for(asyncio.shield(speech.wait_for_playout()), cap)
+        return True
+    except asyncio.TimeoutError:
+        return False
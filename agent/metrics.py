@@ -0,0 +1,455 @@
+"""
+Per-turn latency instrumentation and a local Prometheus-style endpoint
+"""
+
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, Any, List, Callable
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+
+import psutil
+
+# Seconds; tuned for a voice loop where anything over ~3s feels broken
+DEFAULT_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Timeline marks in the order they happen within one turn
+TURN_MARKS = (
+    "user_speech_end",   # VAD end of user speech
+    "stt_final",         # final transcript for the turn
+    "llm_start",         # llm_node invoked
+    "llm_first_token",
+    "llm_last_token",
+    "say_start",         # fixed line queued without the LLM (say_cached)
+    "tts_first_audio",   # first synthesized frame out of tts_node
+    "playout_end",       # agent went back to listening
+)
+
+# stage name -> (from mark, to mark); a stage is recorded when both marks exist
+TURN_STAGES = {
+    "stt_delay": ("user_speech_end", "stt_final"),
+    "llm_ttft": ("llm_start", "llm_first_token"),
+    "llm_stream": ("llm_first_token", "llm_last_token"),
+    "tts_ttfb": ("llm_first_token", "tts_first_audio"),
+    "first_audio": ("user_speech_end", "tts_first_audio"),
+    "say_ttfb": ("say_start", "tts_first_audio"),
+    "playout": ("tts_first_audio", "playout_end"),
+    "turn_total": ("user_speech_end", "playout_end"),
+}
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+class Histogram:
+    """Cumulative-bucket histogram plus a bounded sample window for quantiles"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window: int = 2048):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+            self._samples.append(value)
+
+    def quantiles(self) -> Dict[str, float]:
+        with self._lock:
+            values = sorted(self._samples)
+        return {f"p{int(q * 100)}": round(percentile(values, q), 4) for q in QUANTILES}
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"buckets": list(zip(self.buckets, self.counts)), "count": self.count, "sum": self.sum}
+
+    def export(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"buckets": list(self.buckets), "counts": list(self.counts), "count": self.count,
+                    "sum": self.sum, "samples": list(self._samples)}
+
+
+class MetricsRegistry:
+    """Process-wide labelled histograms, counters and gauges"""
+
+    def __init__(self):
+        self.histograms: Dict[tuple, Histogram] = {}
+        self.counters: Dict[tuple, float] = {}
+        self.gauges: Dict[tuple, Callable[[], float]] = {}
+        self.help: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, help_text: str = "", **labels) -> Histogram:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+                self.help.setdefault(name, help_text)
+            return self.histograms[key]
+
+    def inc(self, name: str, value: float = 1, help_text: str = "", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+            self.help.setdefault(name, help_text)
+
+    def gauge(self, name: str, fn: Callable[[], float], help_text: str = "", **labels):
+        """Register a callback evaluated on every scrape"""
+        with self._lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = fn
+            self.help.setdefault(name, help_text)
+
+    def export(self) -> Dict[str, Any]:
+        """JSON-safe state, with gauges evaluated now (what job processes publish)"""
+        with self._lock:
+            histograms = list(self.histograms.items())
+            counters = list(self.counters.items())
+            gauges = list(self.gauges.items())
+            help_texts = dict(self.help)
+        out: Dict[str, Any] = {"pid": os.getpid(), "ts": time.time(), "help": help_texts,
+                               "histograms": [], "counters": [], "gauges": []}
+        for (name, labels), hist in histograms:
+            out["histograms"].append([name, list(labels), hist.export()])
+        for (name, labels), value in counters:
+            out["counters"].append([name, list(labels), value])
+        for (name, labels), fn in gauges:
+            try:
+                out["gauges"].append([name, list(labels), float(fn())])
+            except Exception:
+                continue
+        return out
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        merged = MergedMetrics()
+        merged.add(self.export())
+        return merged.render()
+
+
+class MergedMetrics:
+    """Sum of registry exports from several processes: histogram buckets and
+    counters add up, gauges keep a `pid` label when `per_process` is set
+    (a gauge like cache bytes must not be summed across processes).
+    """
+
+    def __init__(self, window: int = 2048):
+        self.window = window
+        self.help: Dict[str, str] = {}
+        self.histograms: Dict[tuple, Dict[str, Any]] = {}
+        self.counters: Dict[tuple, float] = {}
+        self.gauges: Dict[tuple, float] = {}
+
+    def add(self, export: Dict[str, Any], gauges: bool = True, per_process: bool = False):
+        for name, text in export.get("help", {}).items():
+            self.help.setdefault(name, text)
+        for name, labels, hist in export.get("histograms", []):
+            key = (name, tuple(tuple(pair) for pair in labels))
+            mine = self.histograms.get(key)
+            if mine is None:
+                self.histograms[key] = {**hist, "counts": list(hist["counts"]), "samples": list(hist["samples"])}
+            elif list(mine["buckets"]) == list(hist["buckets"]):
+                mine["counts"] = [a + b for a, b in zip(mine["counts"], hist["counts"])]
+                mine["count"] += hist["count"]
+                mine["sum"] += hist["sum"]
+                mine["samples"] = (mine["samples"] + list(hist["samples"]))[-self.window:]
+        for name, labels, value in export.get("counters", []):
+            key = (name, tuple(tuple(pair) for pair in labels))
+            self.counters[key] = self.counters.get(key, 0) + value
+        if not gauges:
+            return
+        for name, labels, value in export.get("gauges", []):
+            pairs = [tuple(pair) for pair in labels]
+            if per_process:
+                pairs.append(("pid", str(export.get("pid"))))
+            key = (name, tuple(pairs))
+            self.gauges[key] = self.gauges.get(key, 0) + value
+
+    def export(self) -> Dict[str, Any]:
+        """Back to registry-export shape, so merged metrics can be merged again"""
+        return {
+            "help": dict(self.help),
+            "histograms": [[name, list(labels), hist] for (name, labels), hist in self.histograms.items()],
+            "counters": [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+            "gauges": [[name, list(labels), value] for (name, labels), value in self.gauges.items()],
+        }
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines: List[str] = []
+        typed = set()
+
+        def header(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# HELP {name} {self.help.get(name, '')}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        def fmt(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}" if pairs else ""
+
+        histograms = sorted(self.histograms.items(), key=lambda kv: kv[0])
+        for (name, labels), hist in histograms:
+            header(name, "histogram")
+            for bound, count in zip(hist["buckets"], hist["counts"]):
+                lines.append(f"{name}_bucket{fmt(labels, [('le', bound)])} {count}")
+            lines.append(f"{name}_bucket{fmt(labels, [('le', '+Inf')])} {hist['count']}")
+            lines.append(f"{name}_sum{fmt(labels)} {hist['sum']:.6f}")
+            lines.append(f"{name}_count{fmt(labels)} {hist['count']}")
+        for (name, labels), hist in histograms:
+            qname = f"{name}_quantile"
+            header(qname, "gauge")
+            values = sorted(hist["samples"])
+            for q in QUANTILES:
+                lines.append(f"{qname}{fmt(labels, [('quantile', f'p{int(q * 100)}')])} {round(percentile(values, q), 4)}")
+        for (name, labels), value in sorted(self.counters.items(), key=lambda kv: kv[0]):
+            header(name, "counter")
+            lines.append(f"{name}{fmt(labels)} {value}")
+        for (name, labels), value in sorted(self.gauges.items(), key=lambda kv: kv[0]):
+            header(name, "gauge")
+            lines.append(f"{name}{fmt(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Per-worker-process metrics
+worker_metrics = MetricsRegistry()
+
+STAGE_METRIC = "interview_turn_stage_seconds"
+STAGE_HELP = "Voice loop latency per turn stage"
+
+
+class TurnTimeline:
+    """Monotonic timestamps for the marks of one conversational turn"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.marks: Dict[str, float] = {}
+
+    def mark(self, name: str, at: Optional[float] = None):
+        # First occurrence wins: several events can report the same moment
+        self.marks.setdefault(name, time.monotonic() if at is None else at)
+
+    def stages(self) -> Dict[str, float]:
+        out = {}
+        for stage, (start, end) in TURN_STAGES.items():
+            if start in self.marks and end in self.marks and self.marks[end] >= self.marks[start]:
+                out[stage] = self.marks[end] - self.marks[start]
+        return out
+
+
+class SessionLatencyTracker:
+    """Builds one TurnTimeline per turn and feeds finished turns into
+    the worker histograms and a per-session summary.
+    """
+
+    def __init__(self, session_id: Optional[str] = None, registry: MetricsRegistry = worker_metrics):
+        self.session_id = session_id
+        self._registry = registry
+        self._turn: Optional[TurnTimeline] = None
+        self._turns = 0
+        self._session_hists: Dict[str, Histogram] = {}
+        # Stage timings of recent finished turns, for benchmarks and debugging
+        self.completed: deque = deque(maxlen=256)
+
+    def begin_turn(self) -> TurnTimeline:
+        """Start a new turn (user started speaking, or the agent speaks first)"""
+        if self._turn is not None and self._turn.marks:
+            self.finish_turn()
+        self._turns += 1
+        self._turn = TurnTimeline(self._turns)
+        return self._turn
+
+    def mark(self, name: str):
+        if self._turn is None:
+            self.begin_turn()
+        self._turn.mark(name)
+
+    def finish_turn(self):
+        turn, self._turn = self._turn, None
+        if turn is None:
+            return
+        stages = turn.stages()
+        self.completed.append({"turn": turn.index, **stages})
+        for stage, seconds in stages.items():
+            self._registry.histogram(STAGE_METRIC, STAGE_HELP, stage=stage).observe(seconds)
+            self._session_hists.setdefault(stage, Histogram()).observe(seconds)
+        if stages:
+            pretty = " ".join(f"{k}={v * 1000:.0f}ms" for k, v in stages.items())
+            print(f"⏱️ [TURN_LATENCY] #{turn.index} {pretty}")
+
+    def summary(self) -> Dict[str, Any]:
+        """Per-session p50/p95/p99 per stage, for storing with the session"""
+        return {
+            "turns": self._turns,
+            "stages": {
+                stage: {**hist.quantiles(), "count": hist.count, "mean": round(hist.sum / hist.count, 4)}
+                for stage, hist in self._session_hists.items() if hist.count
+            },
+        }
+
+
+# Job processes publish their registry here for the main process to serve;
+# set before they start so they inherit the same directory
+METRICS_EXPORT_DIR = os.environ.setdefault(
+    "WORKER_METRICS_DIR", os.path.join(tempfile.gettempdir(), f"interview-metrics-{os.getpid()}")
+)
+METRICS_EXPORT_INTERVAL = 5.0
+METRICS_EXPORT_STALE_AFTER = 3 * METRICS_EXPORT_INTERVAL
+
+
+def _export_path(pid: int) -> str:
+    return os.path.join(METRICS_EXPORT_DIR, f"{pid}.json")
+
+
+def publish_metrics(registry: MetricsRegistry = worker_metrics):
+    """Write this process's registry for the main process's /metrics"""
+    path = _export_path(os.getpid())
+    try:
+        os.makedirs(METRICS_EXPORT_DIR, exist_ok=True)
+        with open(path + ".tmp", "w") as f:
+            json.dump(registry.export(), f)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        print(f"⚠️ [METRICS_EXPORT_ERR] {e}")
+
+
+_exporter: Optional[threading.Thread] = None
+
+
+def start_metrics_export() -> bool:
+    """Publish this job process's metrics every few seconds and at exit (once per process).
+
+    No-op unless METRICS_PORT is set, since nothing would serve them.
+    """
+    global _exporter
+    if _exporter is not None or not os.getenv("METRICS_PORT"):
+        return _exporter is not None
+
+    def run():
+        while True:
+            publish_metrics()
+            time.sleep(METRICS_EXPORT_INTERVAL)
+
+    _exporter = threading.Thread(target=run, name="metrics-export", daemon=True)
+    _exporter.start()
+    atexit.register(publish_metrics)
+    return True
+
+
+class JobMetricsCollector:
+    """Folds the job processes' exports into the main process's /metrics.
+
+    Exports of processes that exited keep their histograms and counters (so
+    totals never go backwards) but drop their gauges; they are merged into
+    `retired` once and their files removed.
+    """
+
+    def __init__(self, registry: MetricsRegistry = worker_metrics):
+        self.registry = registry
+        self.retired = MergedMetrics()
+        self._lock = threading.Lock()
+
+    def _read_exports(self) -> List[Dict[str, Any]]:
+        try:
+            names = os.listdir(METRICS_EXPORT_DIR)
+        except OSError:
+            return []
+        exports = []
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(METRICS_EXPORT_DIR, name)) as f:
+                    exports.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return exports
+
+    def render(self) -> str:
+        with self._lock:
+            live = []
+            now = time.time()
+            for export in self._read_exports():
+                pid = export.get("pid")
+                if pid == os.getpid():
+                    # Job threads of this process are already in the registry
+                    continue
+                if now - export.get("ts", 0) > METRICS_EXPORT_STALE_AFTER and not psutil.pid_exists(pid):
+                    self.retired.add(export, gauges=False)
+                    try:
+                        os.remove(_export_path(pid))
+                    except OSError:
+                        pass
+                    continue
+                live.append(export)
+            merged = MergedMetrics()
+            merged.add(self.registry.export())
+            merged.add(self.retired.export(), gauges=False)
+            for export in live:
+                merged.add(export, per_process=True)
+            return merged.render()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    collector: Optional[JobMetricsCollector] = None
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = self.collector.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_metrics_server: Optional[ThreadingHTTPServer] = None
+
+
+def start_metrics_server(port: Optional[int] = None) -> Optional[int]:
+    """Serve /metrics for the whole worker on 127.0.0.1 from a daemon thread.
+
+    Runs once, in the main worker process: it serves that process's registry
+    plus what the job processes publish (see start_metrics_export). Uses
+    METRICS_PORT; returns the bound port, or None when disabled or taken.
+    """
+    global _metrics_server
+    if _metrics_server is not None:
+        return _metrics_server.server_address[1]
+    if port is None:
+        raw = os.getenv("METRICS_PORT")
+        if not raw:
+            return None
+        port = int(raw)
+    try:
+        _metrics_server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+    except OSError as e:
+        print(f"❌ [METRICS_ERR] cannot bind 127.0.0.1:{port}: {e}")
+        return None
+    _MetricsHandler.collector = JobMetricsCollector()
+    threading.Thread(target=_metrics_server.serve_forever, name="metrics-http", daemon=True).start()
+    bound = _metrics_server.server_address[1]
+    print(f"📈 [METRICS] http://127.0.0.1:{bound}/metrics (pid {os.getpid()})")
+    return bound
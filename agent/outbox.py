@@ -0,0 +1,328 @@
+"""
+Durable outbox for backend notifications (the evaluation PUT)
+
+A request is written to a local SQLite file before anything is sent, and a
+background sender delivers it over a pooled aiohttp session: one
+idempotency key per notification, exponential backoff with jitter, and up
+to OUTBOX_BATCH due requests per pass while the backend catches up. The
+worker's main process also runs a sender, so whatever a finished job could
+not deliver, or a crash left behind, is replayed at worker start.
+
+Several processes may share the file; rows are claimed with a short lease
+so only one sender works on a request at a time.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import time
+import weakref
+
+import aiohttp
+
+from metrics import worker_metrics
+
+BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:5000")
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".outbox.sqlite3"))
+# Due requests sent per pass (concurrently, over the pooled connections)
+OUTBOX_BATCH = int(os.getenv("OUTBOX_BATCH", "16"))
+# After this many failed attempts a request is parked as 'dead'
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "12"))
+OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", "1"))
+OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "300"))
+OUTBOX_TIMEOUT = float(os.getenv("OUTBOX_TIMEOUT", "10"))
+# A claimed row goes back to the pool if its sender dies
+LEASE_SECONDS = OUTBOX_TIMEOUT * 3
+# Longest the sender sleeps before looking for rows other processes left
+IDLE_POLL = 30.0
+# How long close() waits for the sender to stop (an in-flight send is bounded by OUTBOX_TIMEOUT)
+CLOSE_TIMEOUT = OUTBOX_TIMEOUT + 1
+TASK_CANCEL_TIMEOUT = 1.0
+# Client errors that will not succeed on retry
+PERMANENT_STATUSES = {400, 401, 403, 404, 405, 410, 413, 422}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    key TEXT PRIMARY KEY,
+    method TEXT NOT NULL,
+    url TEXT NOT NULL,
+    body TEXT NOT NULL,
+    rev INTEGER NOT NULL DEFAULT 1,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    lease_until REAL NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    last_error TEXT
+)
+"""
+
+_http_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = weakref.WeakKeyDictionary()
+_outboxes: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, NotificationOutbox]" = weakref.WeakKeyDictionary()
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Shared keep-alive aiohttp session for backend calls on the running loop"""
+    loop = asyncio.get_running_loop()
+    session = _http_sessions.get(loop)
+    if session is None or session.closed:
+        session = _http_sessions[loop] = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=OUTBOX_BATCH, keepalive_timeout=30),
+            timeout=aiohttp.ClientTimeout(total=OUTBOX_TIMEOUT),
+        )
+    return session
+
+
+def backoff_delay(attempts: int) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0.5, 1.0) * min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * 2 ** max(0, attempts - 1))
+
+
+class NotificationOutbox:
+    """SQLite-backed queue of HTTP requests to the backend.
+
+    `enqueue` only writes the row and wakes the sender, so callers never
+    wait on the backend. A newer notification with the same key replaces
+    one that has not been delivered yet.
+    """
+
+    def __init__(self, path: str = OUTBOX_PATH, batch: int = OUTBOX_BATCH, max_attempts: int = OUTBOX_MAX_ATTEMPTS):
+        self.path = path
+        self.batch = max(1, batch)
+        self.max_attempts = max_attempts
+        self.pending = 0
+        self.stats: Dict[str, int] = {"enqueued": 0, "delivered": 0, "retried": 0, "dead": 0}
+        # SQLite calls run on one thread, off the event loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="outbox")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._sending = False
+        # Set by close(); the sender checks it after every wait instead of relying on cancellation
+        self._closing = False
+
+    # --- storage (executor thread) ---
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _insert(self, key: str, method: str, url: str, body: str):
+        now = time.time()
+        db = self._db()
+        db.execute(
+            "INSERT INTO outbox (key, method, url, body, next_attempt, created) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET method=excluded.method, url=excluded.url, body=excluded.body, "
+            "rev=rev+1, status='pending', attempts=0, next_attempt=excluded.next_attempt, lease_until=0, last_error=NULL",
+            (key, method, url, body, now, now),
+        )
+        return self._count(db)
+
+    def _claim(self) -> List[tuple]:
+        """Lease up to `batch` due rows to this sender"""
+        now = time.time()
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            rows = db.execute(
+                "SELECT key, rev, method, url, body, attempts, created FROM outbox "
+                "WHERE status='pending' AND next_attempt<=? AND lease_until<=? ORDER BY next_attempt LIMIT ?",
+                (now, now, self.batch),
+            ).fetchall()
+            db.executemany("UPDATE outbox SET lease_until=? WHERE key=?", [(now + LEASE_SECONDS, r[0]) for r in rows])
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return rows
+
+    def _settle(self, delivered: List[tuple], retry: List[tuple], dead: List[tuple]):
+        """Record attempt results; `rev` guards rows replaced while in flight"""
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.executemany("DELETE FROM outbox WHERE key=? AND rev=?", delivered)
+            db.executemany("UPDATE outbox SET attempts=?, next_attempt=?, lease_until=0, last_error=? "
+                           "WHERE key=? AND rev=?", retry)
+            db.executemany("UPDATE outbox SET status='dead', attempts=?, lease_until=0, last_error=? "
+                           "WHERE key=? AND rev=?", dead)
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return self._count(db)
+
+    def _next_due(self) -> Optional[float]:
+        row = self._db().execute(
+            "SELECT MIN(MAX(next_attempt, lease_until)) FROM outbox WHERE status='pending'"
+        ).fetchone()
+        return row[0] if row else None
+
+    def _close_db(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _count(self, db) -> int:
+        return db.execute("SELECT COUNT(*) FROM outbox WHERE status='pending'").fetchone()[0]
+
+    async def _call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    # --- public ---
+
+    def start(self):
+        """Start the sender on the running loop (replays rows left from earlier runs)"""
+        if self._task is None or self._task.done():
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def enqueue(self, key: str, method: str, url: str, payload: Dict[str, Any]):
+        """Persist one request; it is sent in the background"""
+        self.pending = await self._call(self._insert, key, method, url, json.dumps(payload, default=str))
+        self.stats["enqueued"] += 1
+        print(f"📮 [OUTBOX_QUEUED] {key} ({self.pending} pending)")
+        self.start()
+        self._wake.set()
+
+    async def close(self, grace: float = 0.0):
+        """Stop the sender, first trying for up to `grace` seconds to deliver what is due"""
+        if grace > 0 and self.pending:
+            deadline = time.monotonic() + grace
+            self._wake.set()
+            while self.pending and time.monotonic() < deadline:
+                if not self._sending:
+                    # Nothing in flight: stop if no row falls due before the deadline
+                    next_due = await self._call(self._next_due)
+                    if next_due is None or next_due > time.time() + (deadline - time.monotonic()):
+                        break
+                await asyncio.sleep(0.05)
+        if self._task:
+            # A cancel can be lost while the sender sits in wait_for (Python 3.11), so
+            # ask it to stop and only cancel as a fallback; never wait unbounded
+            self._closing = True
+            self._wake.set()
+            done, _ = await asyncio.wait({self._task}, timeout=CLOSE_TIMEOUT)
+            if not done:
+                self._task.cancel()
+                done, _ = await asyncio.wait({self._task}, timeout=TASK_CANCEL_TIMEOUT)
+                if not done:
+                    print("⚠️ [OUTBOX_STUCK] sender did not stop, abandoning it")
+            self._task = None
+        loop = asyncio.get_running_loop()
+        session = _http_sessions.pop(loop, None)
+        if session is not None:
+            await session.close()
+        if self.pending:
+            print(f"📮 [OUTBOX_DEFERRED] {self.pending} notifications left for the next sender")
+        # Job threads each get an outbox: release its connection and thread, and let
+        # get_outbox() build a fresh one if this loop needs it again
+        await self._call(self._close_db)
+        self._executor.shutdown(wait=False)
+        if _outboxes.get(loop) is self:
+            del _outboxes[loop]
+
+    # --- sender ---
+
+    async def _run(self):
+        try:
+            self.pending = await self._call(lambda: self._count(self._db()))
+            if self.pending:
+                print(f"📮 [OUTBOX_START] {self.pending} pending notifications in {self.path}")
+            while not self._closing:
+                self._wake.clear()
+                rows = await self._call(self._claim)
+                if rows:
+                    await self._deliver(rows)
+                    if len(rows) == self.batch:
+                        # Backlog: keep going without waiting
+                        continue
+                if self._closing:
+                    break
+                next_due = await self._call(self._next_due)
+                wait = IDLE_POLL if next_due is None else min(IDLE_POLL, max(0.0, next_due - time.time()))
+                try:
+                    await asyncio.wait_for(self._wake.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"❌ [OUTBOX_ERR] {type(e).__name__}: {e}")
+
+    async def _deliver(self, rows: List[tuple]):
+        self._sending = True
+        try:
+            results = await asyncio.gather(*(self._send(row) for row in rows))
+        finally:
+            self._sending = False
+        delivered, retry, dead = [], [], []
+        now = time.time()
+        for (key, rev, _, _, _, attempts, created), (ok, permanent, error) in zip(rows, results):
+            attempts += 1
+            if ok:
+                delivered.append((key, rev))
+                worker_metrics.histogram("interview_outbox_delivery_seconds", "Enqueue to backend acknowledgement").observe(
+                    now - created
+                )
+            elif permanent or attempts >= self.max_attempts:
+                dead.append((attempts, error, key, rev))
+                print(f"☠️ [OUTBOX_DEAD] {key} after {attempts} attempts: {error}")
+            else:
+                delay = backoff_delay(attempts)
+                retry.append((attempts, now + delay, error, key, rev))
+                print(f"🔁 [OUTBOX_RETRY] {key} attempt {attempts} failed ({error}), next in {delay:.1f}s")
+        self.pending = await self._call(self._settle, delivered, retry, dead)
+        self.stats["delivered"] += len(delivered)
+        self.stats["retried"] += len(retry)
+        self.stats["dead"] += len(dead)
+        worker_metrics.inc("interview_outbox_delivered_total", len(delivered), "Backend notifications delivered")
+        worker_metrics.inc("interview_outbox_retries_total", len(retry), "Backend notification attempts that failed")
+        worker_metrics.inc("interview_outbox_dead_total", len(dead), "Backend notifications given up on")
+
+    async def _send(self, row: tuple):
+        """(ok, permanent, error) for one attempt"""
+        key, _, method, url, body, _, _ = row
+        try:
+            async with get_http_session().request(
+                method, url, data=body,
+                headers={"Content-Type": "application/json", "Idempotency-Key": key},
+            ) as resp:
+                if 200 <= resp.status < 300:
+                    print(f"✅ [BACKEND_ACCEPTED] {key} -> {resp.status}")
+                    return True, False, None
+                text = (await resp.text())[:200]
+                return False, resp.status in PERMANENT_STATUSES, f"HTTP {resp.status}: {text}"
+        except Exception as e:
+            return False, False, f"{type(e).__name__}: {e}"
+
+
+def get_outbox() -> NotificationOutbox:
+    """Outbox for the running loop"""
+    loop = asyncio.get_running_loop()
+    outbox = _outboxes.get(loop)
+    if outbox is None:
+        outbox = _outboxes[loop] = NotificationOutbox()
+    return outbox
+
+
+def evaluation_url(session_id: str) -> str:
+    return f"{BACKEND_URL}/api/sessions/{session_id}/evaluation"
+
+
+def install_sender(server):
+    """Run a sender in the worker's main process so pending rows are replayed at start"""
+    server.on("worker_started", lambda *_: get_outbox().start())
+
+
+worker_metrics.gauge("interview_outbox_pending", lambda: sum(o.pending for o in list(_outboxes.values())),
+                     "Backend notifications waiting for delivery")
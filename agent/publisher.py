@@ -0,0 +1,158 @@
+"""
+Single outbound data-channel publisher for one LiveKit room
+"""
+
+from collections import OrderedDict, deque
+from typing import Optional, Dict, Any
+import asyncio
+import hashlib
+import json
+import time
+
+
+class OutboundPublisher:
+    """Owns every publish_data call for a room.
+
+    - transcripts are deduped by (role, content hash, turn id)
+    - `state` packets are coalesced so only the latest queued value is sent
+    - the queue is bounded; when full, new transcripts/states are dropped
+      and counted, while control packets (interview_end, ...) always go out
+
+    When no turn id is given, a transcript's turn id is the number of
+    distinct transcripts from other roles seen so far, so repeated copies of
+    one utterance collapse but the same words in a later turn do not.
+    """
+
+    def __init__(self, room, max_queue: int = 256, dedup_size: int = 512):
+        self._room = room
+        self.max_queue = max_queue
+        self.dedup_size = dedup_size
+        self._queue: deque = deque()
+        self._queued_state: Optional[list] = None
+        self._seen: "OrderedDict[tuple, None]" = OrderedDict()
+        self._distinct: Dict[str, int] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._busy = False
+        self._closed = False
+        self.metrics = {
+            "enqueued": 0,
+            "sent": 0,
+            "bytes_sent": 0,
+            "deduped": 0,
+            "coalesced": 0,
+            "dropped": 0,
+            "failed": 0,
+            "max_depth": 0,
+            "max_queue_wait_ms": 0.0,
+        }
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def send_transcript(self, role: str, content: str, turn_id: Optional[Any] = None) -> bool:
+        """Queue a transcript unless this (role, content, turn) was already sent"""
+        content = (content or "").strip()
+        if not content:
+            return False
+        if turn_id is None:
+            turn_id = sum(n for r, n in self._distinct.items() if r != role)
+        key = (role, hashlib.sha1(content.encode("utf-8")).hexdigest(), turn_id)
+        if key in self._seen:
+            self.metrics["deduped"] += 1
+            return False
+        self._seen[key] = None
+        if len(self._seen) > self.dedup_size:
+            self._seen.popitem(last=False)
+        self._distinct[role] = self._distinct.get(role, 0) + 1
+        return self._enqueue("transcript", {"type": "transcript", "role": role, "content": content})
+
+    def send_state(self, state: str) -> bool:
+        """Queue an agent state; replaces any state that has not gone out yet"""
+        if self._queued_state is not None:
+            self._queued_state[1] = {"type": "state", "state": state}
+            self.metrics["coalesced"] += 1
+            return True
+        return self._enqueue("state", {"type": "state", "state": state})
+
+    async def send_control(self, payload: Dict[str, Any], timeout: float = 5.0) -> bool:
+        """Queue a control packet and wait until it has been published"""
+        done = asyncio.get_running_loop().create_future()
+        self._enqueue("control", payload, done=done)
+        try:
+            return await asyncio.wait_for(asyncio.shield(done), timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ [PUBLISH_TIMEOUT] {payload.get('type')} not confirmed in {timeout}s")
+            return False
+
+    def _enqueue(self, kind: str, payload: Dict[str, Any], done: Optional[asyncio.Future] = None) -> bool:
+        if self._closed:
+            if done and not done.done():
+                done.set_result(False)
+            return False
+        if kind != "control" and len(self._queue) >= self.max_queue:
+            self.metrics["dropped"] += 1
+            print(f"⚠️ [PUBLISH_BACKPRESSURE] queue full ({self.max_queue}), dropped {kind}")
+            return False
+        entry = [kind, payload, time.monotonic(), done]
+        self._queue.append(entry)
+        if kind == "state":
+            self._queued_state = entry
+        self.metrics["enqueued"] += 1
+        self.metrics["max_depth"] = max(self.metrics["max_depth"], len(self._queue))
+        self._wakeup.set()
+        return True
+
+    async def _run(self):
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                while self._queue:
+                    self._busy = True
+                    try:
+                        await self._publish(self._queue.popleft())
+                    finally:
+                        self._busy = False
+        except asyncio.CancelledError:
+            pass
+
+    async def _publish(self, entry: list):
+        kind, payload, queued_at, done = entry
+        if entry is self._queued_state:
+            self._queued_state = None
+        wait_ms = (time.monotonic() - queued_at) * 1000
+        self.metrics["max_queue_wait_ms"] = max(self.metrics["max_queue_wait_ms"], round(wait_ms, 1))
+        data = json.dumps(payload).encode("utf-8")
+        ok = False
+        try:
+            await self._room.local_participant.publish_data(data, reliable=True)
+            self.metrics["sent"] += 1
+            self.metrics["bytes_sent"] += len(data)
+            ok = True
+        except Exception as e:
+            self.metrics["failed"] += 1
+            print(f"❌ [PUBLISH_FAILED] {kind}: {e}")
+        if done and not done.done():
+            done.set_result(ok)
+
+    async def drain(self, timeout: float = 2.0):
+        """Wait until everything queued so far has been published"""
+        deadline = time.monotonic() + timeout
+        while (self._queue or self._busy) and time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+
+    async def close(self, timeout: float = 2.0):
+        if self._closed:
+            return
+        await self.drain(timeout)
+        self._closed = True
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        print(f"📊 [PUBLISHER_STATS] {self.metrics}")
@@ -0,0 +1,65 @@
+"""
+Registry of the interviews running in this worker process
+"""
+
+from contextvars import ContextVar
+from typing import Optional, Dict, Any
+import asyncio
+
+# Set inside each entrypoint; SDK tasks started from there inherit it
+current_session_key: ContextVar[Optional[str]] = ContextVar("interview_session_key", default=None)
+
+
+class SessionHandle:
+    """Per-interview routing info: where that room's packets go"""
+
+    def __init__(self, key: str, room, publisher, loop: asyncio.AbstractEventLoop):
+        self.key = key
+        self.room = room
+        self.publisher = publisher
+        self.loop = loop
+        self.session_id: Optional[str] = None
+        self.assistant = None
+
+
+class SessionRegistry:
+    """Maps room name (or job id) to the live SessionHandle.
+
+    Lets one worker process host several interviews without module globals:
+    anything that only has a log record or callback to go on can resolve
+    the owning session through `current()`.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, SessionHandle] = {}
+
+    def register(self, key: str, room, publisher) -> SessionHandle:
+        handle = SessionHandle(key, room, publisher, asyncio.get_running_loop())
+        self._sessions[key] = handle
+        current_session_key.set(key)
+        print(f"🗂️ [REGISTRY] +{key} ({len(self._sessions)} active)")
+        return handle
+
+    def unregister(self, key: str):
+        if self._sessions.pop(key, None) is not None:
+            print(f"🗂️ [REGISTRY] -{key} ({len(self._sessions)} active)")
+
+    def get(self, key: Optional[str]) -> Optional[SessionHandle]:
+        return self._sessions.get(key) if key else None
+
+    def current(self) -> Optional[SessionHandle]:
+        """Session owning the calling task; falls back to the only session when unambiguous"""
+        handle = self.get(current_session_key.get())
+        if handle is None and len(self._sessions) == 1:
+            handle = next(iter(self._sessions.values()))
+        return handle
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {key: h.session_id for key, h in self._sessions.items()}
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+# Process-wide registry
+registry = SessionRegistry()
@@ -0,0 +1,67 @@
+"""
+Clause-level text segmentation for TTS, so synthesis starts at the first
+clause instead of after the whole LLM reply.
+
+The interviewer prompt bans full stops, which leaves sentence tokenizers
+with one "sentence" per reply; this one also splits on commas, semicolons,
+colons and line breaks.
+"""
+
+from typing import List, Tuple
+import functools
+import os
+import re
+
+from livekit.agents import tokenize, tts
+from livekit.agents.tokenize import BufferedSentenceStream, SentenceStream
+
+# clause | sentence (SDK default chunking)
+TTS_SEGMENTER = os.getenv("TTS_SEGMENTER", "clause")
+# Shorter clauses are merged with the next one ("Sure," alone is not worth a request)
+TTS_MIN_CLAUSE_LEN = int(os.getenv("TTS_MIN_CLAUSE_LEN", "12"))
+# Characters of look-ahead before a clause is released
+TTS_CLAUSE_CONTEXT = int(os.getenv("TTS_CLAUSE_CONTEXT", "2"))
+
+# Punctuation followed by whitespace (so "3.5" and "a,b" in code stay whole), or line breaks
+_BOUNDARY = re.compile(r"[,;:.!?]+(?=\s)|\n+")
+
+
+def split_clauses(text: str, min_clause_len: int = TTS_MIN_CLAUSE_LEN) -> List[Tuple[str, int, int]]:
+    """(clause, start, end) spans; the last one may still be growing"""
+    out = []
+    start = 0
+    for match in _BOUNDARY.finditer(text):
+        piece = text[start:match.end()].strip()
+        if len(piece) < min_clause_len:
+            continue
+        out.append((piece, start, match.end()))
+        start = match.end()
+    rest = text[start:].strip()
+    if rest:
+        out.append((rest, start, len(text)))
+    return out
+
+
+class ClauseTokenizer(tokenize.SentenceTokenizer):
+    """SentenceTokenizer that yields clauses, for tts.StreamAdapter"""
+
+    def __init__(self, min_clause_len: int = TTS_MIN_CLAUSE_LEN, context_len: int = TTS_CLAUSE_CONTEXT):
+        self.min_clause_len = min_clause_len
+        self.context_len = context_len
+
+    def tokenize(self, text: str, *, language=None) -> List[str]:
+        return [clause for clause, _, _ in split_clauses(text, self.min_clause_len)]
+
+    def stream(self, *, language=None) -> SentenceStream:
+        return BufferedSentenceStream(
+            tokenizer=functools.partial(split_clauses, min_clause_len=self.min_clause_len),
+            min_token_len=self.min_clause_len,
+            min_ctx_len=self.context_len,
+        )
+
+
+def wrap_tts(engine: tts.TTS, mode: str = TTS_SEGMENTER) -> tts.TTS:
+    """Feed `engine` one clause at a time (mode 'clause'); other modes leave it as is"""
+    if mode != "clause":
+        return engine
+    return tts.StreamAdapter(tts=engine, sentence_tokenizer=ClauseTokenizer())
@@ -0,0 +1,179 @@
+"""
+Rolling per-phase interview summary, built in the background while the
+interview runs so the final evaluation only needs a compact digest.
+"""
+
+from typing import Optional, Dict, Any, List, Callable, Set, Tuple
+import asyncio
+import os
+import re
+import time
+
+from metrics import worker_metrics
+
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "llama-3.1-8b-instant")
+# Condense once this many turns are waiting
+SUMMARY_BATCH_TURNS = int(os.getenv("SUMMARY_BATCH_TURNS", "6"))
+SUMMARY_MAX_WORDS = int(os.getenv("SUMMARY_MAX_WORDS", "120"))
+# Unsummarized turns ever sent verbatim to the evaluation
+SUMMARY_TAIL_TURNS = int(os.getenv("SUMMARY_TAIL_TURNS", "12"))
+
+# Interview flow from the system prompt, in order
+PHASES = ("explanation", "brute_force", "optimal", "coding")
+PHASE_TITLES = {
+    "explanation": "Problem explanation",
+    "brute_force": "Brute force discussion",
+    "optimal": "Optimal solution",
+    "coding": "Coding",
+}
+# Interviewer lines that move the interview into a phase
+PHASE_CUES = (
+    ("coding", re.compile(r"start coding|in the editor|write (the|your) code|go ahead and code", re.I)),
+    ("optimal", re.compile(r"optimal|optimi[sz]|more efficient|do better|what can be done better", re.I)),
+    ("brute_force", re.compile(r"brute[- ]?force|naive approach|simplest approach", re.I)),
+)
+
+
+def detect_phase(text: str) -> Optional[str]:
+    for phase, pattern in PHASE_CUES:
+        if pattern.search(text):
+            return phase
+    return None
+
+
+class RollingSummarizer:
+    """Keeps the interview as per-phase running summaries plus a short
+    tail of turns not yet condensed.
+
+    `add()` is cheap and never blocks; once SUMMARY_BATCH_TURNS turns are
+    waiting (or the phase changes) one background task folds them into the
+    phase summary with a small model. Phases only move forward.
+    """
+
+    def __init__(self, client_factory: Callable[[], Any], session_id: Optional[str] = None):
+        self._client_factory = client_factory
+        self.session_id = session_id
+        self.phase = PHASES[0]
+        self.summaries: Dict[str, str] = {}
+        # (phase, role, text) for every finished turn
+        self.turns: List[Tuple[str, str, str]] = []
+        # turns[:summarized] are folded into `summaries`
+        self.summarized = 0
+        # Chat item id per turn (None when added without one), and the ids already summarized
+        self._item_ids: List[Optional[str]] = []
+        self.summarized_ids: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        self.calls = 0
+
+    def add(self, role: str, text: str, item_id: Optional[str] = None):
+        text = (text or "").strip()
+        if not text or self._closed:
+            return
+        if role == "assistant":
+            cue = detect_phase(text)
+            if cue:
+                self.advance(cue)
+        self.turns.append((self.phase, role, text))
+        self._item_ids.append(item_id)
+        self._maybe_schedule()
+
+    def advance(self, phase: str):
+        """Move to `phase` if it comes later in the interview flow"""
+        if phase in PHASES and PHASES.index(phase) > PHASES.index(self.phase):
+            print(f"🧭 [PHASE] {self.session_id}: {self.phase} -> {phase}")
+            self.phase = phase
+            self._maybe_schedule(force=True)
+
+    def note_code(self):
+        """Code in the editor means the interview reached the coding phase"""
+        self.advance("coding")
+
+    def _maybe_schedule(self, force: bool = False):
+        pending = len(self.turns) - self.summarized
+        if not pending or (pending < SUMMARY_BATCH_TURNS and not force):
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._condense())
+
+    async def _condense(self):
+        # Loop so turns that arrived during a call are picked up without a new task
+        while self.summarized < len(self.turns) and not self._closed:
+            end = len(self.turns)
+            batch = self.turns[self.summarized:end]
+            # Summarize one phase at a time so each summary stays on topic
+            phase = batch[0][0]
+            batch = [t for t in batch if t[0] == phase]
+            if len(batch) < SUMMARY_BATCH_TURNS and phase == self.phase:
+                return
+            summary = await self._summarize(phase, batch)
+            if summary is None:
+                return
+            self.summaries[phase] = summary
+            covered = self._item_ids[self.summarized:self.summarized + len(batch)]
+            self.summarized_ids.update(i for i in covered if i)
+            self.summarized += len(batch)
+
+    async def _summarize(self, phase: str, batch: List[Tuple[str, str, str]]) -> Optional[str]:
+        started = time.monotonic()
+        lines = "\n".join(f"{'Candidate' if role == 'user' else 'Interviewer'}: {text}" for _, role, text in batch)
+        prompt = f"""Update the running notes for the "{PHASE_TITLES[phase]}" phase of a coding interview.
+Keep what the candidate proposed, their reasoning, complexities they stated, mistakes and hints they needed.
+At most {SUMMARY_MAX_WORDS} words, plain text, no preamble.
+
+CURRENT NOTES:
+{self.summaries.get(phase, '(none)')}
+
+NEW TURNS:
+{lines}"""
+        try:
+            self.calls += 1
+            response = await self._client_factory().chat.completions.create(
+                model=SUMMARY_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.1,
+                max_tokens=SUMMARY_MAX_WORDS * 2,
+            )
+            summary = response.choices[0].message.content.strip()
+        except Exception as e:
+            print(f"⚠️ [SUMMARY_ERR] {self.session_id}: {type(e).__name__}: {e}")
+            return None
+        worker_metrics.histogram("interview_summary_seconds", "Rolling summary LLM call").observe(
+            time.monotonic() - started
+        )
+        print(f"🗜️ [SUMMARY] {self.session_id} {phase}: {len(batch)} turns -> {len(summary.split())} words")
+        return summary
+
+    def digest(self) -> str:
+        """Phase summaries only (covers turns[:summarized])"""
+        return "\n\n".join(
+            f"## {PHASE_TITLES[phase]}\n{self.summaries[phase]}"
+            for phase in PHASES if self.summaries.get(phase)
+        )
+
+    def render(self, tail_turns: int = SUMMARY_TAIL_TURNS) -> str:
+        """Compact interview digest: phase summaries then the unsummarized tail"""
+        parts = [self.digest()] if self.summaries else []
+        tail = self.turns[self.summarized:]
+        if tail:
+            dropped = max(0, len(tail) - tail_turns)
+            lines = [f"{'Candidate' if role == 'user' else 'Interviewer'}: {text}" for _, role, text in tail[dropped:]]
+            header = "## Most recent turns" + (f" ({dropped} earlier turns omitted)" if dropped else "")
+            parts.append(header + "\n" + "\n".join(lines))
+        return "\n\n".join(parts)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "phase": self.phase,
+            "turns": len(self.turns),
+            "summarized": self.summarized,
+            "calls": self.calls,
+            "phases": sorted(self.summaries, key=PHASES.index),
+        }
+
+    async def close(self):
+        """Stop background work; the digest keeps whatever was condensed"""
+        self._closed = True
+        if self._task and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
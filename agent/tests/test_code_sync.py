@@ -0,0 +1,44 @@
+import json
+
+from code_sync import CodeDocument, encode_update
+
+
+def test_reloaded_editor_restarts_versions():
+    doc = CodeDocument()
+    doc.receive(encode_update(None, "a = 1", 1, epoch="first"))
+    for version in range(2, 10):
+        doc.receive(encode_update(doc.text, f"a = {version}", version, epoch="first"))
+    assert doc.version == 9
+
+    # Page reload: a new encoder starts again at v1
+    assert doc.receive(encode_update(None, "b = 1", 1, epoch="second")) == "snapshot"
+    assert doc.receive(encode_update("b = 1", "b = 2", 2, epoch="second")) == "patch"
+    assert (doc.text, doc.version, doc.stats["restarts"]) == ("b = 2", 2, 1)
+
+
+def test_patch_from_unknown_epoch_is_a_gap():
+    doc = CodeDocument()
+    doc.receive(encode_update(None, "a = 1", 1, epoch="first"))
+    patch = json.loads(encode_update("x", "y", 5, epoch="second"))
+    assert doc.receive(json.dumps(patch)) == "gap"
+    assert doc.text == "a = 1"
+
+
+def test_offsets_are_utf16_code_units():
+    doc = CodeDocument()
+    doc.receive(encode_update(None, "// 😀\nx=1", 1))
+    # What the editor sends: JS indices count the emoji as two code units
+    patch = {"type": "patch", "epoch": None, "base": 1, "version": 2, "ops": [[8, 9, "2"]]}
+    assert doc.receive(json.dumps(patch)) == "patch"
+    assert doc.text == "// 😀\nx=2"
+
+
+def test_splice_between_surrogate_halves():
+    old, new = "s = '😀'", "s = '😁'"
+    # Both emoji share the high surrogate, so the op starts inside the pair
+    message = json.loads(encode_update(old, new, 2))
+    assert message["ops"][0][0] == 6
+    doc = CodeDocument()
+    doc.receive(encode_update(None, old, 1))
+    assert doc.receive(json.dumps(message)) == "patch"
+    assert doc.text == new
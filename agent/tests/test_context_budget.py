@@ -0,0 +1,26 @@
+from livekit.agents import llm
+
+from context_budget import ContextBudget
+
+
+def message(role, text, item_id):
+    return llm.ChatMessage(role=role, content=[text] if text else [], id=item_id)
+
+
+def test_unsummarized_turn_survives_skipped_messages():
+    items = [
+        message("system", "You are Athena", "sys"),
+        message("user", "first question " * 20, "u1"),
+        # Interrupted reply: empty, so the summarizer never saw it
+        message("assistant", "", "a1"),
+        message("user", "second question " * 20, "u2"),
+        message("assistant", "not summarized yet " * 20, "a2"),
+    ] + [
+        message("user" if n % 2 == 0 else "assistant", f"recent {n}", f"r{n}") for n in range(12)
+    ]
+    budget = ContextBudget(max_tokens=300, keep_turns=6)
+    # The summary covers u1 and u2 only; a position count (2) would also drop a2
+    kept, report = budget.apply(llm.ChatContext(items), summary="covered u1 u2", summarized_ids={"u1", "u2"})
+    ids = [item.id for item in kept.items]
+    assert "a2" in ids
+    assert "u1" not in ids and "u2" not in ids
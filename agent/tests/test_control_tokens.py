@@ -0,0 +1,77 @@
+from control_tokens import MAX_TOKEN_LEN, ControlTokenScanner
+
+REPLY = "Thanks for your time, good luck [[END_INTERVIEW]] bye"
+
+
+def _scanner(calls):
+    return ControlTokenScanner({
+        "END_INTERVIEW": lambda arg: calls.append(("END_INTERVIEW", arg)),
+        "PHASE": lambda arg: calls.append(("PHASE", arg)),
+    })
+
+
+def _stream(scanner, chunks):
+    spoken = "".join(scanner.feed(chunk) for chunk in chunks)
+    return spoken + scanner.flush()
+
+
+def test_token_split_at_every_position():
+    for cut in range(len(REPLY) + 1):
+        calls = []
+        scanner = _scanner(calls)
+        spoken = _stream(scanner, [REPLY[:cut], REPLY[cut:]])
+        assert spoken == "Thanks for your time, good luck  bye", cut
+        assert calls == [("END_INTERVIEW", None)], cut
+        assert scanner.text == spoken
+
+
+def test_token_one_character_per_chunk():
+    calls = []
+    spoken = _stream(_scanner(calls), list(REPLY))
+    assert "[" not in spoken and "]" not in spoken
+    assert calls == [("END_INTERVIEW", None)]
+
+
+def test_token_with_argument():
+    calls = []
+    scanner = _scanner(calls)
+    spoken = _stream(scanner, ["Let's talk brute force [[PHA", "SE: brute_force]]"])
+    assert spoken == "Let's talk brute force "
+    assert calls == [("PHASE", "brute_force")]
+    assert scanner.tokens == [("PHASE", "brute_force")]
+
+
+def test_unterminated_known_token_is_never_spoken():
+    for tail in ["[[END_INTERVIEW]", "[[END_INTERVIEW", "[[END_INT", "[[PHASE:cod"]:
+        calls = []
+        scanner = _scanner(calls)
+        assert scanner.feed("Goodbye " + tail) == "Goodbye "
+        assert scanner.flush() == ""
+        assert "[[" not in scanner.text
+    # With only the closing brackets missing the token still fires
+    calls = []
+    scanner = _scanner(calls)
+    scanner.feed("Goodbye [[END_INTERVIEW]")
+    scanner.flush()
+    assert calls == [("END_INTERVIEW", None)]
+
+
+def test_unknown_tokens_pass_through():
+    calls = []
+    scanner = _scanner(calls)
+    assert _stream(scanner, ["use a[[0", "]] and [[i]]"]) == "use a[[0]] and [[i]]"
+    assert _stream(_scanner(calls), ["matrix[[1, 2"]) == "matrix[[1, 2"
+    assert calls == []
+
+
+def test_holdback_is_bounded():
+    calls = []
+    scanner = _scanner(calls)
+    body = "x" * MAX_TOKEN_LEN
+    # Up to MAX_TOKEN_LEN characters after "[[" could still be a token
+    assert scanner.feed("a [[" + body) == "a "
+    # One more and it cannot be, so everything held back is released
+    assert scanner.feed("y") == "[[" + body + "y"
+    assert scanner.flush() == ""
+    assert scanner.text == "a [[" + body + "y"
+    assert calls == []
@@ -0,0 +1,42 @@
+import json
+import os
+import time
+
+import metrics
+from metrics import JobMetricsCollector, MetricsRegistry
+
+# No process has this pid, so its export counts as one from an exited job process
+DEAD_PID = 2 ** 22 + 7
+
+
+def _job_export(pid: int, seconds: float, ts: float) -> dict:
+    registry = MetricsRegistry()
+    registry.histogram(metrics.STAGE_METRIC, metrics.STAGE_HELP, stage="first_audio").observe(seconds)
+    registry.inc("interview_kit_stale_total")
+    registry.gauge("interview_active_sessions", lambda: 1)
+    return {**registry.export(), "pid": pid, "ts": ts}
+
+
+def _write(directory, export: dict):
+    with open(os.path.join(directory, f"{export['pid']}.json"), "w") as f:
+        json.dump(export, f)
+
+
+def test_main_process_merges_job_exports(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_EXPORT_DIR", str(tmp_path))
+    live_pid = os.getppid()
+    _write(tmp_path, _job_export(live_pid, 0.4, time.time()))
+    _write(tmp_path, _job_export(DEAD_PID, 2.5, time.time() - 60))
+    collector = JobMetricsCollector(registry=MetricsRegistry())
+
+    for _ in range(2):
+        text = collector.render()
+        assert 'interview_turn_stage_seconds_count{stage="first_audio"} 2' in text
+        assert 'interview_turn_stage_seconds_bucket{stage="first_audio",le="0.5"} 1' in text
+        assert "interview_kit_stale_total 2" in text
+        # Gauges stay per process and only for processes that are still running
+        assert f'interview_active_sessions{{pid="{live_pid}"}} 1.0' in text
+        assert f'pid="{DEAD_PID}"' not in text
+
+    # The exited process was folded in once and its file removed
+    assert sorted(os.listdir(tmp_path)) == [f"{live_pid}.json"]
@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import outbox
+from outbox import NotificationOutbox
+
+# Nothing listens on the discard port, so every attempt fails and backs off
+UNREACHABLE = "http://127.0.0.1:9/api/sessions/s1/evaluation"
+
+
+async def _enqueue_and_wait_for_retry(box: NotificationOutbox):
+    await box.enqueue("evaluation-s1", "PUT", UNREACHABLE, {"ok": True})
+    deadline = time.monotonic() + 5
+    while box.stats["retried"] == 0 and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    assert box.stats["retried"] >= 1
+
+
+def test_close_while_backing_off_returns(tmp_path, monkeypatch):
+    monkeypatch.setattr(outbox, "OUTBOX_BACKOFF_BASE", 30.0)
+
+    async def scenario():
+        box = NotificationOutbox(path=str(tmp_path / "outbox.sqlite3"))
+        await _enqueue_and_wait_for_retry(box)
+        # The sender is now parked waiting for the backed-off row
+        started = time.monotonic()
+        await asyncio.wait_for(box.close(grace=0.2), 5)
+        assert time.monotonic() - started < 2
+        assert box._task is None
+        assert box.pending == 1
+
+    for _ in range(5):
+        asyncio.run(scenario())
+
+
+def test_close_races_a_wake(tmp_path, monkeypatch):
+    monkeypatch.setattr(outbox, "OUTBOX_BACKOFF_BASE", 30.0)
+
+    async def scenario():
+        box = NotificationOutbox(path=str(tmp_path / "outbox.sqlite3"))
+        await _enqueue_and_wait_for_retry(box)
+        # Wake the sender in the same tick as closing it
+        box._wake.set()
+        await asyncio.wait_for(box.close(), 5)
+        assert box._task is None
+
+    for _ in range(5):
+        asyncio.run(scenario())
+
+
+def test_row_survives_close_and_is_replayed(tmp_path, monkeypatch):
+    monkeypatch.setattr(outbox, "OUTBOX_BACKOFF_BASE", 30.0)
+    path = str(tmp_path / "outbox.sqlite3")
+
+    async def first():
+        box = NotificationOutbox(path=path)
+        await _enqueue_and_wait_for_retry(box)
+        await box.close()
+
+    async def second():
+        box = NotificationOutbox(path=path)
+        box.start()
+        await asyncio.sleep(0.2)
+        pending = box.pending
+        await box.close()
+        return pending
+
+    asyncio.run(first())
+    assert asyncio.run(second()) == 1
+
+
+def test_close_releases_connection_and_thread(tmp_path):
+    async def scenario():
+        box = outbox.get_outbox()
+        box.path = str(tmp_path / "outbox.sqlite3")
+        box.start()
+        await asyncio.sleep(0.05)
+        await box.close()
+        assert box._conn is None
+        assert box._executor._shutdown
+        # The next use on this loop gets a fresh outbox
+        assert outbox.get_outbox() is not box
+
+    asyncio.run(scenario())
@@ -0,0 +1,105 @@
+import asyncio
+from types import SimpleNamespace
+
+from summary import SUMMARY_BATCH_TURNS, SUMMARY_TAIL_TURNS, RollingSummarizer
+
+
+class FakeGroq:
+    """Async chat client that answers every summary call with a numbered note"""
+
+    def __init__(self):
+        self.prompts = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, **kwargs):
+        self.prompts.append(kwargs["messages"][0]["content"])
+        await asyncio.sleep(0)
+        content = f"notes {len(self.prompts)}"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+async def _settle(summarizer: RollingSummarizer):
+    while summarizer._task is not None and not summarizer._task.done():
+        await summarizer._task
+
+
+def _candidate_turns(summarizer, start, count):
+    for n in range(start, start + count):
+        summarizer.add("user", f"turn {n}", item_id=f"item-{n}")
+
+
+def test_batches_are_condensed_per_phase():
+    async def scenario():
+        client = FakeGroq()
+        summarizer = RollingSummarizer(lambda: client, "s1")
+        _candidate_turns(summarizer, 0, SUMMARY_BATCH_TURNS - 1)
+        await _settle(summarizer)
+        assert client.prompts == [] and summarizer.summarized == 0
+
+        _candidate_turns(summarizer, SUMMARY_BATCH_TURNS - 1, 1)
+        await _settle(summarizer)
+        assert len(client.prompts) == 1
+        assert '"Problem explanation"' in client.prompts[0]
+        assert summarizer.summaries == {"explanation": "notes 1"}
+        assert summarizer.summarized == SUMMARY_BATCH_TURNS
+        assert summarizer.summarized_ids == {f"item-{n}" for n in range(SUMMARY_BATCH_TURNS)}
+
+        # The next batch updates the same phase's notes
+        _candidate_turns(summarizer, SUMMARY_BATCH_TURNS, SUMMARY_BATCH_TURNS)
+        await _settle(summarizer)
+        assert "CURRENT NOTES:\nnotes 1" in client.prompts[1]
+        assert summarizer.summaries == {"explanation": "notes 2"}
+        assert len(summarizer.summarized_ids) == 2 * SUMMARY_BATCH_TURNS
+
+    asyncio.run(scenario())
+
+
+def test_phase_change_flushes_pending_batch():
+    async def scenario():
+        client = FakeGroq()
+        summarizer = RollingSummarizer(lambda: client, "s1")
+        _candidate_turns(summarizer, 0, 2)
+        summarizer.add("assistant", "Can you describe a brute force approach?", item_id="cue")
+        await _settle(summarizer)
+
+        # Only the explanation turns were condensed; the cue opened the new phase
+        assert summarizer.phase == "brute_force"
+        assert summarizer.summaries == {"explanation": "notes 1"}
+        assert summarizer.summarized == 2
+        assert summarizer.summarized_ids == {"item-0", "item-1"}
+        assert summarizer.turns[2][0] == "brute_force"
+
+        # Phases only move forward
+        summarizer.advance("explanation")
+        assert summarizer.phase == "brute_force"
+
+    asyncio.run(scenario())
+
+
+def test_render_keeps_capped_unsummarized_tail():
+    async def scenario():
+        client = FakeGroq()
+        summarizer = RollingSummarizer(lambda: client, "s1")
+        _candidate_turns(summarizer, 0, SUMMARY_BATCH_TURNS)
+        await _settle(summarizer)
+
+        # Summaries fail from here on, so turns pile up unsummarized
+        async def failing(**kwargs):
+            raise RuntimeError("rate limited")
+
+        client.chat.completions.create = failing
+        extra = SUMMARY_TAIL_TURNS + 3
+        _candidate_turns(summarizer, SUMMARY_BATCH_TURNS, extra)
+        await _settle(summarizer)
+        assert summarizer.summarized == SUMMARY_BATCH_TURNS
+
+        text = summarizer.render()
+        assert text.startswith("## Problem explanation\nnotes 1")
+        assert "## Most recent turns (3 earlier turns omitted)" in text
+        last = SUMMARY_BATCH_TURNS + extra - 1
+        tail = [f"Candidate: turn {n}" for n in range(last - SUMMARY_TAIL_TURNS + 1, last + 1)]
+        assert text.endswith("\n".join(tail))
+        assert f"Candidate: turn {last - SUMMARY_TAIL_TURNS}" not in text.splitlines()
+        await summarizer.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,85 @@
+"""
+Write-behind transcript journal for one interview session
+"""
+
+from typing import Optional, Dict, Any, List
+import asyncio
+import os
+
+from database import transcript_entry
+
+
+class TranscriptJournal:
+    """Buffers transcript turns in memory and flushes them to the
+    `transcripts` collection with insert_many, by batch size or time.
+
+    Entries carry client-side ObjectIds, so a batch retried after a
+    partial failure never produces duplicates.
+    """
+
+    def __init__(self, database, session_id: str, max_batch: Optional[int] = None,
+                 flush_interval: Optional[float] = None):
+        self._db = database
+        self.session_id = session_id
+        self.max_batch = max_batch or int(os.getenv("TRANSCRIPT_FLUSH_BATCH", "20"))
+        self.flush_interval = flush_interval or float(os.getenv("TRANSCRIPT_FLUSH_INTERVAL", "2"))
+        self._buffer: List[Dict[str, Any]] = []
+        self._flush_lock = asyncio.Lock()
+        self._size_flush: Optional[asyncio.Task] = None
+        self._timer: Optional[asyncio.Task] = None
+        self._closed = False
+        self.flushed = 0
+
+    def start(self):
+        if self._timer is None:
+            self._timer = asyncio.create_task(self._flush_periodically())
+
+    def record(self, role: str, content: str):
+        """Queue one turn; never blocks the caller"""
+        content = (content or "").strip()
+        if not content or self._closed:
+            return
+        self._buffer.append(transcript_entry(self.session_id, role, content))
+        if len(self._buffer) >= self.max_batch and (self._size_flush is None or self._size_flush.done()):
+            self._size_flush = asyncio.create_task(self.flush())
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._buffer:
+                return
+            batch, self._buffer = self._buffer, []
+            try:
+                self.flushed += await self._db.insert_transcripts(batch)
+                print(f"🧾 [JOURNAL_FLUSH] {len(batch)} turns for {self.session_id}")
+            except Exception as e:
+                # Put the batch back in front so ordering is preserved for the next attempt
+                self._buffer = batch + self._buffer
+                print(f"❌ [JOURNAL_FLUSH_ERR] {e}")
+
+    async def _flush_periodically(self):
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+        except asyncio.CancelledError:
+            pass
+
+    async def read(self) -> List[Dict[str, Any]]:
+        """Ordered transcript: what is stored plus anything still buffered"""
+        # Holding the flush lock means no batch is in flight between buffer and collection
+        async with self._flush_lock:
+            try:
+                stored = await self._db.get_transcript(self.session_id)
+            except Exception as e:
+                print(f"⚠️ [JOURNAL_READ_ERR] {e}")
+                stored = []
+            pending = [{"role": e["role"], "content": e["content"], "timestamp": e["timestamp"]} for e in self._buffer]
+        return stored + pending
+
+    async def close(self):
+        """Stop the timer and do the final flush"""
+        self._closed = True
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        await self.flush()
@@ -0,0 +1,255 @@
+"""
+On-disk cache of synthesized audio for interviewer lines that repeat
+across sessions: the greeting for each question, the explanation script
+from its interview kit, and the goodbye.
+
+Entries are content-addressed by (text, TTS provider and model, sample
+rate, channels) and stored as raw 16-bit PCM. The directory is capped at
+TTS_CACHE_MAX_MB and evicts least recently used entries (file mtime is the
+recency, so several worker processes can share it). Warm it for every
+question before a deploy:
+
+    cd agent
+    python tts_cache.py prerender
+"""
+
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Iterator, AsyncIterator
+import argparse
+import asyncio
+import hashlib
+import os
+import threading
+
+import aiohttp
+from livekit import rtc
+from livekit.agents import tts
+from livekit.plugins import deepgram
+
+from metrics import worker_metrics
+
+TTS_VOICE = os.getenv("TTS_VOICE", "aura-asteria-en")
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".tts_cache"))
+# 0 turns the cache off (lines are still spoken, just synthesized every time)
+TTS_CACHE_MAX_MB = float(os.getenv("TTS_CACHE_MAX_MB", "200"))
+FRAME_MS = 20
+
+# Spoken when the candidate ends with the End button (no LLM goodbye)
+GOODBYE_TEXT = "Thanks for your time today, it was great talking with you, your feedback will be ready in a moment"
+
+
+def greeting_text(question: Dict[str, Any], kit: Optional[Dict[str, Any]] = None) -> str:
+    """With a kit the explanation follows right away, so there is nothing to ask"""
+    title = question.get("title") or "the assigned problem"
+    if kit:
+        return f"Hi, I'm Athena, I'll be your interviewer today, we'll be working on {title}"
+    return f"Hi, I'm Athena, I'll be your interviewer today, are you ready to discuss {title}?"
+
+
+def utterances(question: Dict[str, Any], kit: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Fixed lines an interview on `question` (with its usable kit, if any) may speak"""
+    lines = [greeting_text(question, kit)]
+    if kit:
+        lines.append(kit["explanation"])
+    return lines + [GOODBYE_TEXT]
+
+
+def create_tts(http_session: Optional[aiohttp.ClientSession] = None) -> deepgram.TTS:
+    """The interviewer voice; cache keys include its model and sample rate"""
+    return deepgram.TTS(model=TTS_VOICE, api_key=os.getenv("DEEPGRAM_API_KEY"), http_session=http_session)
+
+
+def cache_key(text: str, engine: tts.TTS) -> str:
+    identity = "|".join([
+        engine.provider, engine.model, str(engine.sample_rate), str(engine.num_channels), " ".join(text.split()),
+    ])
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+
+def pcm_frames(pcm: bytes, sample_rate: int, num_channels: int, frame_ms: int = FRAME_MS) -> Iterator[rtc.AudioFrame]:
+    """Cut 16-bit PCM back into playable frames"""
+    bytes_per_sample = 2 * num_channels
+    step = sample_rate * frame_ms // 1000 * bytes_per_sample
+    end = len(pcm) - len(pcm) % bytes_per_sample
+    for start in range(0, end, step):
+        chunk = pcm[start:min(start + step, end)]
+        yield rtc.AudioFrame(chunk, sample_rate, num_channels, len(chunk) // bytes_per_sample)
+
+
+class AudioCache:
+    """Size-capped LRU directory of `<key>.pcm` files; methods do file I/O,
+    so call them from an executor when on the event loop."""
+
+    def __init__(self, directory: str = TTS_CACHE_DIR, max_bytes: int = int(TTS_CACHE_MAX_MB * 1024 * 1024)):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+        self._lock = threading.Lock()
+        # key -> size in bytes, least recently used first
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        if self.enabled:
+            os.makedirs(directory, exist_ok=True)
+            self._load_index()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pcm")
+
+    def _load_index(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".pcm"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index and os.path.exists(self._path(key))
+
+    def total_bytes(self) -> int:
+        return sum(self._index.values())
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            # Evicted by another process
+            with self._lock:
+                self._index.pop(key, None)
+            return None
+        with self._lock:
+            self._index[key] = len(data)
+            self._index.move_to_end(key)
+        return data
+
+    def put(self, key: str, pcm: bytes):
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(pcm)
+        os.replace(tmp, path)
+        with self._lock:
+            self._index[key] = len(pcm)
+            self._index.move_to_end(key)
+            self.stats["stored"] += 1
+            self._evict()
+
+    def _evict(self):
+        total = self.total_bytes()
+        while total > self.max_bytes and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            total -= size
+            self.stats["evicted"] += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+
+_cache: Optional[AudioCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_audio_cache() -> AudioCache:
+    """Process-wide cache (shared by job threads)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AudioCache()
+        return _cache
+
+
+worker_metrics.gauge("interview_tts_cache_bytes", lambda: _cache.total_bytes() if _cache else 0,
+                     "Bytes of cached interviewer audio")
+
+
+async def cached_audio(text: str, engine: tts.TTS, cache: Optional[AudioCache] = None) -> AsyncIterator[rtc.AudioFrame]:
+    """Frames for `text` in `engine`'s voice: from the cache, or streamed from
+    the engine while being synthesized and stored for next time"""
+    cache = cache or get_audio_cache()
+    loop = asyncio.get_running_loop()
+    key = cache_key(text, engine)
+    pcm = await loop.run_in_executor(None, cache.get, key) if cache.enabled else None
+    if pcm is not None:
+        cache.stats["hits"] += 1
+        worker_metrics.inc("interview_tts_cache_hits_total", help_text="Fixed lines played from the audio cache")
+        for frame in pcm_frames(pcm, engine.sample_rate, engine.num_channels):
+            yield frame
+        return
+
+    cache.stats["misses"] += 1
+    worker_metrics.inc("interview_tts_cache_misses_total", help_text="Fixed lines that had to be synthesized")
+    chunks: List[bytes] = []
+    storable = cache.enabled
+    async with engine.synthesize(text) as stream:
+        async for audio in stream:
+            frame = audio.frame
+            if frame.sample_rate != engine.sample_rate or frame.num_channels != engine.num_channels:
+                storable = False
+            if storable:
+                chunks.append(bytes(frame.data))
+            yield frame
+    if storable and chunks:
+        await loop.run_in_executor(None, cache.put, key, b"".join(chunks))
+
+
+async def prerender(question_ids: Optional[List[str]] = None) -> Dict[str, int]:
+    """Synthesize every fixed line for every active question (or `question_ids`)"""
+    from database import get_async_db
+    from interview_kit import usable_kit
+
+    db = get_async_db()
+    query: Dict[str, Any] = {"isActive": {"$ne": False}}
+    if question_ids:
+        query["questionId"] = {"$in": question_ids}
+    kits = {kit["questionId"]: kit async for kit in db.interview_kits.find({}, {"_id": 0})}
+    texts = {GOODBYE_TEXT}
+    async for doc in db.questions.find(query):
+        texts.update(utterances(doc, usable_kit(kits.get(doc.get("questionId")), doc)))
+
+    cache = get_audio_cache()
+    result = {"lines": len(texts), "cached": 0, "rendered": 0, "failed": 0}
+    async with aiohttp.ClientSession() as http:
+        engine = create_tts(http_session=http)
+        for text in sorted(texts):
+            if cache_key(text, engine) in cache:
+                result["cached"] += 1
+                continue
+            try:
+                async for _ in cached_audio(text, engine, cache):
+                    pass
+                result["rendered"] += 1
+                print(f"🔊 [TTS_PRERENDER] {text[:60]}")
+            except Exception as e:
+                result["failed"] += 1
+                print(f"❌ [TTS_PRERENDER_ERR] {text[:60]}: {e}")
+    print(f"🔊 [TTS_PRERENDER] {result}, {cache.total_bytes() / 1024 / 1024:.1f} MB in {cache.directory}")
+    return result
+
+
+def main():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Interviewer audio cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+    render = sub.add_parser("prerender", help="Synthesize fixed lines for every question")
+    render.add_argument("--question-id", action="append", dest="question_ids", help="Only these questions")
+    args = parser.parse_args()
+    if args.command == "prerender":
+        asyncio.run(prerender(args.question_ids))
+
+
+if __name__ == "__main__":
+    main()
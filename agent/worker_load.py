@@ -0,0 +1,233 @@
+"""
+Worker load reporting for the AgentServer dispatcher, plus drain mode
+
+The SDK calls `load_fnc` in the main worker process, but interviews run in
+job processes (or job threads). Each job process runs a LoopLagMonitor that
+writes a small heartbeat file; the main process folds those heartbeats,
+the active job count and process-tree CPU into one load value in [0, 1].
+"""
+
+from typing import Optional, Dict, Any, List
+import asyncio
+import json
+import math
+import os
+import signal
+import tempfile
+import threading
+import time
+
+import psutil
+
+from metrics import worker_metrics
+
+# Interviews per worker before it reports itself full
+MAX_SESSIONS = int(os.getenv("WORKER_MAX_SESSIONS", "4"))
+# Load at which the dispatcher stops sending jobs (passed to AgentServer as load_threshold)
+LOAD_THRESHOLD = float(os.getenv("WORKER_LOAD_THRESHOLD", "0.7"))
+# Event-loop lag (ms) that counts as a fully loaded worker
+LAG_BUDGET_MS = float(os.getenv("WORKER_LAG_BUDGET_MS", "200"))
+# Touch this file (or send SIGUSR1) to stop taking new jobs
+DRAIN_FILE = os.getenv("WORKER_DRAIN_FILE", "")
+
+HEARTBEAT_INTERVAL = 1.0
+HEARTBEAT_STALE_AFTER = 5.0
+
+# Set before the job processes start so they inherit the same directory
+HEARTBEAT_DIR = os.environ.setdefault(
+    "WORKER_HEARTBEAT_DIR", os.path.join(tempfile.gettempdir(), f"interview-load-{os.getpid()}")
+)
+
+
+class LoopLagMonitor:
+    """Measures event-loop lag of every job loop in this process and
+    publishes the worst recent value as a heartbeat file for the main process.
+    """
+
+    def __init__(self, interval: float = 0.25, window: int = 20):
+        self.interval = interval
+        self.window = window
+        self._lags: Dict[int, List[float]] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._last_write = 0.0
+        self._lock = threading.Lock()
+
+    def watch(self) -> asyncio.Task:
+        """Start sampling the running loop (once per loop)"""
+        loop = asyncio.get_running_loop()
+        key = id(loop)
+        task = self._tasks.get(key)
+        if task is None or task.done():
+            task = loop.create_task(self._run(key))
+            self._tasks[key] = task
+        return task
+
+    async def stop(self):
+        loop = asyncio.get_running_loop()
+        task = self._tasks.pop(id(loop), None)
+        with self._lock:
+            self._lags.pop(id(loop), None)
+        if task:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        if not self._tasks:
+            self._remove_heartbeat()
+
+    def max_lag_ms(self) -> float:
+        with self._lock:
+            return max((max(lags) for lags in self._lags.values() if lags), default=0.0) * 1000
+
+    async def _run(self, key: int):
+        while True:
+            before = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - before - self.interval)
+            with self._lock:
+                lags = self._lags.setdefault(key, [])
+                lags.append(lag)
+                del lags[:-self.window]
+            if time.monotonic() - self._last_write >= HEARTBEAT_INTERVAL:
+                self._last_write = time.monotonic()
+                self._write_heartbeat()
+
+    def _heartbeat_path(self) -> str:
+        return os.path.join(HEARTBEAT_DIR, f"{os.getpid()}.json")
+
+    def _write_heartbeat(self):
+        from registry import registry
+        path = self._heartbeat_path()
+        try:
+            os.makedirs(HEARTBEAT_DIR, exist_ok=True)
+            with open(path + ".tmp", "w") as f:
+                json.dump({"lag_ms": self.max_lag_ms(), "sessions": len(registry), "ts": time.time()}, f)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"⚠️ [LOAD_HEARTBEAT_ERR] {e}")
+
+    def _remove_heartbeat(self):
+        try:
+            os.remove(self._heartbeat_path())
+        except OSError:
+            pass
+
+
+# Per-process monitor, started from each entrypoint
+loop_monitor = LoopLagMonitor()
+
+
+def read_heartbeats() -> List[Dict[str, Any]]:
+    """Fresh heartbeats from all job processes of this worker"""
+    beats = []
+    now = time.time()
+    try:
+        names = os.listdir(HEARTBEAT_DIR)
+    except OSError:
+        return beats
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(HEARTBEAT_DIR, name)) as f:
+                beat = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if now - beat.get("ts", 0) <= HEARTBEAT_STALE_AFTER:
+            beats.append(beat)
+    return beats
+
+
+class WorkerLoad:
+    """Load function for AgentServer: max of session, loop-lag and CPU pressure.
+
+    The session and lag terms are scaled so they reach `threshold` (the
+    server's load_threshold) exactly at MAX_SESSIONS interviews or
+    LAG_BUDGET_MS of lag; below that the worker keeps taking jobs. CPU share
+    counts as is. Reports 1.0 (full) at MAX_SESSIONS active interviews or
+    while draining, so the dispatcher stops sending jobs while running
+    interviews finish.
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, lag_budget_ms: float = LAG_BUDGET_MS,
+                 drain_file: str = DRAIN_FILE, threshold: float = LOAD_THRESHOLD):
+        self.max_sessions = max(1, max_sessions)
+        self.lag_budget_ms = lag_budget_ms
+        self.threshold = min(1.0, max(0.01, threshold))
+        self.drain_file = drain_file
+        self.draining = False
+        self.last: Dict[str, float] = {}
+        self._server = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._procs: Dict[int, psutil.Process] = {}
+        self._cpu_count = psutil.cpu_count() or 1
+
+    def install(self, server):
+        """Register as the server's load_fnc and hook drain triggers"""
+        self._server = server
+        server.load_fnc = self
+        server.on("worker_started", self._on_worker_started)
+        if threading.current_thread() is threading.main_thread() and hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, lambda *_: self.start_drain("SIGUSR1"))
+        worker_metrics.gauge("interview_worker_load", lambda: self.last.get("load", 0.0),
+                             "Load reported to the dispatcher")
+        worker_metrics.gauge("interview_worker_draining", lambda: float(self.draining),
+                             "1 while the worker refuses new jobs")
+
+    def _on_worker_started(self, *_):
+        self._loop = asyncio.get_running_loop()
+
+    def start_drain(self, reason: str):
+        if self.draining:
+            return
+        self.draining = True
+        print(f"🚰 [DRAIN] {reason}: no new interviews, waiting for running ones to finish")
+        if self._server is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(lambda: asyncio.ensure_future(self._drain()))
+
+    async def _drain(self):
+        try:
+            await self._server.drain(timeout=None)
+            print("🚰 [DRAIN] All interviews finished; safe to stop this worker")
+        except Exception as e:
+            print(f"❌ [DRAIN_ERR] {e}")
+
+    def active_sessions(self) -> int:
+        if self._server is not None:
+            return len(self._server.active_jobs)
+        return sum(beat.get("sessions", 0) for beat in read_heartbeats())
+
+    def cpu_fraction(self) -> float:
+        """CPU of the worker and its job processes, as a share of the host"""
+        root = psutil.Process()
+        try:
+            procs = [root] + root.children(recursive=True)
+        except psutil.Error:
+            procs = [root]
+        total = 0.0
+        seen = {}
+        for proc in procs:
+            # Reuse Process objects: cpu_percent() measures since the previous call
+            cached = self._procs.get(proc.pid, proc)
+            try:
+                total += cached.cpu_percent(interval=None)
+                seen[proc.pid] = cached
+            except psutil.Error:
+                continue
+        self._procs = seen
+        return min(1.0, total / 100.0 / self._cpu_count)
+
+    def __call__(self) -> float:
+        if not self.draining and self.drain_file and os.path.exists(self.drain_file):
+            self.start_drain(f"drain file {self.drain_file}")
+        sessions = self.active_sessions()
+        lag_ms = max((beat.get("lag_ms", 0.0) for beat in read_heartbeats()), default=0.0)
+        cpu = self.cpu_fraction()
+        if self.draining or sessions >= self.max_sessions:
+            load = 1.0
+        else:
+            load = max(
+                self.threshold * sessions / self.max_sessions,
+                self.threshold * min(1.0, lag_ms / self.lag_budget_ms),
+                cpu,
+            )
+        self.last = {"load": load, "sessions": sessions, "lag_ms": lag_ms, "cpu": cpu}
+        return load if math.isfinite(load) else 1.0
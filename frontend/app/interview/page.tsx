@@ -6,6 +6,7 @@ import { RemoteTrack } from "livekit-client";
 import CodeEditor from "@/components/code-editor/CodeEditor";
 import { useLiveKit } from "@/lib/hooks/useLiveKit";
 import { sessionApi } from "@/lib/api/sessionApi";
+import { CodeSyncEncoder } from "@/lib/codeSync";
 
 const INITIAL_CODE = `// Write your solution here\n\nfunction solution() {\n  // Your code\n}\n`;
 
@@ -39,6 +40,8 @@ export default function InterviewPage() {
   } | null>(null);
   
   const autosaveTimerRef = useRef<NodeJS.Timeout | null>(null);
+  const codeRef = useRef(INITIAL_CODE);
+  const codeSyncRef = useRef(new CodeSyncEncoder());
   const transcriptEndRef = useRef<HTMLDivElement | null>(null);
 
   // Load session data from sessionStorage
@@ -165,31 +168,43 @@ export default function InterviewPage() {
     }
   }, [sessionId]);
 
+  // Send the editor buffer to the agent as a versioned patch (or snapshot)
+  const sendCodeUpdate = useCallback((codeToSend: string, forceSnapshot = false) => {
+    if (!isConnected || !livekitHookResult.room) return;
+    const message = codeSyncRef.current.next(codeToSend, forceSnapshot);
+    if (!message) return;
+    const localParticipant = livekitHookResult.room.localParticipant;
+    try {
+      // .sendText() automatically handles the stream creation and closing
+      localParticipant.sendText(JSON.stringify(message), {
+        topic: "code-update",
+      }).then((info) => {
+        console.log(`💻 [STREAM_SENT] Sent code ${message.type} v${message.version}. ID: ${info.id}`);
+      }).catch(err => {
+        console.error('❌ [STREAM_SEND_ERROR]', err);
+      });
+    } catch (err) {
+      console.error('❌ [CODE_SEND_CRITICAL_ERROR]', err);
+    }
+  }, [isConnected, livekitHookResult.room]);
+
+  // Agent detected a missing patch: answer with a full snapshot right away
+  useEffect(() => {
+    const handleResync = () => sendCodeUpdate(codeRef.current, true);
+    window.addEventListener('code-resync', handleResync);
+    return () => window.removeEventListener('code-resync', handleResync);
+  }, [sendCodeUpdate]);
+
   const handleCodeChange = (newCode: string) => {
     setCode(newCode);
+    codeRef.current = newCode;
     // Debounce both autosave and sendText
     if (autosaveTimerRef.current) {
       clearTimeout(autosaveTimerRef.current);
     }
     autosaveTimerRef.current = setTimeout(() => {
       saveCode(newCode);
-      // UPDATED: Send code to agent via LiveKit Text Stream
-      if (isConnected && livekitHookResult.room) {
-        const localParticipant = livekitHookResult.room.localParticipant;
-        try {
-          // .sendText() automatically handles the stream creation and closing
-          // for the string provided. This is the "Send all at once" pattern.
-          localParticipant.sendText(newCode, {
-            topic: "code-update",
-          }).then((info) => {
-            console.log(`💻 [STREAM_SENT] Sent code update. ID: ${info.id}`);
-          }).catch(err => {
-            console.error('❌ [STREAM_SEND_ERROR]', err);
-          });
-        } catch (err) {
-          console.error('❌ [CODE_SEND_CRITICAL_ERROR]', err);
-        }
-      }
+      sendCodeUpdate(newCode);
     }, 2000);
   };
 
@@ -0,0 +1,73 @@
+/**
+ * Versioned incremental code sync for the agent's `code-update` topic.
+ * Must match agent/code_sync.py.
+ *
+ *   { type: "snapshot", epoch, version, code }
+ *   { type: "patch", epoch, base, version, ops: [[start, end, text], ...] }
+ *
+ * Op offsets are UTF-16 code units (plain JS string indices); the agent
+ * splices in the same unit.
+ *
+ * `epoch` is random per encoder, so the agent can tell that a reloaded page
+ * started counting versions from 1 again.
+ */
+
+// Send a full snapshot at least this often so a missed patch heals by itself
+export const SNAPSHOT_EVERY = 20;
+
+export type CodeOp = [number, number, string];
+
+export type CodeSyncMessage =
+  | { type: "snapshot"; epoch: string; version: number; code: string }
+  | { type: "patch"; epoch: string; base: number; version: number; ops: CodeOp[] };
+
+function newEpoch(): string {
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 8)}`;
+}
+
+/** Single replace op covering the changed middle of oldText -> newText */
+export function spliceOps(oldText: string, newText: string): CodeOp[] {
+  if (oldText === newText) return [];
+  const limit = Math.min(oldText.length, newText.length);
+  let prefix = 0;
+  while (prefix < limit && oldText[prefix] === newText[prefix]) prefix++;
+  let suffix = 0;
+  while (
+    suffix < limit - prefix &&
+    oldText[oldText.length - 1 - suffix] === newText[newText.length - 1 - suffix]
+  ) {
+    suffix++;
+  }
+  return [[prefix, oldText.length - suffix, newText.slice(prefix, newText.length - suffix)]];
+}
+
+export class CodeSyncEncoder {
+  private readonly epoch = newEpoch();
+  private version = 0;
+  private lastSent: string | null = null;
+  private patchesSinceSnapshot = 0;
+
+  /** Next message for `code`, or null when nothing changed since the last send */
+  next(code: string, forceSnapshot = false): CodeSyncMessage | null {
+    if (!forceSnapshot && this.lastSent === code) return null;
+
+    this.version += 1;
+    let message: CodeSyncMessage;
+    const ops = this.lastSent === null ? [] : spliceOps(this.lastSent, code);
+    const patchSize = ops.reduce((n, [, , text]) => n + text.length, 0);
+    if (
+      forceSnapshot ||
+      this.lastSent === null ||
+      this.patchesSinceSnapshot >= SNAPSHOT_EVERY ||
+      patchSize > code.length / 2
+    ) {
+      message = { type: "snapshot", epoch: this.epoch, version: this.version, code };
+      this.patchesSinceSnapshot = 0;
+    } else {
+      message = { type: "patch", epoch: this.epoch, base: this.version - 1, version: this.version, ops };
+      this.patchesSinceSnapshot += 1;
+    }
+    this.lastSent = code;
+    return message;
+  }
+}
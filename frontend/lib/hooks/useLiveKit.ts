@@ -163,6 +163,13 @@ export function useLiveKit({
           return;
         }
 
+        // Agent missed a code patch and wants a full snapshot
+        if (data.type === 'code_resync') {
+          console.log('🔁 [CODE_RESYNC] Agent is at version', data.version);
+          window.dispatchEvent(new CustomEvent('code-resync', { detail: { version: data.version } }));
+          return;
+        }
+
         if (data.type === 'transcript' && data.content) {
           console.log(`✨ [MATCHED_TRANSCRIPT] ${data.role}:`, data.content);
           onTranscriptReceived?.({